@@ -0,0 +1,84 @@
+#!/bin/bash
+
+################################################################################
+# Collection cycle benchmark for monitor.sh
+# Arab Academy for Science, Technology & Maritime Transport
+# Course: Operating Systems Project 12th
+#
+# Runs N cycles of the per-metric monitor_* functions ("before") and of the
+# batched single-pass cycle ("after") against a scratch data directory and
+# reports processes forked and wall time per cycle.
+#
+#   bash bench/cycle_bench.sh [cycles] [--json]
+#
+# Forks are read from the system-wide "processes" counter in /proc/stat,
+# so run it on an otherwise quiet machine.
+################################################################################
+
+CYCLES=10
+JSON=0
+for arg in "$@"; do
+    case $arg in
+        --json) JSON=1 ;;
+        *) CYCLES=$arg ;;
+    esac
+done
+
+BENCH_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$BENCH_DIR/../monitor.sh"
+
+SCRATCH=$(mktemp -d)
+trap 'rm -rf "$SCRATCH"' EXIT
+LOG_DIR="$SCRATCH/logs"
+REPORT_DIR="$SCRATCH/reports"
+DATA_DIR="$SCRATCH/data"
+LOG_FILE="$LOG_DIR/monitor_bench.log"
+PERSIST_STATE=0  # Counters stay in memory, as in continuous mode
+mkdir -p "$LOG_DIR" "$REPORT_DIR" "$DATA_DIR"
+
+# Total processes created since boot, read without forking
+fork_count() {
+    local key value
+    while read -r key value; do
+        if [ "$key" = "processes" ]; then
+            echo "$value"
+            return
+        fi
+    done < /proc/stat
+}
+
+# Run CYCLES cycles in the given mode; prints "forks_per_cycle ms_per_cycle"
+measure() {
+    BATCHED_COLLECTION=$1
+    collect_cycle > /dev/null  # Warm up (and prime the CPU delta)
+    local forks_before start end forks_after i
+    read -r forks_before < <(fork_count)
+    start=$EPOCHREALTIME
+    for ((i = 0; i < CYCLES; i++)); do
+        collect_cycle > /dev/null
+    done
+    end=$EPOCHREALTIME
+    read -r forks_after < <(fork_count)
+    # The two fork_count substitutions fork once each
+    local forks=$((forks_after - forks_before - 1))
+    local micros=$(( (${end/./} - ${start/./}) / CYCLES ))
+    printf '%d.%02d %d.%03d\n' $((forks / CYCLES)) $((forks * 100 / CYCLES % 100)) \
+        $((micros / 1000)) $((micros % 1000))
+}
+
+read -r before_forks before_ms < <(measure 0)
+read -r after_forks after_ms < <(measure 1)
+
+if [ "$JSON" = "1" ]; then
+    cat <<JSON
+{
+  "cycles": $CYCLES,
+  "before": {"forks_per_cycle": $before_forks, "ms_per_cycle": $before_ms},
+  "after": {"forks_per_cycle": $after_forks, "ms_per_cycle": $after_ms}
+}
+JSON
+else
+    printf '%-10s %16s %14s\n' "mode" "forks/cycle" "ms/cycle"
+    printf '%-10s %16s %14s\n' "before" "$before_forks" "$before_ms"
+    printf '%-10s %16s %14s\n' "after" "$after_forks" "$after_ms"
+fi
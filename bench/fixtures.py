@@ -0,0 +1,237 @@
+"""
+Shared helpers for the benchmarks: synthetic data and a throwaway server
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+"""
+
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from sysmon.collector import METRICS, format_timestamp
+from sysmon.storage import ColumnarWriter, csv_values
+
+CLK_TCK = os.sysconf('SC_CLK_TCK')
+
+# Fixture sizes accepted by name as well as a plain row count
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+CHUNK_ROWS = 100_000
+FIXTURE_MARKER = '.bench_fixture'
+
+ROWS = {
+    'cpu': '12.5,8,0.52, 0.48, 0.41,45.0',
+    'memory': '15906,6021,1250,9885,37.85,2047,0',
+    'disk': '42,468G,185G,259G,PASSED',
+    'gpu': 'N/A,N/A,N/A,N/A',
+    'network': 'eth0,1024.50,512.25,1500000,900000,192.168.1.10,up',
+    'system': '0.52,0.48,0.41,312,2,0,1',
+}
+
+# How the web server is started: Flask's development server or gunicorn
+SERVERS = {
+    'dev': lambda port: [sys.executable, os.path.join(ROOT, 'web', 'server.py')],
+    'gunicorn': lambda port: [sys.executable, '-m', 'gunicorn',
+                              '-c', os.path.join(ROOT, 'web', 'gunicorn.conf.py')],
+}
+
+
+def _stat_fields(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        return f.read().rsplit(')', 1)[1].split()
+
+
+def cpu_seconds(pid):
+    """utime + stime of a process and its direct children (server workers)"""
+    pids = [pid]
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                if int(_stat_fields(entry)[1]) == pid:
+                    pids.append(int(entry))
+            except (OSError, IndexError):
+                continue
+    total = 0
+    for child in pids:
+        try:
+            fields = _stat_fields(child)
+        except OSError:
+            continue
+        total += int(fields[11]) + int(fields[12])
+    return total / CLK_TCK
+
+
+def fork_count():
+    """Processes created system-wide since boot, from /proc/stat"""
+    with open('/proc/stat') as f:
+        for line in f:
+            if line.startswith('processes '):
+                return int(line.split()[1])
+    return 0
+
+
+def peak_rss_kb(pid='self'):
+    """High-water resident set size of a process in KB
+
+    Read from VmHWM, which starts over at exec; getrusage's ru_maxrss
+    carries the parent's peak over into a child process.
+    """
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    return 0
+
+
+def parse_size(value):
+    """Row count of a fixture size such as ``10k``, ``1m`` or ``250000``"""
+    value = str(value).strip().lower()
+    if value in SIZES:
+        return SIZES[value]
+    return int(value)
+
+
+def stamp_chunks(start, count, date_format, time_separator, joiner, chunk=CHUNK_ROWS):
+    """Lists of timestamps of ``count`` samples one second apart
+
+    Only the date goes through strftime, once per day; the time of day is
+    taken from a table of the 86400 seconds, which is what makes 10M-row
+    fixtures take seconds rather than minutes. DST shifts are ignored.
+    """
+    clock = [f'{h:02d}{time_separator}{m:02d}{time_separator}{s:02d}'
+             for h in range(24) for m in range(60) for s in range(60)]
+    day = int(time.mktime(time.localtime(start)[:3] + (0, 0, 0, 0, 0, -1)))
+    second = start - day
+    stamps = []
+    while count > 0:
+        date = time.strftime(date_format, time.localtime(day + 43200)) + joiner
+        take = min(count, 86400 - second)
+        stamps.extend([date + part for part in clock[second:second + take]])
+        count -= take
+        second = 0
+        day += 86400
+        while len(stamps) >= chunk:
+            yield stamps[:chunk]
+            del stamps[:chunk]
+    if stamps:
+        yield stamps
+
+
+def write_fixtures(root, rows):
+    """data/, logs/ and reports/ under ``root`` holding ``rows`` samples
+
+    Every metric CSV (and its columnar store) gets ``rows`` rows one second
+    apart ending now, process_metrics.csv a top-5 tick every 10 seconds
+    and logs/monitor_bench.log ``rows`` lines with a WARNING every 100 and
+    an ERROR every 1000. A fixture already written with the same row
+    count is reused.
+    """
+    dirs = {name: os.path.join(root, name) for name in ('data', 'logs', 'reports')}
+    dirs['log_file'] = os.path.join(dirs['logs'], 'monitor_bench.log')
+    dirs['report_file'] = os.path.join(dirs['reports'], 'system_report_bench.md')
+    marker = os.path.join(root, FIXTURE_MARKER)
+    try:
+        with open(marker) as f:
+            if int(f.read()) == rows:
+                return dirs
+        os.remove(marker)
+    except (OSError, ValueError):
+        pass
+    for name in ('data', 'logs', 'reports'):
+        shutil.rmtree(dirs[name], ignore_errors=True)
+        os.makedirs(dirs[name])
+
+    start = int(time.time()) - rows
+    writer = ColumnarWriter(os.path.join(dirs['data'], 'columnar'))
+    files = {metric: open(os.path.join(dirs['data'], f'{metric}_metrics.csv'), 'w')
+             for metric in METRICS + ('process',)}
+    tick = [f',PROCESS,{ranking},{rank},{1000 + rank},bench{rank},{50 - rank:.1f},'
+            f'{100 * rank:.1f},R\n' for ranking in ('cpu', 'rss') for rank in range(1, 6)]
+    try:
+        epoch = start
+        for stamps in stamp_chunks(start, rows, '%Y%m%d', '', '_'):
+            for metric in METRICS:
+                # Rows differ only in the timestamp: one join writes a chunk
+                suffix = f',{metric.upper()},{ROWS[metric]}\n'
+                files[metric].write(suffix.join(stamps) + suffix)
+                values = csv_values(metric, [None, metric.upper()] + ROWS[metric].split(','))
+                writer.append_rows(metric, [(epoch + i, *values) for i in range(len(stamps))])
+            files['process'].writelines(stamp + line for stamp in stamps[::10] for line in tick)
+            epoch += len(stamps)
+    finally:
+        writer.close()
+        for f in files.values():
+            f.close()
+
+    with open(dirs['log_file'], 'w') as f:
+        index = 0
+        for stamps in stamp_chunks(start, rows, '%Y-%m-%d', ':', ' '):
+            lines = [f'[{stamp}] [INFO] Metrics collected\n' for stamp in stamps]
+            for i in range(-index % 100, len(lines), 100):
+                level, message = (('ERROR', 'Disk usage is critical: 97%') if (index + i) % 1000 == 0
+                                  else ('WARNING', 'CPU usage is high: 91%'))
+                lines[i] = f'[{stamps[i]}] [{level}] {message}\n'
+            f.writelines(lines)
+            index += len(lines)
+
+    with open(dirs['report_file'], 'w') as f:
+        f.write('# System Monitoring Report\n\nSynthetic benchmark fixture.\n')
+    with open(marker, 'w') as f:
+        f.write(str(rows))
+    return dirs
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def append_rows(data_dir, log_file, count):
+    """Append one row per metric, and an alert every fifth call"""
+    now = time.time()
+    for metric in METRICS:
+        with open(os.path.join(data_dir, f'{metric}_metrics.csv'), 'a') as f:
+            f.write(f'{format_timestamp(now)},{metric.upper()},{ROWS[metric]}\n')
+    if count % 5 == 0:
+        with open(log_file, 'a') as f:
+            f.write(f'[{time.strftime("%Y-%m-%d %H:%M:%S")}] [WARNING] CPU usage is high: 91%\n')
+
+
+@contextmanager
+def synthetic_dirs(rows=100):
+    """Temporary data/logs/reports directories pre-filled with ``rows`` samples"""
+    with tempfile.TemporaryDirectory() as tmp:
+        dirs = {name: os.path.join(tmp, name) for name in ('data', 'logs', 'reports')}
+        for path in dirs.values():
+            os.makedirs(path)
+        dirs['log_file'] = os.path.join(dirs['logs'], 'monitor_bench.log')
+        for i in range(rows):
+            append_rows(dirs['data'], dirs['log_file'], i)
+        yield dirs
+
+
+@contextmanager
+def running_server(dirs, server='dev', env=None):
+    """Start web/server.py on a free port; yields (process, port)"""
+    port = free_port()
+    env = dict(os.environ, DATA_DIR=dirs['data'], LOG_DIR=dirs['logs'],
+               REPORT_DIR=dirs['reports'], PORT=str(port), **(env or {}))
+    process = subprocess.Popen(SERVERS[server](port), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield process, port
+    finally:
+        process.terminate()
+        process.wait()
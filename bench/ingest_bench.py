@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Ingest throughput benchmark for multi-host fan-in
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Starts a server on empty data and runs --nodes processes that stand in
+for remote collectors, each pushing synthetic rows through PushWriter
+(gzip batches of --batch rows) as fast as the server accepts them for
+--duration seconds. Reports rows/sec, batches/sec, the compression ratio
+and checks that every pushed row landed in its host's files:
+
+    python3 bench/ingest_bench.py --nodes 4 --batch 500
+    python3 bench/ingest_bench.py --server gunicorn --json
+"""
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import time
+
+from fixtures import ROWS, SERVERS, running_server, synthetic_dirs
+from sysmon.collector import METRICS, format_timestamp
+from sysmon.push import PushWriter
+
+
+def synthetic_batch(size, epoch):
+    """``size`` rows cycling through the metric families"""
+    stamp = format_timestamp(epoch)
+    return [f'{stamp},{METRICS[i % len(METRICS)].upper()},{ROWS[METRICS[i % len(METRICS)]]}'
+            for i in range(size)]
+
+
+def node(url, host, batch_size, duration, results):
+    writer = PushWriter(url, host, batch_size=batch_size, flush_interval=3600)
+    batches = rows = raw_bytes = failures = 0
+    epoch = time.time()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        batch = synthetic_batch(batch_size, epoch)
+        raw_bytes += sum(len(row) + 1 for row in batch)
+        writer.add_rows(batch)
+        if writer.flush():
+            batches += 1
+            rows += len(batch)
+        else:
+            failures += 1
+        epoch += 1
+    writer.close()
+    results.put({'host': host, 'batches': batches, 'rows': rows,
+                 'raw_bytes': raw_bytes, 'failures': failures})
+
+
+def stored_rows(hosts_dir, host):
+    total = 0
+    for name in os.listdir(os.path.join(hosts_dir, host)):
+        if name.endswith('_metrics.csv'):
+            with open(os.path.join(hosts_dir, host, name), 'rb') as f:
+                total += sum(1 for _ in f)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--server', default='dev', choices=list(SERVERS))
+    parser.add_argument('--nodes', type=int, default=4)
+    parser.add_argument('--batch', type=int, default=500, help='Rows per push')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    with synthetic_dirs(0) as dirs, running_server(dirs, args.server) as (_, port):
+        url = f'http://127.0.0.1:{port}/api/ingest'
+        results = multiprocessing.Queue()
+        nodes = [multiprocessing.Process(target=node, args=(url, f'node{i}', args.batch,
+                                                            args.duration, results))
+                 for i in range(args.nodes)]
+        start = time.perf_counter()
+        for process in nodes:
+            process.start()
+        per_node = [results.get() for _ in nodes]
+        for process in nodes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        hosts_dir = os.path.join(dirs['data'], 'hosts')
+        stored = sum(stored_rows(hosts_dir, result['host']) for result in per_node
+                     if os.path.isdir(os.path.join(hosts_dir, result['host'])))
+
+    rows = sum(result['rows'] for result in per_node)
+    batches = sum(result['batches'] for result in per_node)
+    sample = '\n'.join(synthetic_batch(args.batch, time.time())).encode() + b'\n'
+    summary = {
+        'server': args.server,
+        'nodes': args.nodes,
+        'batch': args.batch,
+        'rows': rows,
+        'stored': stored,
+        'failures': sum(result['failures'] for result in per_node),
+        'rows_per_sec': round(rows / elapsed, 1),
+        'batches_per_sec': round(batches / elapsed, 1),
+        'compression_ratio': round(len(sample) / len(gzip.compress(sample, compresslevel=6)), 1),
+    }
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    for key, value in summary.items():
+        print(f'{key:<18} {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the web API
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Drives each path with --concurrency keep-alive connections for
+--duration seconds and reports requests/sec and p50/p99 latency. Either
+point it at a running server with --url, or let it start one on
+synthetic data with --server dev|gunicorn to compare the two:
+
+    python3 bench/load_test.py --server dev
+    python3 bench/load_test.py --server gunicorn
+    python3 bench/load_test.py --url http://localhost:8080
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from contextlib import ExitStack
+from urllib.parse import urlsplit
+
+from fixtures import SERVERS, running_server, synthetic_dirs
+
+DEFAULT_PATHS = ['/api/metrics/latest', '/api/stats']
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def worker(host, port, path, deadline, latencies, errors):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def load(host, port, path, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=worker, args=(host, port, path, deadline, latencies, errors))
+               for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'path': path,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='Base URL of a running server')
+    parser.add_argument('--server', default='dev', choices=list(SERVERS),
+                        help='Server to start on synthetic data when --url is not given')
+    parser.add_argument('--rows', type=int, default=10000,
+                        help='Synthetic rows per metric file')
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            dirs = stack.enter_context(synthetic_dirs(args.rows))
+            host, (_, port) = '127.0.0.1', stack.enter_context(running_server(dirs, args.server))
+        # Warm the caches so the numbers reflect steady state
+        for path in args.paths:
+            load(host, port, path, 1, 0.5)
+        results = [load(host, port, path, args.concurrency, args.duration)
+                   for path in args.paths]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f'{"path":<24} {"req/s":>10} {"p50 ms":>10} {"p99 ms":>10} {"errors":>8}')
+    for result in results:
+        print(f'{result["path"]:<24} {result["rps"]:>10.1f} {result["p50_ms"]:>10.2f} '
+              f'{result["p99_ms"]:>10.2f} {result["errors"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Storage backend benchmark: CSV scan vs columnar segments vs SQLite
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Builds (or reuses) a suite fixture of --rows samples per family, imports
+it into data/metrics.db with the migration tool, then runs the same
+reads and writes against each store:
+
+  latest    newest sample time of one family
+  range     every sample of the last --window seconds
+  summary   min/max/mean of every column over the last --window seconds
+  history   300 mean buckets over the whole fixture (query.history)
+  cycle     appending one collection cycle of all six families
+
+The CSV column is the path without a typed store: each read parses the
+whole file and filters it (only ``latest`` seeks to the last line), and
+each cycle appends a line per family. Times are medians of --repeat
+calls in milliseconds:
+
+    python3 bench/storage_bench.py --rows 1m
+    python3 bench/storage_bench.py --rows 10k --json
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from fixtures import parse_size, write_fixtures
+from sysmon.collector import METRICS, Collector, CsvWriter
+from sysmon.query import history
+from sysmon.storage import ColumnarReader, ColumnarWriter, parse_timestamp, read_csv_rows
+from sysmon.tail import read_last_line
+from sysmon.tsdb import DB_FILE, SqliteReader, SqliteWriter, migrate_csv
+
+BACKENDS = ('csv', 'columnar', 'sqlite')
+METRIC = 'cpu'
+
+
+class CsvScanReader(ColumnarReader):
+    """ColumnarReader interface answered by parsing the CSV files"""
+
+    def latest_ts(self, metric):
+        line = read_last_line(os.path.join(self.root, f'{metric}_metrics.csv'))
+        return parse_timestamp(line.split(b',', 1)[0].decode()) if line else None
+
+    def query(self, metric, start=None, end=None):
+        np = self.np
+        rows = [row for row in read_csv_rows(os.path.join(self.root, f'{metric}_metrics.csv'),
+                                             metric)
+                if (start is None or row[0] >= start) and (end is None or row[0] <= end)]
+        columns = list(zip(*rows)) or [()] * (len(self.schemas[metric]) + 1)
+        names = [('ts', 'i8')] + list(self.schemas[metric])
+        return {name: np.array(column, dtype='<' + dtype)
+                for (name, dtype), column in zip(names, columns)}
+
+
+def median_ms(call, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def time_reads(readers, window, repeat):
+    """{case: {backend: median ms}} of the read cases"""
+    end = readers['columnar'].latest_ts(METRIC)
+    start = end - window
+    cases = {
+        'latest': lambda reader: reader.latest_ts(METRIC),
+        'range': lambda reader: reader.query(METRIC, start, end),
+        'summary': lambda reader: reader.summary(METRIC, start, end),
+        'history': lambda reader: history(reader, METRIC, 0, end),
+    }
+    results = {}
+    for case, run in cases.items():
+        results[case] = {}
+        for backend, reader in readers.items():
+            # The CSV scans take seconds at 1M rows; a few calls are enough
+            calls = max(1, repeat // 10) if backend == 'csv' and case != 'latest' else repeat
+            run(reader)  # Warm the page cache and statement caches
+            results[case][backend] = median_ms(lambda: run(reader), calls)
+    return results
+
+
+def time_cycles(cycles):
+    """{backend: median ms} to append one collection cycle"""
+    with Collector() as collector:
+        sample = collector.collect_all()
+    now = int(time.time())
+    batches = [{metric: dataclasses.replace(sample[metric], time=now + i) for metric in METRICS}
+               for i in range(cycles)]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        writers = {
+            'csv': CsvWriter(os.path.join(tmp, 'csv')),
+            'columnar': ColumnarWriter(os.path.join(tmp, 'columnar')),
+            'sqlite': SqliteWriter(os.path.join(tmp, DB_FILE)),
+        }
+        for backend, writer in writers.items():
+            timings = []
+            for samples in batches:
+                start = time.perf_counter()
+                writer.write_all(samples)
+                timings.append(time.perf_counter() - start)
+            writer.close()
+            results[backend] = round(statistics.median(timings) * 1000, 3)
+    return results
+
+
+def store_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(directory, name))
+               for directory, _, names in os.walk(path) for name in names)
+
+
+def run(root, rows, window, repeat, cycles):
+    dirs = write_fixtures(root, rows)
+    db_path = os.path.join(dirs['data'], DB_FILE)
+    imported = None
+    if not os.path.exists(db_path):
+        start = time.perf_counter()
+        migrated = migrate_csv(dirs['data'], db_path)
+        elapsed = time.perf_counter() - start
+        imported = {'rows': sum(migrated.values()), 'seconds': round(elapsed, 1),
+                    'rows_per_sec': round(sum(migrated.values()) / elapsed)}
+
+    readers = {
+        'csv': CsvScanReader(dirs['data']),
+        'columnar': ColumnarReader(os.path.join(dirs['data'], 'columnar')),
+        'sqlite': SqliteReader(db_path),
+    }
+    results = time_reads(readers, window, repeat)
+    readers['sqlite'].close()
+    results['cycle'] = time_cycles(cycles)
+
+    csv_bytes = sum(store_size(os.path.join(dirs['data'], f'{metric}_metrics.csv'))
+                    for metric in METRICS)
+    return {
+        'rows': rows,
+        'window': window,
+        'import': imported,
+        'bytes': {'csv': csv_bytes,
+                  'columnar': store_size(os.path.join(dirs['data'], 'columnar')),
+                  'sqlite': store_size(db_path)},
+        'ms': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', default='1m', help='Fixture size: 10k, 1m, 10m or a row count')
+    parser.add_argument('--window', type=int, default=3600,
+                        help='Seconds covered by the range and summary cases')
+    parser.add_argument('--repeat', type=int, default=20, help='Calls per read case')
+    parser.add_argument('--cycles', type=int, default=500, help='Collection cycles appended')
+    parser.add_argument('--fixtures', help='Directory to keep (and reuse) the fixture in')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    rows = parse_size(args.rows)
+    if args.fixtures:
+        os.makedirs(args.fixtures, exist_ok=True)
+        result = run(args.fixtures, rows, args.window, args.repeat, args.cycles)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = run(tmp, rows, args.window, args.repeat, args.cycles)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    if result['import']:
+        print(f"import     {result['import']['rows']} rows in {result['import']['seconds']} s "
+              f"({result['import']['rows_per_sec']} rows/s)")
+    print(f"{'case':<10}" + ''.join(f'{backend:>12}' for backend in BACKENDS))
+    print(f"{'MB':<10}" + ''.join(f"{result['bytes'][backend] / 2 ** 20:>12.1f}"
+                                   for backend in BACKENDS))
+    for case, timings in result['ms'].items():
+        print(f'{case:<10}' + ''.join(f'{timings[backend]:>12.3f}' for backend in BACKENDS))
+
+
+if __name__ == '__main__':
+    main()
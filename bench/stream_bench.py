@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Dashboard fan-out benchmark: push stream vs polling
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Starts web/server.py on synthetic data, appends one row per metric every
+--interval seconds and keeps N dashboards connected, either to
+/api/stream or polling /api/metrics/latest + /api/alerts. Reports the
+server's CPU time per wall second so the two can be compared as N grows.
+A stream client that is not answered with a 200 text/event-stream
+response (e.g. a 503 past STREAM_MAX_CLIENTS) is counted as refused, and
+the run exits non-zero when any was.
+
+    python3 bench/stream_bench.py --clients 1 10 100 --duration 20
+"""
+
+import argparse
+import http.client
+import json
+import socket
+import sys
+import threading
+import time
+
+from fixtures import SERVERS, append_rows, cpu_seconds, running_server, synthetic_dirs
+
+
+def stream_client(port, stop, received, refused):
+    with socket.create_connection(('127.0.0.1', port), timeout=0.5) as sock:
+        sock.sendall(b'GET /api/stream HTTP/1.1\r\nHost: localhost\r\n'
+                     b'Accept: text/event-stream\r\n\r\n')
+        head = b''
+        while b'\r\n\r\n' not in head and not stop.is_set():
+            try:
+                chunk = sock.recv(65536)
+            except socket.timeout:
+                continue
+            if not chunk:
+                break
+            head += chunk
+        head, _, chunk = head.partition(b'\r\n\r\n')
+        status, *headers = head.decode('latin-1').split('\r\n')
+        content_type = next((value.strip() for name, _, value in
+                             (header.partition(':') for header in headers)
+                             if name.lower() == 'content-type'), '')
+        if status.split(' ')[1:2] != ['200'] or not content_type.startswith('text/event-stream'):
+            refused.append(status or 'no response')
+            return
+        received[0] += chunk.count(b'event:')
+        while not stop.is_set():
+            try:
+                chunk = sock.recv(65536)
+            except socket.timeout:
+                continue
+            if not chunk:
+                break
+            received[0] += chunk.count(b'event:')
+
+
+def poll_client(port, stop, received, refused, interval):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    while not stop.is_set():
+        for path in ('/api/metrics/latest', '/api/alerts'):
+            conn.request('GET', path)
+            json.loads(conn.getresponse().read())
+            received[0] += 1
+        stop.wait(interval)
+    conn.close()
+
+
+def run(mode, clients, duration, interval, poll_interval, server='dev'):
+    with synthetic_dirs() as dirs, running_server(dirs, server) as (process, port):
+        stop = threading.Event()
+        received = [0]
+        refused = []
+        if mode == 'stream':
+            target, extra = stream_client, ()
+        else:
+            target, extra = poll_client, (poll_interval,)
+        threads = [threading.Thread(target=target, args=(port, stop, received, refused, *extra),
+                                    daemon=True) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(1)
+
+        start_cpu, start = cpu_seconds(process.pid), time.monotonic()
+        ticks = 0
+        while time.monotonic() - start < duration:
+            append_rows(dirs['data'], dirs['log_file'], ticks)
+            ticks += 1
+            time.sleep(interval)
+        elapsed = time.monotonic() - start
+        used = cpu_seconds(process.pid) - start_cpu
+
+        stop.set()
+        return {'mode': mode, 'clients': clients, 'seconds': round(elapsed, 2),
+                'server_cpu_pct': round(100 * used / elapsed, 2),
+                'messages': received[0], 'refused': len(refused)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='Seconds between appended samples')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='Seconds between requests of a polling dashboard')
+    parser.add_argument('--modes', nargs='+', default=['stream', 'poll'],
+                        choices=['stream', 'poll'])
+    parser.add_argument('--server', default='dev', choices=list(SERVERS))
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    results = [run(mode, clients, args.duration, args.interval, args.poll_interval, args.server)
+               for mode in args.modes for clients in args.clients]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f'{"mode":<8} {"clients":>8} {"server CPU %":>13} {"messages":>10} {"refused":>8}')
+        for result in results:
+            print(f'{result["mode"]:<8} {result["clients"]:>8} '
+                  f'{result["server_cpu_pct"]:>13.2f} {result["messages"]:>10} '
+                  f'{result["refused"]:>8}')
+    if any(result['refused'] for result in results):
+        sys.exit('Some stream clients were refused; their numbers are not comparable')
+
+
+if __name__ == '__main__':
+    main()
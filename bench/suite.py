@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the collector, web API and GUI update paths
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Generates synthetic data/*_metrics.csv, columnar and logs/*.log fixtures
+of each --rows size and times, each in a fresh child process:
+
+  web:<METHOD> <path>   every web/server.py endpoint through Flask's test client
+  monitor.sh:cycle      one batched monitor.sh collection cycle
+  gui:tick              one SystemMonitorGUI.update_all_metrics tick
+                        (collect on the worker + render), headless
+
+For every case it records the first (cold cache) call, the median and
+minimum of --repeat warm calls, peak RSS and processes forked per call.
+Forks are read from the system-wide counter in /proc/stat, so run it on
+an otherwise quiet machine. Results are written as JSON and can be
+compared with an earlier run:
+
+    python3 bench/suite.py --rows 10k 1m --output before.json
+    python3 bench/suite.py --rows 10k 1m --output after.json --compare before.json
+    python3 bench/suite.py --rows 10m --fixtures /var/tmp/bench --only web
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+from fixtures import ROOT, fork_count, parse_size, peak_rss_kb, write_fixtures
+
+GROUPS = ('web', 'monitor.sh', 'gui')
+
+# URL arguments for the endpoints' path variables
+PATH_VALUES = {'metric_type': 'cpu'}
+
+# Extra variants of endpoints whose cost depends on the query
+VARIANTS = {
+    'get_metric_history': ['?from={start}&to={end}&points=300',
+                           '?from={start}&to={end}&step=raw&format=binary'],
+    'get_metric_summary': ['?from={start}&to={end}'],
+    'get_log': ['?lines=200&offset=1000'],
+}
+
+# /api/stream never ends; bench/stream_bench.py measures it
+SKIPPED_ENDPOINTS = ('static', 'stream')
+
+INGEST_ROWS = 500
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+def measure(call, repeat):
+    """Time one cold and ``repeat`` warm calls of ``call``"""
+    baseline_kb = peak_rss_kb()
+    forks = fork_count()
+    start = time.perf_counter()
+    call()
+    first = time.perf_counter() - start
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    forks = fork_count() - forks
+    return {
+        'first_ms': milliseconds(first),
+        'median_ms': milliseconds(statistics.median(times)) if times else None,
+        'min_ms': milliseconds(min(times)) if times else None,
+        'peak_rss_kb': peak_rss_kb(),
+        'baseline_rss_kb': baseline_kb,
+        'forks_per_call': round(forks / (repeat + 1), 2),
+    }
+
+
+################################################################################
+# Cases (run in the child process)
+################################################################################
+
+def set_environment(dirs):
+    os.environ.update(DATA_DIR=dirs['data'], LOG_DIR=dirs['logs'], REPORT_DIR=dirs['reports'])
+
+
+def web_requests(dirs):
+    """[(case name, method, url, body)] for every route of web/server.py"""
+    set_environment(dirs)
+    sys.path.insert(0, os.path.join(ROOT, 'web'))
+    import server
+
+    end = int(time.time())
+    values = {'start': end - 86400, 'end': end}
+    files = {'get_report': os.path.basename(dirs['report_file']),
+             'get_log': os.path.basename(dirs['log_file'])}
+    requests = []
+    for rule in sorted(server.app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if rule.endpoint in SKIPPED_ENDPOINTS:
+            continue
+        arguments = {name: PATH_VALUES.get(name) or files[rule.endpoint]
+                     for name in rule.arguments}
+        path = rule.build(arguments)[1]
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            body = None
+            if rule.endpoint == 'ingest':
+                path += '?host=bench-node'
+                body = ''.join(f'{time.strftime("%Y%m%d_%H%M%S")},CPU,12.5,8,0.52, 0.48, 0.41,45.0\n'
+                               for _ in range(INGEST_ROWS))
+            elif rule.endpoint == 'create_report':
+                path += '?window=1h'
+            requests.append((f'web:{method} {path}', method, path, body))
+            if method == 'GET':
+                # Named after the template so runs at different times compare
+                for query in VARIANTS.get(rule.endpoint, []):
+                    requests.append((f'web:{method} {path}{query}', method,
+                                     path + query.format(**values), None))
+    return server, requests
+
+
+def run_web_case(name, dirs, repeat):
+    server, requests = web_requests(dirs)
+    _, method, url, body = next(request for request in requests if request[0] == name)
+    client = server.app.test_client()
+    statuses = set()
+
+    def call():
+        response = client.open(url, method=method, data=body)
+        response.get_data()
+        statuses.add(response.status_code)
+
+    result = measure(call, repeat)
+    result['status'] = sorted(statuses)
+    return result
+
+
+def run_cycle_case(dirs, repeat):
+    """Batched monitor.sh collection cycles against the fixture directories"""
+    script = (f'source "{os.path.join(ROOT, "monitor.sh")}"\n'
+              f'LOG_DIR="{dirs["logs"]}" REPORT_DIR="{dirs["reports"]}" DATA_DIR="{dirs["data"]}"\n'
+              f'LOG_FILE="{dirs["log_file"]}" BATCHED_COLLECTION=1\n'
+              'collect_cycle > /dev/null\n'
+              # The peak of the bash process itself, read without forking
+              'while read -r key value _; do\n'
+              '    if [ "$key" = "VmHWM:" ]; then echo "$value"; fi\n'
+              'done < /proc/$$/status\n')
+    peaks = []
+
+    def call():
+        output = subprocess.run(['bash', '-c', script], check=True, capture_output=True,
+                                text=True).stdout
+        peaks.append(int(output.split()[-1]))
+
+    result = measure(call, repeat)
+    result['peak_rss_kb'] = max(peaks)
+    del result['baseline_rss_kb']
+    # Each call also forks the bash process itself
+    result['forks_per_call'] = round(result['forks_per_call'] - 1, 2)
+    return result
+
+
+class _Widget:
+    """Accepts any Tk call and returns nothing"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def winfo_width(self):
+        return 200
+
+    def winfo_height(self):
+        return 40
+
+    def get(self, *args):
+        return ''
+
+    def index(self, *args):
+        return '1.0'
+
+
+class _Root(_Widget):
+    """Tk root whose after() jobs only run when the benchmark asks"""
+
+    def after(self, delay, callback=None, *args):
+        return None
+
+
+def install_fake_tk():
+    tk = types.ModuleType('tkinter')
+    for name in ('Tk', 'Frame', 'Label', 'Button', 'StringVar', 'Canvas', 'Text'):
+        setattr(tk, name, _Widget)
+    for name in ('END', 'BOTH', 'X', 'Y', 'LEFT', 'RIGHT', 'TOP', 'BOTTOM', 'WORD',
+                 'W', 'E', 'N', 'S', 'NSEW', 'NORMAL', 'DISABLED'):
+        setattr(tk, name, name.lower())
+    ttk = types.ModuleType('tkinter.ttk')
+    for name in ('Style', 'Frame', 'Label', 'LabelFrame', 'Button', 'Combobox'):
+        setattr(ttk, name, _Widget)
+    scrolledtext = types.ModuleType('tkinter.scrolledtext')
+    scrolledtext.ScrolledText = _Widget
+    tk.ttk, tk.scrolledtext = ttk, scrolledtext
+    sys.modules.update({'tkinter': tk, 'tkinter.ttk': ttk, 'tkinter.scrolledtext': scrolledtext})
+
+
+def run_gui_case(dirs, repeat):
+    """One tick: queue a request, wait for the worker's results, render them"""
+    install_fake_tk()
+    sys.path.insert(0, ROOT)
+    # The GUI writes to ./data; keep that inside the fixture
+    os.chdir(os.path.dirname(dirs['data']))
+    import monitor_gui
+
+    app = monitor_gui.SystemMonitorGUI(_Root())
+    app.monitoring = True
+
+    def call():
+        app.update_all_metrics()
+        while app.results.empty():
+            time.sleep(0.0005)
+        app.drain_results()
+
+    try:
+        result = measure(call, repeat)
+    finally:
+        app.stop_worker()
+    result['frame_ms'] = round(app.frame_ms, 3)
+    return result
+
+
+def run_case(name, dirs, repeat):
+    if name.startswith('web:'):
+        return run_web_case(name, dirs, repeat)
+    if name == 'monitor.sh:cycle':
+        return run_cycle_case(dirs, repeat)
+    if name == 'gui:tick':
+        return run_gui_case(dirs, repeat)
+    raise ValueError(f'Unknown case: {name}')
+
+
+################################################################################
+# Driver
+################################################################################
+
+def case_names(dirs, groups):
+    names = []
+    if 'web' in groups:
+        # Listed by a child too, so the parent never imports the server
+        output = subprocess.run([sys.executable, __file__, '--list', dirs['root'],
+                                 '--rows', str(dirs['rows'])],
+                                check=True, capture_output=True, text=True).stdout
+        names += json.loads(output)
+    if 'monitor.sh' in groups:
+        names.append('monitor.sh:cycle')
+    if 'gui' in groups:
+        names.append('gui:tick')
+    return names
+
+
+def run_child(name, dirs, repeat):
+    output = subprocess.run([sys.executable, __file__, '--case', name, dirs['root'],
+                             '--rows', str(dirs['rows']), '--repeat', str(repeat)],
+                            capture_output=True, text=True)
+    if output.returncode != 0:
+        return {'error': output.stderr.strip().splitlines()[-1] if output.stderr else 'failed'}
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def fixture_dirs(root, rows):
+    dirs = write_fixtures(root, rows)
+    dirs.update(root=root, rows=rows)
+    return dirs
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', '-C', ROOT, 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline):
+    """Print median time and peak RSS against an earlier run"""
+    previous = {(entry['case'], entry['rows']): entry for entry in baseline['results']}
+    print(f'\n{"case":<58} {"rows":>9} {"before ms":>10} {"after ms":>10} {"ratio":>7} {"+rss KB":>9}')
+    for entry in results:
+        old = previous.get((entry['case'], entry['rows']))
+        if not old or entry.get('median_ms') is None or old.get('median_ms') is None:
+            continue
+        ratio = entry['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+        print(f'{entry["case"]:<58} {entry["rows"]:>9} {old["median_ms"]:>10.2f} '
+              f'{entry["median_ms"]:>10.2f} {ratio:>7.2f} '
+              f'{entry["peak_rss_kb"] - old["peak_rss_kb"]:>9}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', nargs='+', default=['10k'],
+                        help='Fixture sizes: 10k, 1m, 10m or a row count')
+    parser.add_argument('--only', nargs='+', choices=GROUPS, default=list(GROUPS))
+    parser.add_argument('--repeat', type=int, default=5, help='Warm calls per case')
+    parser.add_argument('--fixtures', help='Directory to keep (and reuse) the fixtures in')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--list', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('root', nargs='?', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child processes: the fixture in ``root`` already exists
+    if args.list:
+        dirs = fixture_dirs(args.root, parse_size(args.rows[0]))
+        print(json.dumps([name for name, *_ in web_requests(dirs)[1]]))
+        return
+    if args.case:
+        dirs = fixture_dirs(args.root, parse_size(args.rows[0]))
+        print(json.dumps(run_case(args.case, dirs, args.repeat)))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for size in args.rows:
+            rows = parse_size(size)
+            root = os.path.join(args.fixtures or scratch, f'rows_{rows}')
+            start = time.perf_counter()
+            dirs = fixture_dirs(root, rows)
+            print(f'# {rows} rows: fixtures ready in {time.perf_counter() - start:.1f}s',
+                  file=sys.stderr)
+            for name in case_names(dirs, args.only):
+                result = dict(case=name, rows=rows, **run_child(name, dirs, args.repeat))
+                results.append(result)
+                print(f'{name:<58} {rows:>9} '
+                      + (f'{result["median_ms"]:>10.2f} ms  {result["peak_rss_kb"]:>8} KB  '
+                         f'{result["forks_per_call"]:>6} forks'
+                         if 'error' not in result else f'  error: {result["error"]}'),
+                      file=sys.stderr)
+
+    report = {
+        'commit': git_commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -18,14 +18,44 @@ LOG_DIR="./logs"
 REPORT_DIR="./reports"
 DATA_DIR="./data"
 TIMESTAMP=$(date +"%Y%m%d_%H%M%S")
-LOG_FILE="$LOG_DIR/monitor_$TIMESTAMP.log"
+# One log per day, however many times the script runs
+LOG_FILE="$LOG_DIR/monitor_${TIMESTAMP%%_*}.log"
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
-# Thresholds for alerts
+# Set USE_PY_COLLECTOR=0 to force the Bash collectors. Otherwise monitor,
+# continuous and the single-metric modes run `python3 -m sysmon`, which
+# also fills data/columnar/ and data/process_metrics.csv for the web API
+USE_PY_COLLECTOR="${USE_PY_COLLECTOR:-1}"
+
+# Set BATCHED_COLLECTION=0 to run the six monitor_* functions per cycle
+BATCHED_COLLECTION="${BATCHED_COLLECTION:-1}"
+
+# Thresholds for alerts. The Python collector, the GUI, the web server and
+# the Bash cycles (through `python3 -m sysmon check`) apply rules.yaml
+# (ALERT_RULES), which reads these as ${CPU_THRESHOLD} etc. and adds
+# durations, hysteresis and anomaly rules. Only without python3 do the
+# Bash cycles compare against the plain thresholds themselves
 CPU_THRESHOLD=80
 MEMORY_THRESHOLD=85
 DISK_THRESHOLD=90
 TEMP_THRESHOLD=75
 
+# Seconds between samples of each metric family in continuous mode, and
+# while any metric is above its threshold. Override some or all of them,
+# e.g. SAMPLE_INTERVALS="cpu=2,disk=600"
+DEFAULT_SAMPLE_INTERVALS="cpu=1,memory=1,disk=300,gpu=10,network=5,system=5"
+DEFAULT_FAST_SAMPLE_INTERVALS="cpu=0.5,memory=0.5,disk=30,gpu=2,network=1,system=1"
+SAMPLE_INTERVALS="${SAMPLE_INTERVALS:-}"
+FAST_SAMPLE_INTERVALS="${FAST_SAMPLE_INTERVALS:-}"
+
+# History covered by `./monitor.sh report` (seconds, or 30m, 24h, 7d, ...)
+REPORT_WINDOW="${REPORT_WINDOW:-24h}"
+
+# Seconds between retention passes in continuous mode (0 = off). The
+# policies themselves (CSV_ROTATE_SIZE, LOG_RETENTION, ...) are read from
+# the environment by `python3 -m sysmon retain`
+RETENTION_INTERVAL="${RETENTION_INTERVAL:-3600}"
+
 ################################################################################
 # Utility Functions
 ################################################################################
@@ -66,16 +96,201 @@ handle_error() {
     echo "Error: $error_message" >&2
 }
 
+# Check whether the in-process Python collector (sysmon/) can be used
+python_collector_available() {
+    [ "$USE_PY_COLLECTOR" = "1" ] && command -v python3 &> /dev/null && \
+        [ -f "$SCRIPT_DIR/sysmon/collector.py" ]
+}
+
+# Run the in-process Python collector with this script's configuration
+run_python_collector() {
+    CPU_THRESHOLD=$CPU_THRESHOLD MEMORY_THRESHOLD=$MEMORY_THRESHOLD \
+    DISK_THRESHOLD=$DISK_THRESHOLD TEMP_THRESHOLD=$TEMP_THRESHOLD \
+    PYTHONPATH="$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}" \
+        python3 -m sysmon "$@" --data-dir "$DATA_DIR" --log-file "$LOG_FILE"
+}
+
+################################################################################
+# Collector State
+################################################################################
+
+# CPU usage and network rates are deltas against the previous sample. The
+# continuous loop keeps the previous counters in memory; one-shot runs load
+# and save them in $DATA_DIR/.collector_state (same format as sysmon):
+#   cpu <total jiffies> <idle jiffies>          (cpu0, cpu1, ... per core)
+#   net <iface> <epoch us> <rx bytes> <tx bytes> <rx packets> <tx packets>
+
+declare -A PREV_CPU=()
+PREV_NET=""
+
+# A saved sample fewer jiffies ago than this is too close to measure over
+MIN_CPU_WINDOW=10
+STATE_LOADED=0
+PERSIST_STATE=1
+
+load_collector_state() {
+    [ "$STATE_LOADED" = "1" ] && return
+    STATE_LOADED=1
+    [ "$PERSIST_STATE" = "1" ] || return
+    local name first second rest
+    while read -r name first second rest; do
+        case $name in
+            cpu*) [ -z "$rest" ] && PREV_CPU[$name]="$first $second" ;;
+            net) PREV_NET="$first $second $rest" ;;
+        esac
+    done 2>/dev/null < "$DATA_DIR/.collector_state"
+}
+
+save_collector_state() {
+    [ "$PERSIST_STATE" = "1" ] || return
+    local name
+    {
+        for name in "${!PREV_CPU[@]}"; do
+            printf '%s %s\n' "$name" "${PREV_CPU[$name]}"
+        done
+        [ -n "$PREV_NET" ] && printf 'net %s\n' "$PREV_NET"
+    } 2>/dev/null > "$DATA_DIR/.collector_state"
+}
+
+# Set USAGE to the busy percentage of one /proc/stat cpu line since the
+# previous sample (since boot when there is none)
+cpu_line_usage() {
+    local name user nice system idle iowait irq softirq steal _
+    read -r name user nice system idle iowait irq softirq steal _ <<< "$1"
+    # user nice system idle iowait irq softirq steal (guest is in user)
+    local total=$((user + nice + system + idle + iowait + irq + softirq + steal))
+    idle=$((idle + iowait))
+    local prev_total prev_idle delta_total=$total delta_idle=$idle
+    read -r prev_total prev_idle <<< "${PREV_CPU[$name]}"
+    PREV_CPU[$name]="$total $idle"
+    if [ -n "$prev_total" ] && (( total > prev_total && idle >= prev_idle )); then
+        delta_total=$((total - prev_total))
+        delta_idle=$((idle - prev_idle))
+    fi
+    local tenths=0
+    if (( delta_total > 0 )); then
+        tenths=$(( (1000 * (delta_total - delta_idle) + delta_total / 2) / delta_total ))
+    fi
+    USAGE="$((tenths / 10)).$((tenths % 10))"
+}
+
+# Set CPU_USAGE, CPU_CORES and the per-core list (CSV suffix and JSON) from
+# /proc/stat without forking
+sample_cpu() {
+    load_collector_state
+    local lines line
+    mapfile -t lines < /proc/stat
+    local _ user nice system idle iowait irq softirq steal prev_total
+    read -r _ user nice system idle iowait irq softirq steal _ <<< "${lines[0]}"
+    read -r prev_total _ <<< "${PREV_CPU[cpu]}"
+    if [ -z "$prev_total" ] || { [ "$PERSIST_STATE" = "1" ] && \
+        (( user + nice + system + idle + iowait + irq + softirq + steal - prev_total < MIN_CPU_WINDOW )); }; then
+        # No usable previous sample: use a short window instead of since-boot
+        for line in "${lines[@]}"; do
+            [[ $line == cpu* ]] || break
+            cpu_line_usage "$line"
+        done
+        sleep 0.1
+    fi
+    mapfile -t lines < /proc/stat
+    CPU_CORES=0
+    CPU_PER_CORE=""
+    CPU_PER_CORE_JSON=""
+    for line in "${lines[@]}"; do
+        [[ $line == cpu* ]] || break
+        cpu_line_usage "$line"
+        if [[ $line == "cpu "* ]]; then
+            CPU_USAGE=$USAGE
+        else
+            CPU_CORES=$((CPU_CORES + 1))
+            CPU_PER_CORE+=",$USAGE"
+            CPU_PER_CORE_JSON+="${CPU_PER_CORE_JSON:+, }\"$USAGE\""
+        fi
+    done
+}
+
+# Format a count of tenths as a decimal
+tenths() {
+    printf -v "$1" '%d.%d' $(($2 / 10)) $(($2 % 10))
+}
+
+# Set NET_INTERFACE, the cumulative NET_* counters and the per-second
+# NET_RX_RATE/NET_TX_RATE/NET_RX_PPS/NET_TX_PPS (N/A without a previous sample)
+sample_network() {
+    load_collector_state
+    NET_INTERFACE=""
+    local iface destination flags
+    {
+        read -r _  # Header
+        while read -r iface destination _ flags _; do
+            if [ "$destination" = "00000000" ] && (( 0x$flags & 1 )); then
+                NET_INTERFACE=$iface
+                break
+            fi
+        done
+    } 2>/dev/null < /proc/net/route
+    NET_INTERFACE=${NET_INTERFACE:-eth0}
+    
+    local stats="/sys/class/net/$NET_INTERFACE/statistics"
+    read -r NET_RX_BYTES 2>/dev/null < "$stats/rx_bytes" || NET_RX_BYTES=0
+    read -r NET_TX_BYTES 2>/dev/null < "$stats/tx_bytes" || NET_TX_BYTES=0
+    read -r NET_RX_PACKETS 2>/dev/null < "$stats/rx_packets" || NET_RX_PACKETS=0
+    read -r NET_TX_PACKETS 2>/dev/null < "$stats/tx_packets" || NET_TX_PACKETS=0
+    
+    local now
+    if [ -n "$EPOCHREALTIME" ]; then
+        now=${EPOCHREALTIME/[.,]/}
+    else
+        printf -v now '%(%s)T' -1
+        now=$((now * 1000000))
+    fi
+    
+    NET_RX_RATE="N/A"
+    NET_TX_RATE="N/A"
+    NET_RX_PPS="N/A"
+    NET_TX_PPS="N/A"
+    local prev_iface prev_time prev_rx prev_tx prev_rx_packets prev_tx_packets
+    read -r prev_iface prev_time prev_rx prev_tx prev_rx_packets prev_tx_packets <<< "$PREV_NET"
+    local elapsed_ms=$(( (now - ${prev_time:-$now}) / 1000 ))
+    if [ "$prev_iface" = "$NET_INTERFACE" ] && (( elapsed_ms > 0 )) && \
+        (( NET_RX_BYTES >= prev_rx && NET_TX_BYTES >= prev_tx && \
+           NET_RX_PACKETS >= prev_rx_packets && NET_TX_PACKETS >= prev_tx_packets )); then
+        tenths NET_RX_RATE $(( (NET_RX_BYTES - prev_rx) * 10000 / elapsed_ms ))
+        tenths NET_TX_RATE $(( (NET_TX_BYTES - prev_tx) * 10000 / elapsed_ms ))
+        tenths NET_RX_PPS $(( (NET_RX_PACKETS - prev_rx_packets) * 10000 / elapsed_ms ))
+        tenths NET_TX_PPS $(( (NET_TX_PACKETS - prev_tx_packets) * 10000 / elapsed_ms ))
+    fi
+    PREV_NET="$NET_INTERFACE $now $NET_RX_BYTES $NET_TX_BYTES $NET_RX_PACKETS $NET_TX_PACKETS"
+}
+
 ################################################################################
 # System Monitoring Functions
 ################################################################################
 
+# Set PROC_TOTAL, PROC_RUNNING and PROC_ZOMBIE from /proc/[pid]/stat
+count_processes() {
+    local stat_file stat_line state
+    PROC_TOTAL=0 PROC_RUNNING=0 PROC_ZOMBIE=0
+    for stat_file in /proc/[0-9]*/stat; do
+        read -r stat_line 2>/dev/null < "$stat_file" || continue
+        PROC_TOTAL=$((PROC_TOTAL + 1))
+        state=${stat_line##*) }
+        case ${state%% *} in
+            R) PROC_RUNNING=$((PROC_RUNNING + 1)) ;;
+            Z) PROC_ZOMBIE=$((PROC_ZOMBIE + 1)) ;;
+        esac
+    done
+}
+
 # Monitor CPU usage and temperature
 monitor_cpu() {
     log_message "INFO" "Collecting CPU metrics..."
     
-    local cpu_usage=$(top -bn1 | grep "Cpu(s)" | sed "s/.*, *\([0-9.]*\)%* id.*/\1/" | awk '{print 100 - $1}')
-    local cpu_cores=$(nproc)
+    # Usage since the previous run, from /proc/stat instead of forking top
+    sample_cpu
+    save_collector_state
+    local cpu_usage=$CPU_USAGE
+    local cpu_cores=$CPU_CORES
     local load_avg=$(uptime | awk -F'load average:' '{print $2}' | xargs)
     
     # Try to get CPU temperature (may not work on all systems)
@@ -87,15 +302,18 @@ monitor_cpu() {
     fi
     
     # Save data
-    echo "$TIMESTAMP,CPU,$cpu_usage,$cpu_cores,$load_avg,$cpu_temp" >> "$DATA_DIR/cpu_metrics.csv"
+    echo "$TIMESTAMP,CPU,$cpu_usage,$cpu_cores,$load_avg,$cpu_temp$CPU_PER_CORE" >> "$DATA_DIR/cpu_metrics.csv"
     
     # Check thresholds
+    THRESHOLD_BREACH[cpu]=0
     if (( $(echo "$cpu_usage > $CPU_THRESHOLD" | bc -l 2>/dev/null || echo "0") )); then
         log_message "WARNING" "CPU usage is high: ${cpu_usage}%"
+        THRESHOLD_BREACH[cpu]=1
     fi
     
     if [ "$cpu_temp" != "N/A" ] && (( $(echo "$cpu_temp > $TEMP_THRESHOLD" | bc -l 2>/dev/null || echo "0") )); then
         log_message "WARNING" "CPU temperature is high: ${cpu_temp}°C"
+        THRESHOLD_BREACH[cpu]=1
     fi
     
     # Return JSON-like format for easy parsing
@@ -105,7 +323,8 @@ monitor_cpu() {
   "cpu_usage": "$cpu_usage",
   "cpu_cores": "$cpu_cores",
   "load_average": "$load_avg",
-  "temperature": "$cpu_temp"
+  "temperature": "$cpu_temp",
+  "per_core": [$CPU_PER_CORE_JSON]
 }
 EOF
 }
@@ -168,8 +387,10 @@ monitor_disk() {
     echo "$TIMESTAMP,DISK,$disk_usage,$disk_total,$disk_used,$disk_available,$smart_status" >> "$DATA_DIR/disk_metrics.csv"
     
     # Check threshold
+    THRESHOLD_BREACH[disk]=0
     if [ "$disk_usage" -gt "$DISK_THRESHOLD" ] 2>/dev/null; then
         log_message "WARNING" "Disk usage is high: ${disk_usage}%"
+        THRESHOLD_BREACH[disk]=1
     fi
     
     cat <<EOF
@@ -203,8 +424,10 @@ monitor_memory() {
     echo "$TIMESTAMP,MEMORY,$mem_total,$mem_used,$mem_free,$mem_available,$mem_percent,$swap_total,$swap_used" >> "$DATA_DIR/memory_metrics.csv"
     
     # Check threshold
+    THRESHOLD_BREACH[memory]=0
     if (( $(echo "$mem_percent > $MEMORY_THRESHOLD" | bc -l 2>/dev/null || echo "0") )); then
         log_message "WARNING" "Memory usage is high: ${mem_percent}%"
+        THRESHOLD_BREACH[memory]=1
     fi
     
     cat <<EOF
@@ -226,17 +449,14 @@ EOF
 monitor_network() {
     log_message "INFO" "Collecting network metrics..."
     
-    local primary_interface=$(ip route | grep default | awk '{print $5}' | head -n1)
-    
-    if [ -z "$primary_interface" ]; then
-        primary_interface="eth0"
-    fi
-    
-    # Get network statistics
-    local rx_bytes=$(cat "/sys/class/net/$primary_interface/statistics/rx_bytes" 2>/dev/null || echo "0")
-    local tx_bytes=$(cat "/sys/class/net/$primary_interface/statistics/tx_bytes" 2>/dev/null || echo "0")
-    local rx_packets=$(cat "/sys/class/net/$primary_interface/statistics/rx_packets" 2>/dev/null || echo "0")
-    local tx_packets=$(cat "/sys/class/net/$primary_interface/statistics/tx_packets" 2>/dev/null || echo "0")
+    # Counters and their rates since the previous run
+    sample_network
+    save_collector_state
+    local primary_interface=$NET_INTERFACE
+    local rx_bytes=$NET_RX_BYTES
+    local tx_bytes=$NET_TX_BYTES
+    local rx_packets=$NET_RX_PACKETS
+    local tx_packets=$NET_TX_PACKETS
     
     # Convert to human-readable format
     local rx_mb=$(awk "BEGIN {printf \"%.2f\", $rx_bytes/1024/1024}")
@@ -249,7 +469,7 @@ monitor_network() {
     local connection_status=$(cat "/sys/class/net/$primary_interface/operstate" 2>/dev/null || echo "unknown")
     
     # Save data
-    echo "$TIMESTAMP,NETWORK,$primary_interface,$rx_mb,$tx_mb,$rx_packets,$tx_packets,$ip_address,$connection_status" >> "$DATA_DIR/network_metrics.csv"
+    echo "$TIMESTAMP,NETWORK,$primary_interface,$rx_mb,$tx_mb,$rx_packets,$tx_packets,$ip_address,$connection_status,$NET_RX_RATE,$NET_TX_RATE,$NET_RX_PPS,$NET_TX_PPS" >> "$DATA_DIR/network_metrics.csv"
     
     cat <<EOF
 {
@@ -260,7 +480,11 @@ monitor_network() {
   "rx_packets": "$rx_packets",
   "tx_packets": "$tx_packets",
   "ip_address": "$ip_address",
-  "status": "$connection_status"
+  "status": "$connection_status",
+  "rx_bytes_per_sec": "$NET_RX_RATE",
+  "tx_bytes_per_sec": "$NET_TX_RATE",
+  "rx_packets_per_sec": "$NET_RX_PPS",
+  "tx_packets_per_sec": "$NET_TX_PPS"
 }
 EOF
 }
@@ -274,9 +498,11 @@ monitor_system_load() {
     local load_5min=$(uptime | awk -F'load average:' '{print $2}' | awk -F',' '{print $2}' | xargs)
     local load_15min=$(uptime | awk -F'load average:' '{print $2}' | awk -F',' '{print $3}' | xargs)
     
-    local total_processes=$(ps aux | wc -l)
-    local running_processes=$(ps aux | grep -c " R ")
-    local zombie_processes=$(ps aux | grep -c " Z ")
+    # Process states from /proc instead of three ps aux pipelines
+    count_processes
+    local total_processes=$PROC_TOTAL
+    local running_processes=$PROC_RUNNING
+    local zombie_processes=$PROC_ZOMBIE
     
     local logged_users=$(who | wc -l)
     
@@ -299,107 +525,425 @@ EOF
 }
 
 ################################################################################
-# Report Generation
+# Batched Collection
 ################################################################################
 
-# Generate comprehensive report
-generate_report() {
-    log_message "INFO" "Generating comprehensive report..."
-    
-    local report_file="$REPORT_DIR/system_report_$TIMESTAMP.md"
-    
-    cat > "$report_file" <<'REPORT_HEADER'
-# System Monitoring Report
-
----
-
-## Report Information
-REPORT_HEADER
-
-    echo "- **Generated**: $(date '+%Y-%m-%d %H:%M:%S')" >> "$report_file"
-    echo "- **Hostname**: $(hostname)" >> "$report_file"
-    echo "- **OS**: $(uname -s) $(uname -r)" >> "$report_file"
-    echo "" >> "$report_file"
-    
-    echo "## System Overview" >> "$report_file"
-    echo "" >> "$report_file"
-    
-    # CPU Section
-    echo "### CPU Metrics" >> "$report_file"
-    local cpu_data=$(monitor_cpu)
-    echo '```' >> "$report_file"
-    echo "$cpu_data" >> "$report_file"
-    echo '```' >> "$report_file"
-    echo "" >> "$report_file"
-    
-    # Memory Section
-    echo "### Memory Metrics" >> "$report_file"
-    local mem_data=$(monitor_memory)
-    echo '```' >> "$report_file"
-    echo "$mem_data" >> "$report_file"
-    echo '```' >> "$report_file"
-    echo "" >> "$report_file"
-    
-    # Disk Section
-    echo "### Disk Metrics" >> "$report_file"
-    local disk_data=$(monitor_disk)
-    echo '```' >> "$report_file"
-    echo "$disk_data" >> "$report_file"
-    echo '```' >> "$report_file"
-    echo "" >> "$report_file"
-    
-    # GPU Section
-    echo "### GPU Metrics" >> "$report_file"
-    local gpu_data=$(monitor_gpu)
-    echo '```' >> "$report_file"
-    echo "$gpu_data" >> "$report_file"
-    echo '```' >> "$report_file"
-    echo "" >> "$report_file"
-    
-    # Network Section
-    echo "### Network Metrics" >> "$report_file"
-    local net_data=$(monitor_network)
-    echo '```' >> "$report_file"
-    echo "$net_data" >> "$report_file"
-    echo '```' >> "$report_file"
-    echo "" >> "$report_file"
-    
-    # System Load Section
-    echo "### System Load Metrics" >> "$report_file"
-    local load_data=$(monitor_system_load)
-    echo '```' >> "$report_file"
-    echo "$load_data" >> "$report_file"
-    echo '```' >> "$report_file"
-    echo "" >> "$report_file"
-    
-    # Alerts Section
-    echo "## Alerts and Warnings" >> "$report_file"
-    echo "" >> "$report_file"
-    if [ -f "$LOG_FILE" ]; then
-        local warnings=$(grep "WARNING" "$LOG_FILE" 2>/dev/null)
-        local errors=$(grep "ERROR" "$LOG_FILE" 2>/dev/null)
+# One pass per cycle: every kernel source is read once with shell builtins
+# and the six CSV rows are appended together at the end. Only df, ip and
+# who are forked (plus nvidia-smi when present and smartctl every
+# SMART_INTERVAL seconds), instead of several tools per metric.
+
+SMART_INTERVAL=300
+SMART_STATUS="N/A"
+SMART_CHECKED=""
+
+# Log lines of the current cycle, appended to the log file in one write
+LOG_BUFFER=""
+
+# Queue a log line in log_message's format without forking date
+buffer_log() {
+    local timestamp
+    printf -v timestamp '%(%Y-%m-%d %H:%M:%S)T' -1
+    LOG_BUFFER+="[$timestamp] [$1] $2"$'\n'
+}
+
+# Open checks, so a sustained breach logs one WARNING rather than one per cycle
+# (only used when python3 is missing and rules.yaml cannot be applied)
+declare -A ALERT_OPEN=()
+
+# Long-running `python3 -m sysmon check --follow` of continuous mode
+RULE_CHECKER_PID=""
+
+# Whether the shared rule engine (sysmon/rules.py) can be run
+rule_engine_available() {
+    command -v python3 &> /dev/null && [ -f "$SCRIPT_DIR/sysmon/rules.py" ]
+}
+
+# Keep one rule checker running for the whole continuous run, so each cycle
+# costs a pipe round trip instead of starting Python
+start_rule_checker() {
+    rule_engine_available || return 1
+    coproc RULE_CHECKER { run_python_collector check --follow 2>/dev/null; }
+}
+
+# Apply rules.yaml to the rows just appended for families $@ and set
+# THRESHOLD_BREACH from the answer; fails when the rules could not be run
+check_rules() {
+    local reply item
+    if [ -n "$RULE_CHECKER_PID" ] && kill -0 "$RULE_CHECKER_PID" 2>/dev/null; then
+        echo "$*" >&"${RULE_CHECKER[1]}" && read -r reply <&"${RULE_CHECKER[0]}" || return 1
+    else
+        rule_engine_available || return 1
+        reply=$(run_python_collector check --metrics "${*// /,}" 2>/dev/null) || return 1
+    fi
+    for item in $reply; do
+        THRESHOLD_BREACH[${item%%=*}]=${item#*=}
+    done
+}
+
+# Queue a WARNING when check $1 starts failing ($2=1) and an INFO line ($4)
+# once it passes again
+alert_transition() {
+    local key=$1 breached=$2
+    if [ "$breached" = "1" ]; then
+        [ "${ALERT_OPEN[$key]:-0}" = "1" ] && return
+        ALERT_OPEN[$key]=1
+        buffer_log "WARNING" "$3"
+    elif [ "${ALERT_OPEN[$key]:-0}" = "1" ]; then
+        ALERT_OPEN[$key]=0
+        buffer_log "INFO" "$4"
+    fi
+}
+
+# Succeeds when decimal $1 is greater than decimal $2 (replaces bc)
+decimal_gt() {
+    [[ $1 =~ ^[0-9]+(\.[0-9]+)?$ && $2 =~ ^[0-9]+(\.[0-9]+)?$ ]] || return 1
+    local a_frac="000000" b_frac="000000"
+    [[ $1 == *.* ]] && a_frac="${1#*.}000000"
+    [[ $2 == *.* ]] && b_frac="${2#*.}000000"
+    (( 10#${1%%.*} * 1000000 + 10#${a_frac:0:6} > 10#${2%%.*} * 1000000 + 10#${b_frac:0:6} ))
+}
+
+# Collect the given metric families (default: all six) in one pass
+collect_batched() {
+    local now family
+    local -A want=()
+    for family in "${@:-${METRIC_FAMILIES[@]}}"; do
+        want[$family]=1
+    done
+    printf -v TIMESTAMP '%(%Y%m%d_%H%M%S)T' -1
+    printf -v now '%(%s)T' -1
+    if [ ${#want[@]} -eq ${#METRIC_FAMILIES[@]} ]; then
+        buffer_log "INFO" "Collecting all metrics in one pass..."
+    fi
+    
+    local load_1min load_5min load_15min
+    read -r load_1min load_5min load_15min _ < /proc/loadavg
+    
+    # CPU: usage since the previous cycle (or the previous run)
+    local cpu_usage="" cpu_temp="N/A" millidegrees
+    if [[ -v want[cpu] ]]; then
+        sample_cpu
+        cpu_usage=$CPU_USAGE
+        if read -r millidegrees 2>/dev/null < /sys/class/thermal/thermal_zone0/temp; then
+            printf -v cpu_temp '%d.%03d' $((millidegrees / 1000)) $((millidegrees % 1000))
+            while [[ $cpu_temp == *.*0 ]]; do cpu_temp=${cpu_temp%0}; done
+            cpu_temp=${cpu_temp%.}
+        fi
+    fi
+    
+    # Memory: /proc/meminfo in kB, reported in MB like free -m
+    local key value _
+    local mem_total=0 mem_free=0 mem_available="" swap_total=0 swap_free=0
+    [[ -v want[memory] ]] && while IFS=': ' read -r key value _; do
+        case $key in
+            MemTotal) mem_total=$value ;;
+            MemFree) mem_free=$value ;;
+            MemAvailable) mem_available=$value ;;
+            SwapTotal) swap_total=$value ;;
+            SwapFree) swap_free=$value ;;
+        esac
+    done < /proc/meminfo
+    mem_available=${mem_available:-$mem_free}
+    local mem_used=$((mem_total - mem_available))
+    local mem_hundredths=0
+    if [ "$mem_total" -gt 0 ]; then
+        mem_hundredths=$(( (mem_used * 10000 + mem_total / 2) / mem_total ))
+    fi
+    local mem_percent
+    printf -v mem_percent '%d.%02d' $((mem_hundredths / 100)) $((mem_hundredths % 100))
+    
+    # Disk: a single df for every column, SMART only every SMART_INTERVAL
+    local disk_device disk_total disk_used disk_available disk_usage=""
+    [[ -v want[disk] ]] && \
+        { read -r _; read -r disk_device disk_total disk_used disk_available disk_usage _; } \
+        < <(df -hP / 2>/dev/null)
+    disk_usage=${disk_usage%\%}
+    if [[ -v want[disk] ]] && command -v smartctl &> /dev/null && \
+        { [ -z "$SMART_CHECKED" ] || (( now - SMART_CHECKED >= SMART_INTERVAL )); }; then
+        SMART_CHECKED=$now
+        # Whole disk of the root partition (/dev/sda1 -> /dev/sda)
+        while [[ $disk_device == *[0-9] ]]; do disk_device=${disk_device%?}; done
+        SMART_STATUS="N/A"
+        local smart_line
+        while read -r smart_line; do
+            if [[ $smart_line == *"SMART overall-health"* ]]; then
+                SMART_STATUS=${smart_line##* }
+            fi
+        done < <(sudo -n smartctl -H "$disk_device" 2>/dev/null)
+    fi
+    
+    # GPU: every field from one nvidia-smi query
+    local gpu_info="N/A" gpu_usage="N/A" gpu_memory="N/A" gpu_temp="N/A"
+    if [[ ! -v want[gpu] ]]; then
+        :
+    elif command -v nvidia-smi &> /dev/null; then
+        local mem_used_gpu mem_total_gpu
+        IFS=',' read -r gpu_usage mem_used_gpu mem_total_gpu gpu_temp gpu_info < <(
+            nvidia-smi --query-gpu=utilization.gpu,memory.used,memory.total,temperature.gpu,name \
+                --format=csv,noheader,nounits 2>/dev/null)
+        gpu_usage=${gpu_usage:-N/A}
+        gpu_memory="${mem_used_gpu# }, ${mem_total_gpu# }"
+        gpu_temp=${gpu_temp# }
+        gpu_info=${gpu_info# }
+        gpu_info=${gpu_info:-N/A}
+    elif command -v radeontop &> /dev/null; then
+        gpu_info="AMD GPU"
+        gpu_usage=$(timeout 1s radeontop -d - -l 1 2>/dev/null | grep -oP 'gpu \K[0-9.]+' || echo "N/A")
+    fi
+    
+    # Network: default route, counters and rates without forking
+    local primary_interface rx_mb tx_mb ip_address="N/A" address connection_status="unknown"
+    if [[ -v want[network] ]]; then
+        sample_network
+        primary_interface=$NET_INTERFACE
+        local rx_hundredths=$(( (NET_RX_BYTES * 100 + 524288) / 1048576 ))
+        local tx_hundredths=$(( (NET_TX_BYTES * 100 + 524288) / 1048576 ))
+        printf -v rx_mb '%d.%02d' $((rx_hundredths / 100)) $((rx_hundredths % 100))
+        printf -v tx_mb '%d.%02d' $((tx_hundredths / 100)) $((tx_hundredths % 100))
         
-        if [ -n "$warnings" ] || [ -n "$errors" ]; then
-            echo "### Warnings" >> "$report_file"
-            echo '```' >> "$report_file"
-            echo "$warnings" >> "$report_file"
-            echo '```' >> "$report_file"
-            echo "" >> "$report_file"
-            
-            echo "### Errors" >> "$report_file"
-            echo '```' >> "$report_file"
-            echo "$errors" >> "$report_file"
-            echo '```' >> "$report_file"
-        else
-            echo "No warnings or errors detected." >> "$report_file"
+        read -r _ _ _ address _ < <(ip -4 -o addr show "$primary_interface" 2>/dev/null)
+        [ -n "$address" ] && ip_address=${address%%/*}
+        
+        read -r connection_status 2>/dev/null < "/sys/class/net/$primary_interface/operstate" || \
+            connection_status="unknown"
+    fi
+    
+    # System: process states from /proc/[pid]/stat, users from who
+    local total_processes=0 running_processes=0 zombie_processes=0
+    local users logged_users=0
+    if [[ -v want[system] ]]; then
+        count_processes
+        total_processes=$PROC_TOTAL
+        running_processes=$PROC_RUNNING
+        zombie_processes=$PROC_ZOMBIE
+        mapfile -t users < <(who 2>/dev/null)
+        logged_users=${#users[@]}
+    fi
+    
+    # One append per file for the whole cycle
+    {
+        [[ -v want[cpu] ]] && \
+        printf '%s\n' "$TIMESTAMP,CPU,$cpu_usage,$CPU_CORES,$load_1min, $load_5min, $load_15min,$cpu_temp$CPU_PER_CORE" >&3
+        [[ -v want[memory] ]] && \
+        printf '%s\n' "$TIMESTAMP,MEMORY,$((mem_total / 1024)),$((mem_used / 1024)),$((mem_free / 1024)),$((mem_available / 1024)),$mem_percent,$((swap_total / 1024)),$(((swap_total - swap_free) / 1024))" >&4
+        [[ -v want[disk] ]] && \
+        printf '%s\n' "$TIMESTAMP,DISK,$disk_usage,$disk_total,$disk_used,$disk_available,$SMART_STATUS" >&5
+        [[ -v want[gpu] ]] && \
+        printf '%s\n' "$TIMESTAMP,GPU,$gpu_info,$gpu_usage,$gpu_memory,$gpu_temp" >&6
+        [[ -v want[network] ]] && \
+        printf '%s\n' "$TIMESTAMP,NETWORK,$primary_interface,$rx_mb,$tx_mb,$NET_RX_PACKETS,$NET_TX_PACKETS,$ip_address,$connection_status,$NET_RX_RATE,$NET_TX_RATE,$NET_RX_PPS,$NET_TX_PPS" >&7
+        [[ -v want[system] ]] && \
+        printf '%s\n' "$TIMESTAMP,SYSTEM,$load_1min,$load_5min,$load_15min,$total_processes,$running_processes,$zombie_processes,$logged_users" >&8
+    } 3>> "$DATA_DIR/cpu_metrics.csv" 4>> "$DATA_DIR/memory_metrics.csv" \
+      5>> "$DATA_DIR/disk_metrics.csv" 6>> "$DATA_DIR/gpu_metrics.csv" \
+      7>> "$DATA_DIR/network_metrics.csv" 8>> "$DATA_DIR/system_metrics.csv"
+    
+    [ -n "$LOG_BUFFER" ] && printf '%s' "$LOG_BUFFER" >> "$LOG_FILE"
+    LOG_BUFFER=""
+    save_collector_state
+    
+    # The shared rule engine logs the incidents itself
+    check_rules "${!want[@]}" && return
+    
+    # Without python3: plain thresholds, one WARNING per breach
+    local usage_high=0 temp_high=0 mem_high=0 disk_high=0
+    if [[ -v want[cpu] ]]; then
+        decimal_gt "$cpu_usage" "$CPU_THRESHOLD" && usage_high=1
+        decimal_gt "$cpu_temp" "$TEMP_THRESHOLD" && temp_high=1
+        alert_transition cpu_usage "$usage_high" "CPU usage is high: ${cpu_usage}%" \
+            "CPU usage back to normal: ${cpu_usage}%"
+        alert_transition cpu_temperature "$temp_high" "CPU temperature is high: ${cpu_temp}°C" \
+            "CPU temperature back to normal: ${cpu_temp}°C"
+        THRESHOLD_BREACH[cpu]=$((usage_high | temp_high))
+    fi
+    if [[ -v want[memory] ]]; then
+        decimal_gt "$mem_percent" "$MEMORY_THRESHOLD" && mem_high=1
+        alert_transition memory_percent "$mem_high" "Memory usage is high: ${mem_percent}%" \
+            "Memory usage back to normal: ${mem_percent}%"
+        THRESHOLD_BREACH[memory]=$mem_high
+    fi
+    if [[ -v want[disk] ]]; then
+        decimal_gt "$disk_usage" "$DISK_THRESHOLD" && disk_high=1
+        alert_transition disk_usage "$disk_high" "Disk usage is high: ${disk_usage}%" \
+            "Disk usage back to normal: ${disk_usage}%"
+        THRESHOLD_BREACH[disk]=$disk_high
+    fi
+    
+    [ -n "$LOG_BUFFER" ] && printf '%s' "$LOG_BUFFER" >> "$LOG_FILE"
+    LOG_BUFFER=""
+}
+
+# Run one collection cycle for the given metric families (default: all six)
+collect_cycle() {
+    if [ "$BATCHED_COLLECTION" = "1" ]; then
+        collect_batched "$@"
+        return
+    fi
+    local family
+    for family in "${@:-${METRIC_FAMILIES[@]}}"; do
+        case $family in
+            system) monitor_system_load > /dev/null ;;
+            *) "monitor_$family" > /dev/null ;;
+        esac
+    done
+}
+
+################################################################################
+# Adaptive Scheduling
+################################################################################
+
+# Continuous mode keeps one deadline per metric family on the monotonic
+# /proc/uptime clock. Deadlines sit on a fixed grid (anchor + interval), so
+# collection time never shifts later samples and ticks missed by a slow
+# cycle are skipped rather than run back to back. While any threshold is
+# exceeded the fast intervals apply. Same behaviour as sysmon/scheduler.py.
+
+METRIC_FAMILIES=(cpu memory disk gpu network system)
+declare -A INTERVAL_MS=() FAST_INTERVAL_MS=() ANCHOR_MS=()
+declare -A THRESHOLD_BREACH=()
+FAST_SAMPLING=0
+
+# Set MONOTONIC_MS from /proc/uptime, which wall clock changes do not move
+monotonic_ms() {
+    local uptime _
+    read -r uptime _ < /proc/uptime
+    local frac="${uptime#*.}000"
+    MONOTONIC_MS=$((10#${uptime%.*} * 1000 + 10#${frac:0:3}))
+}
+
+# Parse "cpu=1,disk=300" into the associative array named $2 (milliseconds)
+parse_intervals() {
+    local -n intervals=$2
+    local items item family seconds frac
+    IFS=',' read -ra items <<< "$1"
+    for item in "${items[@]}"; do
+        family=${item%%=*}
+        seconds=${item#*=}
+        case $family in
+            cpu|memory|disk|gpu|network|system) ;;
+            *) echo "Unknown metric family in interval: $item" >&2; return 1 ;;
+        esac
+        if ! [[ $seconds =~ ^[0-9]+(\.[0-9]+)?$ ]]; then
+            echo "Invalid interval: $item" >&2
+            return 1
+        fi
+        frac=000
+        [[ $seconds == *.* ]] && frac="${seconds#*.}000"
+        intervals[$family]=$((10#${seconds%%.*} * 1000 + 10#${frac:0:3}))
+        if (( intervals[$family] <= 0 )); then
+            echo "Interval must be positive: $item" >&2
+            return 1
         fi
+    done
+}
+
+# Set INTERVAL to the current interval of family $1 in milliseconds
+family_interval() {
+    INTERVAL=${INTERVAL_MS[$1]}
+    if [ "$FAST_SAMPLING" = "1" ] && (( FAST_INTERVAL_MS[$1] < INTERVAL )); then
+        INTERVAL=${FAST_INTERVAL_MS[$1]}
     fi
+}
+
+# Collect each metric family on its own schedule until interrupted
+run_scheduled() {
+    parse_intervals "$DEFAULT_SAMPLE_INTERVALS" INTERVAL_MS && \
+        parse_intervals "$SAMPLE_INTERVALS" INTERVAL_MS && \
+        parse_intervals "$DEFAULT_FAST_SAMPLE_INTERVALS" FAST_INTERVAL_MS && \
+        parse_intervals "$FAST_SAMPLE_INTERVALS" FAST_INTERVAL_MS || return 1
     
-    echo "" >> "$report_file"
-    echo "---" >> "$report_file"
-    echo "*Report generated by System Monitor v1.0*" >> "$report_file"
+    local family deadline next delay breach anchor due
+    monotonic_ms
+    for family in "${METRIC_FAMILIES[@]}"; do
+        # Every family is due on the first tick
+        ANCHOR_MS[$family]=$((MONOTONIC_MS - INTERVAL_MS[$family]))
+    done
+    log_message "INFO" "Continuous monitoring started: ${SAMPLE_INTERVALS:-$DEFAULT_SAMPLE_INTERVALS}"
+    local retention_due=$MONOTONIC_MS
+    [ "$BATCHED_COLLECTION" = "1" ] && start_rule_checker
     
-    log_message "INFO" "Report generated: $report_file"
+    while true; do
+        monotonic_ms
+        if (( RETENTION_INTERVAL > 0 && MONOTONIC_MS >= retention_due )); then
+            retention_due=$((MONOTONIC_MS + RETENTION_INTERVAL * 1000))
+            run_retention > /dev/null &
+        fi
+        due=()
+        next=""
+        for family in "${METRIC_FAMILIES[@]}"; do
+            family_interval "$family"
+            deadline=$((ANCHOR_MS[$family] + INTERVAL))
+            if (( deadline <= MONOTONIC_MS )); then
+                due+=("$family")
+            elif [ -z "$next" ] || (( deadline < next )); then
+                next=$deadline
+            fi
+        done
+        if [ ${#due[@]} -eq 0 ]; then
+            delay=$((next - MONOTONIC_MS))
+            printf -v delay '%d.%03d' $((delay / 1000)) $((delay % 1000))
+            sleep "$delay"
+            continue
+        fi
+        
+        collect_cycle "${due[@]}"
+        
+        # Advance to the next grid point, skipping ticks missed while collecting
+        monotonic_ms
+        for family in "${due[@]}"; do
+            family_interval "$family"
+            anchor=$((ANCHOR_MS[$family] + INTERVAL))
+            if (( anchor + INTERVAL <= MONOTONIC_MS )); then
+                anchor=$((anchor + (MONOTONIC_MS - anchor) / INTERVAL * INTERVAL))
+            fi
+            ANCHOR_MS[$family]=$anchor
+        done
+        
+        breach=0
+        for family in "${!THRESHOLD_BREACH[@]}"; do
+            [ "${THRESHOLD_BREACH[$family]}" = "1" ] && breach=1
+        done
+        if [ "$breach" != "$FAST_SAMPLING" ]; then
+            FAST_SAMPLING=$breach
+            if [ "$breach" = "1" ]; then
+                log_message "INFO" "Threshold exceeded, sampling at the fast intervals: ${FAST_SAMPLE_INTERVALS:-$DEFAULT_FAST_SAMPLE_INTERVALS}"
+            else
+                log_message "INFO" "All metrics below thresholds, back to the normal intervals"
+            fi
+        fi
+    done
+}
+
+# Rotate, compress and expire old data, logs and reports
+run_retention() {
+    if ! command -v python3 &> /dev/null; then
+        log_message "WARNING" "Retention needs python3; data/ and logs/ are not trimmed"
+        return 1
+    fi
+    run_python_collector retain --log-dir "$LOG_DIR" --report-dir "$REPORT_DIR"
+}
+
+################################################################################
+# Report Generation
+################################################################################
+
+# Generate comprehensive report
+generate_report() {
+    log_message "INFO" "Generating comprehensive report..." >&2
+    
+    # Summarises the stored history in one pass; nothing is collected, so
+    # a report never appends rows to the CSVs
+    if ! command -v python3 &> /dev/null; then
+        log_message "ERROR" "Reports need python3" >&2
+        return 1
+    fi
+    # stdout carries only the report path, which main prints
+    local report_file
+    report_file=$(run_python_collector report --report-dir "$REPORT_DIR" \
+        --log-dir "$LOG_DIR" --window "$REPORT_WINDOW") || return 1
+    
+    log_message "INFO" "Report generated: $report_file" >&2
     echo "$report_file"
 }
 
@@ -420,12 +964,11 @@ main() {
     case "${1:-monitor}" in
         monitor)
             echo "Running full system monitoring..."
-            monitor_cpu > /dev/null
-            monitor_memory > /dev/null
-            monitor_disk > /dev/null
-            monitor_gpu > /dev/null
-            monitor_network > /dev/null
-            monitor_system_load > /dev/null
+            if python_collector_available; then
+                run_python_collector monitor
+                exit $?
+            fi
+            collect_cycle
             echo -e "${GREEN}Monitoring complete!${NC}"
             ;;
         report)
@@ -435,42 +978,43 @@ main() {
             ;;
         continuous)
             echo "Starting continuous monitoring (Ctrl+C to stop)..."
-            while true; do
-                monitor_cpu > /dev/null
-                monitor_memory > /dev/null
-                monitor_disk > /dev/null
-                monitor_gpu > /dev/null
-                monitor_network > /dev/null
-                monitor_system_load > /dev/null
-                echo -e "${GREEN}[$(date '+%H:%M:%S')] Monitoring cycle complete${NC}"
-                sleep 60
-            done
-            ;;
-        cpu)
-            monitor_cpu
-            ;;
-        memory)
-            monitor_memory
-            ;;
-        disk)
-            monitor_disk
-            ;;
-        gpu)
-            monitor_gpu
+            if python_collector_available; then
+                # One long-lived process reading /proc instead of forking per metric
+                run_python_collector continuous \
+                    --intervals "$DEFAULT_SAMPLE_INTERVALS,$SAMPLE_INTERVALS" \
+                    --fast-intervals "$DEFAULT_FAST_SAMPLE_INTERVALS,$FAST_SAMPLE_INTERVALS" \
+                    --retention-interval "$RETENTION_INTERVAL" \
+                    --log-dir "$LOG_DIR" --report-dir "$REPORT_DIR"
+                exit $?
+            fi
+            # Previous counters stay in memory between cycles
+            PERSIST_STATE=0
+            run_scheduled
+            exit $?
             ;;
-        network)
-            monitor_network
+        retain)
+            echo "Applying retention policies..."
+            run_retention
             ;;
-        system)
-            monitor_system_load
+        cpu|memory|disk|gpu|network|system)
+            if python_collector_available; then
+                # Prints the same JSON sample as the Bash function
+                run_python_collector "$1"
+                exit $?
+            fi
+            case $1 in
+                system) monitor_system_load ;;
+                *) "monitor_$1" ;;
+            esac
             ;;
         *)
-            echo "Usage: $0 {monitor|report|continuous|cpu|memory|disk|gpu|network|system}"
+            echo "Usage: $0 {monitor|report|continuous|retain|cpu|memory|disk|gpu|network|system}"
             echo ""
             echo "Commands:"
             echo "  monitor     - Run single monitoring cycle for all components"
-            echo "  report      - Generate comprehensive markdown report"
-            echo "  continuous  - Run continuous monitoring (every 60 seconds)"
+            echo "  report      - Summarise stored data (REPORT_WINDOW, default 24h) as markdown"
+            echo "  continuous  - Run continuous monitoring (per-metric adaptive intervals)"
+            echo "  retain      - Rotate, compress and expire old data, logs and reports"
             echo "  cpu         - Monitor CPU only"
             echo "  memory      - Monitor memory only"
             echo "  disk        - Monitor disk only"
@@ -482,5 +1026,7 @@ main() {
     esac
 }
 
-# Run main function
-main "$@"
+# Run main function (skipped when sourced, e.g. by bench/cycle_bench.sh)
+if [[ "${BASH_SOURCE[0]}" == "$0" ]]; then
+    main "$@"
+fi
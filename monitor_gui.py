@@ -8,10 +8,82 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext
 import subprocess
 import json
+import os
+import queue
 import threading
 import time
 from datetime import datetime
 import platform
+from array import array
+
+from sysmon import selfstats
+from sysmon.collector import METRICS, Collector, CsvWriter
+from sysmon.report import generate_report
+from sysmon.rules import AlertRules, MonitorLog, default_rules, dict_columns, load_rules
+from sysmon.storage import ColumnarWriter
+from sysmon.tsdb import BACKEND, DB_FILE, SqliteWriter
+
+# How often the Tk thread drains collected results (milliseconds)
+DRAIN_INTERVAL = 100
+
+# Samples kept per card sparkline and its canvas size in pixels
+SPARKLINE_POINTS = 120
+SPARKLINE_WIDTH = 240
+SPARKLINE_HEIGHT = 40
+SPARKLINE_PAD = 2
+
+class Sparkline:
+    """Last samples of one card in a ring buffer, drawn as a single Canvas line"""
+    
+    def __init__(self, canvas, scale=None, size=SPARKLINE_POINTS,
+                 width=SPARKLINE_WIDTH, height=SPARKLINE_HEIGHT, color="#4a9eff"):
+        self.canvas = canvas
+        self.scale = scale  # Fixed top of the chart (100 for percentages), None to autoscale
+        self.size = size
+        self.width = width
+        self.height = height
+        # Preallocated, so a card's memory does not grow with uptime
+        self.values = array('d', bytes(8 * size))
+        self.coords = array('d', bytes(16 * size))
+        self.head = 0
+        self.count = 0
+        self.dirty = False
+        self.item = canvas.create_line(0, height, 0, height, fill=color, width=1.5)
+        canvas.bind("<Configure>", self.resize)
+    
+    def push(self, value):
+        """Record a sample; non-numeric values (N/A) are ignored"""
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return
+        self.values[self.head] = max(value, 0.0)
+        self.head = (self.head + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        self.dirty = True
+    
+    def resize(self, event):
+        self.width = event.width
+        self.height = event.height
+        self.dirty = True
+    
+    def draw(self):
+        """Move the existing line item onto the buffered samples"""
+        if not self.dirty or self.count < 2:
+            return
+        self.dirty = False
+        count, size, values, coords = self.count, self.size, self.values, self.coords
+        # Unused slots are zero, so the whole buffer can be scanned
+        top = self.scale or max(values) or 1.0
+        step = (self.width - 2 * SPARKLINE_PAD) / (size - 1)
+        left = self.width - SPARKLINE_PAD - step * (count - 1)
+        bottom = self.height - SPARKLINE_PAD
+        span = (self.height - 2 * SPARKLINE_PAD) / top
+        start = self.head - count
+        for i in range(count):
+            coords[2 * i] = left + step * i
+            coords[2 * i + 1] = bottom - min(values[(start + i) % size], top) * span
+        self.canvas.coords(self.item, coords[:2 * count].tolist())
 
 class SystemMonitorGUI:
     def __init__(self, root):
@@ -25,6 +97,42 @@ class SystemMonitorGUI:
         self.update_interval = 2000  # milliseconds
         self.is_windows = platform.system() == "Windows"
         
+        # In-process collector; Windows still goes through monitor.sh in WSL
+        self.collector = None if self.is_windows else Collector()
+        self.writers = [] if self.is_windows else [
+            CsvWriter("./data"),
+            SqliteWriter(os.path.join("./data", DB_FILE)) if BACKEND == 'sqlite'
+            else ColumnarWriter("./data/columnar")]
+        if selfstats.STATS is not None:
+            os.makedirs("./data", exist_ok=True)
+            selfstats.STATS.start_writer(os.path.join("./data", selfstats.SELF_STATS_FILE), 'gui')
+        
+        # Same alert rules, state file and log as the collector: one line per
+        # incident in logs/, where /api/alerts and the stream pick it up
+        try:
+            rules, rules_error = load_rules(), None
+        except ValueError as e:
+            rules, rules_error = default_rules(), str(e)
+        alert_log = MonitorLog(os.path.join("./logs", f"monitor_{time.strftime('%Y%m%d')}.log"),
+                               quiet=True)
+        self.alert_rules = AlertRules("./data", alert_log, rules)
+        self.breached = {}
+        
+        # One persistent worker collects; the Tk thread only renders. Both
+        # queues hold a single entry, so a slow collector skips ticks
+        # instead of piling up requests or stale results.
+        self.tick_requests = queue.Queue(maxsize=1)
+        self.results = queue.Queue(maxsize=1)
+        self.messages = queue.Queue()
+        self.skipped_ticks = 0
+        self.frame_ms = 0.0
+        self._tick_job = None
+        self._pending = {}
+        self._widget_state = {}
+        self._stop = threading.Event()
+        self.worker = threading.Thread(target=self.collect_worker, name="collector",
+                                       daemon=True)
+        
         # Style configuration
         self.setup_styles()
         
@@ -34,8 +142,14 @@ class SystemMonitorGUI:
         self.create_control_panel()
         self.create_alerts_section()
         self.create_status_bar()
+        if rules_error:
+            self.log_message(f"Alert rules not loaded ({rules_error}), using the default thresholds",
+                             "WARNING")
         
         # Start monitoring
+        self.worker.start()
+        self._drain_due = time.monotonic()
+        self.drain_results()
         self.start_monitoring()
     
     def setup_styles(self):
@@ -98,20 +212,24 @@ class SystemMonitorGUI:
         top_row = ttk.Frame(metrics_container)
         top_row.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
-        self.cpu_card = self.create_metric_card(top_row, "CPU", "💻")
-        self.memory_card = self.create_metric_card(top_row, "Memory", "🧠")
-        self.disk_card = self.create_metric_card(top_row, "Disk", "💾")
+        self.cpu_card = self.create_metric_card(top_row, "CPU", "💻", scale=100)
+        self.memory_card = self.create_metric_card(top_row, "Memory", "🧠", scale=100)
+        self.disk_card = self.create_metric_card(top_row, "Disk", "💾", scale=100)
         
         # Bottom row (GPU, Network, System)
         bottom_row = ttk.Frame(metrics_container)
         bottom_row.pack(fill=tk.BOTH, expand=True)
         
-        self.gpu_card = self.create_metric_card(bottom_row, "GPU", "🎮")
+        self.gpu_card = self.create_metric_card(bottom_row, "GPU", "🎮", scale=100)
         self.network_card = self.create_metric_card(bottom_row, "Network", "🌐")
         self.system_card = self.create_metric_card(bottom_row, "System Load", "⚙️")
+        
+        self.sparklines = [card['spark'] for card in (
+            self.cpu_card, self.memory_card, self.disk_card,
+            self.gpu_card, self.network_card, self.system_card)]
     
-    def create_metric_card(self, parent, title, icon):
-        """Create a metric display card"""
+    def create_metric_card(self, parent, title, icon, scale=None):
+        """Create a metric display card with a sparkline of recent values"""
         # Card frame
         card_frame = ttk.Frame(parent, style="Card.TFrame")
         card_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
@@ -131,6 +249,11 @@ class SystemMonitorGUI:
         value_label = ttk.Label(card_frame, text="--", style="Value.TLabel")
         value_label.pack(pady=10)
         
+        # Sparkline of the main value
+        canvas = tk.Canvas(card_frame, width=SPARKLINE_WIDTH, height=SPARKLINE_HEIGHT,
+                           bg="#2d2d2d", highlightthickness=0)
+        canvas.pack(fill=tk.X, padx=15)
+        
         # Details section
         details_frame = ttk.Frame(card_frame, style="Card.TFrame")
         details_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=(0, 15))
@@ -145,6 +268,7 @@ class SystemMonitorGUI:
         return {
             'frame': card_frame,
             'value': value_label,
+            'spark': Sparkline(canvas, scale),
             'details': detail_labels
         }
     
@@ -217,6 +341,13 @@ class SystemMonitorGUI:
                                      background="#1e1e1e")
         self.status_label.pack(side=tk.LEFT, padx=20, pady=5)
         
+        self.perf_label = ttk.Label(status_frame,
+                                   text="",
+                                   font=("Segoe UI", 9),
+                                   foreground="#888888",
+                                   background="#1e1e1e")
+        self.perf_label.pack(side=tk.LEFT, padx=20, pady=5)
+        
         self.time_label = ttk.Label(status_frame,
                                    text="",
                                    font=("Segoe UI", 9),
@@ -264,138 +395,236 @@ class SystemMonitorGUI:
             self.log_message(f"Parse error: {str(e)}", "ERROR")
         return None
     
-    def update_cpu_metrics(self):
+    def collect_metric(self, metric):
+        """Collect one metric family in the same shape as monitor.sh's JSON"""
+        if self.collector is None:
+            output = self.run_monitor_command(metric)
+            return self.parse_json_output(output) if output else None
+        
+        try:
+            sample = self.collector.collect(metric)
+            for writer in self.writers:
+                writer.write(metric, sample)
+            return sample.to_dict()
+        except Exception as e:
+            self.log_message(f"Error collecting {metric} metrics: {str(e)}", "ERROR")
+            return None
+    
+    def update_cpu_metrics(self, data):
         """Update CPU metrics"""
-        output = self.run_monitor_command("cpu")
-        if output:
-            data = self.parse_json_output(output)
-            if data:
-                usage = float(data.get('cpu_usage', 0))
-                self.cpu_card['value'].config(text=f"{usage:.1f}%")
-                
-                self.cpu_card['details'][0].config(text=f"Cores: {data.get('cpu_cores', 'N/A')}")
-                self.cpu_card['details'][1].config(text=f"Load: {data.get('load_average', 'N/A')}")
-                self.cpu_card['details'][2].config(text=f"Temp: {data.get('temperature', 'N/A')}°C")
-                
-                # Check threshold
-                if usage > 80:
-                    self.cpu_card['value'].config(foreground="#ff4444")
-                    self.log_message(f"CPU usage high: {usage:.1f}%", "WARNING")
-                else:
-                    self.cpu_card['value'].config(foreground="#4a9eff")
-    
-    def update_memory_metrics(self):
+        if data:
+            usage = float(data.get('cpu_usage', 0))
+            self.set_widget(self.cpu_card['value'], text=f"{usage:.1f}%")
+            self.cpu_card['spark'].push(usage)
+            
+            self.set_widget(self.cpu_card['details'][0], text=f"Cores: {data.get('cpu_cores', 'N/A')}")
+            self.set_widget(self.cpu_card['details'][1], text=f"Load: {data.get('load_average', 'N/A')}")
+            self.set_widget(self.cpu_card['details'][2], text=f"Temp: {data.get('temperature', 'N/A')}°C")
+            
+            # Red while one of the metric's alert rules is breached
+            self.set_widget(self.cpu_card['value'],
+                            foreground="#ff4444" if self.breached.get('cpu') else "#4a9eff")
+    
+    def update_memory_metrics(self, data):
         """Update memory metrics"""
-        output = self.run_monitor_command("memory")
-        if output:
-            data = self.parse_json_output(output)
-            if data:
-                percent = float(data.get('memory_percent', 0))
-                self.memory_card['value'].config(text=f"{percent:.1f}%")
-                
-                total = data.get('memory_total_mb', 0)
-                used = data.get('memory_used_mb', 0)
-                available = data.get('memory_available_mb', 0)
-                
-                self.memory_card['details'][0].config(text=f"Total: {total} MB")
-                self.memory_card['details'][1].config(text=f"Used: {used} MB")
-                self.memory_card['details'][2].config(text=f"Available: {available} MB")
-                
-                if percent > 85:
-                    self.memory_card['value'].config(foreground="#ff4444")
-                    self.log_message(f"Memory usage high: {percent:.1f}%", "WARNING")
-                else:
-                    self.memory_card['value'].config(foreground="#4a9eff")
-    
-    def update_disk_metrics(self):
+        if data:
+            percent = float(data.get('memory_percent', 0))
+            self.set_widget(self.memory_card['value'], text=f"{percent:.1f}%")
+            self.memory_card['spark'].push(percent)
+            
+            total = data.get('memory_total_mb', 0)
+            used = data.get('memory_used_mb', 0)
+            available = data.get('memory_available_mb', 0)
+            
+            self.set_widget(self.memory_card['details'][0], text=f"Total: {total} MB")
+            self.set_widget(self.memory_card['details'][1], text=f"Used: {used} MB")
+            self.set_widget(self.memory_card['details'][2], text=f"Available: {available} MB")
+            
+            self.set_widget(self.memory_card['value'],
+                            foreground="#ff4444" if self.breached.get('memory') else "#4a9eff")
+    
+    def update_disk_metrics(self, data):
         """Update disk metrics"""
-        output = self.run_monitor_command("disk")
-        if output:
-            data = self.parse_json_output(output)
-            if data:
-                usage = int(data.get('disk_usage_percent', 0))
-                self.disk_card['value'].config(text=f"{usage}%")
-                
-                self.disk_card['details'][0].config(text=f"Total: {data.get('disk_total', 'N/A')}")
-                self.disk_card['details'][1].config(text=f"Used: {data.get('disk_used', 'N/A')}")
-                self.disk_card['details'][2].config(text=f"Available: {data.get('disk_available', 'N/A')}")
-                self.disk_card['details'][3].config(text=f"SMART: {data.get('smart_status', 'N/A')}")
-                
-                if usage > 90:
-                    self.disk_card['value'].config(foreground="#ff4444")
-                    self.log_message(f"Disk usage high: {usage}%", "WARNING")
-                else:
-                    self.disk_card['value'].config(foreground="#4a9eff")
-    
-    def update_gpu_metrics(self):
+        if data:
+            usage = int(data.get('disk_usage_percent', 0))
+            self.set_widget(self.disk_card['value'], text=f"{usage}%")
+            self.disk_card['spark'].push(usage)
+            
+            self.set_widget(self.disk_card['details'][0], text=f"Total: {data.get('disk_total', 'N/A')}")
+            self.set_widget(self.disk_card['details'][1], text=f"Used: {data.get('disk_used', 'N/A')}")
+            self.set_widget(self.disk_card['details'][2], text=f"Available: {data.get('disk_available', 'N/A')}")
+            self.set_widget(self.disk_card['details'][3], text=f"SMART: {data.get('smart_status', 'N/A')}")
+            
+            self.set_widget(self.disk_card['value'],
+                            foreground="#ff4444" if self.breached.get('disk') else "#4a9eff")
+    
+    def update_gpu_metrics(self, data):
         """Update GPU metrics"""
-        output = self.run_monitor_command("gpu")
-        if output:
-            data = self.parse_json_output(output)
-            if data:
-                gpu_usage = data.get('gpu_usage', 'N/A')
-                if gpu_usage != 'N/A':
-                    self.gpu_card['value'].config(text=f"{gpu_usage}%")
-                else:
-                    self.gpu_card['value'].config(text="N/A")
-                
-                self.gpu_card['details'][0].config(text=f"Device: {data.get('gpu_name', 'N/A')}")
-                self.gpu_card['details'][1].config(text=f"Memory: {data.get('gpu_memory', 'N/A')}")
-                self.gpu_card['details'][2].config(text=f"Temp: {data.get('gpu_temperature', 'N/A')}°C")
-    
-    def update_network_metrics(self):
+        if data:
+            gpu_usage = data.get('gpu_usage', 'N/A')
+            self.gpu_card['spark'].push(gpu_usage)
+            if gpu_usage != 'N/A':
+                self.set_widget(self.gpu_card['value'], text=f"{gpu_usage}%")
+            else:
+                self.set_widget(self.gpu_card['value'], text="N/A")
+            
+            self.set_widget(self.gpu_card['details'][0], text=f"Device: {data.get('gpu_name', 'N/A')}")
+            self.set_widget(self.gpu_card['details'][1], text=f"Memory: {data.get('gpu_memory', 'N/A')}")
+            self.set_widget(self.gpu_card['details'][2], text=f"Temp: {data.get('gpu_temperature', 'N/A')}°C")
+    
+    def update_network_metrics(self, data):
         """Update network metrics"""
-        output = self.run_monitor_command("network")
-        if output:
-            data = self.parse_json_output(output)
-            if data:
-                status = data.get('status', 'unknown').upper()
-                self.network_card['value'].config(text=status)
-                
-                if status == 'UP':
-                    self.network_card['value'].config(foreground="#00ff00")
-                else:
-                    self.network_card['value'].config(foreground="#ff4444")
-                
-                self.network_card['details'][0].config(text=f"Interface: {data.get('interface', 'N/A')}")
-                self.network_card['details'][1].config(text=f"IP: {data.get('ip_address', 'N/A')}")
-                self.network_card['details'][2].config(text=f"RX: {data.get('rx_mb', 'N/A')} MB")
-                self.network_card['details'][3].config(text=f"TX: {data.get('tx_mb', 'N/A')} MB")
-    
-    def update_system_metrics(self):
+        if data:
+            status = data.get('status', 'unknown').upper()
+            self.set_widget(self.network_card['value'], text=status)
+            
+            if status == 'UP':
+                self.set_widget(self.network_card['value'], foreground="#00ff00")
+            else:
+                self.set_widget(self.network_card['value'], foreground="#ff4444")
+            
+            self.set_widget(self.network_card['details'][0], text=f"Interface: {data.get('interface', 'N/A')}")
+            self.set_widget(self.network_card['details'][1], text=f"IP: {data.get('ip_address', 'N/A')}")
+            rx_rate = self.format_rate(data.get('rx_bytes_per_sec', 'N/A'))
+            tx_rate = self.format_rate(data.get('tx_bytes_per_sec', 'N/A'))
+            try:
+                self.network_card['spark'].push(float(data.get('rx_bytes_per_sec'))
+                                                + float(data.get('tx_bytes_per_sec')))
+            except (TypeError, ValueError):
+                pass
+            self.set_widget(self.network_card['details'][2], text=f"RX: {rx_rate} ({data.get('rx_mb', 'N/A')} MB)")
+            self.set_widget(self.network_card['details'][3], text=f"TX: {tx_rate} ({data.get('tx_mb', 'N/A')} MB)")
+    
+    def format_rate(self, value):
+        """Format a bytes/s value as B/s, KB/s or MB/s"""
+        try:
+            rate = float(value)
+        except (TypeError, ValueError):
+            return "N/A"
+        if rate >= 1024 * 1024:
+            return f"{rate / (1024 * 1024):.1f} MB/s"
+        if rate >= 1024:
+            return f"{rate / 1024:.1f} KB/s"
+        return f"{rate:.0f} B/s"
+    
+    def update_system_metrics(self, data):
         """Update system load metrics"""
-        output = self.run_monitor_command("system")
-        if output:
-            data = self.parse_json_output(output)
-            if data:
-                load_1min = data.get('load_1min', 'N/A')
-                self.system_card['value'].config(text=load_1min)
-                
-                self.system_card['details'][0].config(text=f"Uptime: {data.get('uptime', 'N/A')}")
-                self.system_card['details'][1].config(text=f"Processes: {data.get('total_processes', 'N/A')}")
-                self.system_card['details'][2].config(text=f"Running: {data.get('running_processes', 'N/A')}")
-                self.system_card['details'][3].config(text=f"Users: {data.get('logged_users', 'N/A')}")
+        if data:
+            load_1min = data.get('load_1min', 'N/A')
+            self.set_widget(self.system_card['value'], text=load_1min)
+            self.system_card['spark'].push(load_1min)
+            
+            self.set_widget(self.system_card['details'][0], text=f"Uptime: {data.get('uptime', 'N/A')}")
+            self.set_widget(self.system_card['details'][1], text=f"Processes: {data.get('total_processes', 'N/A')}")
+            self.set_widget(self.system_card['details'][2], text=f"Running: {data.get('running_processes', 'N/A')}")
+            self.set_widget(self.system_card['details'][3], text=f"Users: {data.get('logged_users', 'N/A')}")
     
     def update_all_metrics(self):
-        """Update all metrics in parallel threads"""
+        """Request a collection tick and schedule the next one"""
+        self._tick_job = None
         if not self.monitoring:
             return
+        self.request_tick()
+        self._tick_job = self.root.after(self.update_interval, self.update_all_metrics)
+    
+    def request_tick(self):
+        """Hand a tick to the worker, or skip it while one is already waiting"""
+        try:
+            self.tick_requests.put_nowait(time.monotonic())
+        except queue.Full:
+            self.skipped_ticks += 1
+            if selfstats.STATS is not None:
+                selfstats.STATS.inc('sysmon_gui_skipped_ticks_total')
+    
+    def collect_worker(self):
+        """Collect every metric family per tick, off the Tk thread"""
+        while not self._stop.is_set():
+            try:
+                self.tick_requests.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            results = {metric: self.collect_metric(metric) for metric in METRICS}
+            breached = self.check_rules(results)
+            # Only the newest results matter; replace any the UI has not drained
+            try:
+                self.results.get_nowait()
+            except queue.Empty:
+                pass
+            self.results.put_nowait((results, breached))
+    
+    def check_rules(self, results):
+        """Evaluate the alert rules on one tick; returns {metric: breached}"""
+        now = time.time()
+        breached = {}
+        events = []
+        for metric, data in results.items():
+            if not data:
+                continue
+            found, breached[metric] = self.alert_rules.engine.evaluate(
+                metric, [now], dict_columns(metric, data))
+            events.extend(found)
+        self.alert_rules.record(events)
+        for event in events:
+            self.log_message(event.message, event.level)
+        return breached
+    
+    def stop_worker(self, timeout=2.0):
+        """Stop the collector worker before the collector is closed"""
+        self._stop.set()
+        self.worker.join(timeout)
+    
+    def drain_results(self):
+        """Render the newest results and queued log lines in one batch"""
+        started = time.monotonic()
+        lag_ms = max(0.0, (started - self._drain_due) * 1000)
+        if selfstats.STATS is not None:
+            selfstats.STATS.observe('sysmon_gui_tick_lag_seconds', (), lag_ms / 1000)
+        
+        while True:
+            try:
+                message, level = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            self.log_message(message, level)
         
-        threads = [
-            threading.Thread(target=self.update_cpu_metrics, daemon=True),
-            threading.Thread(target=self.update_memory_metrics, daemon=True),
-            threading.Thread(target=self.update_disk_metrics, daemon=True),
-            threading.Thread(target=self.update_gpu_metrics, daemon=True),
-            threading.Thread(target=self.update_network_metrics, daemon=True),
-            threading.Thread(target=self.update_system_metrics, daemon=True)
-        ]
-        
-        for thread in threads:
-            thread.start()
-        
-        # Schedule next update
-        if self.monitoring:
-            self.root.after(self.update_interval, self.update_all_metrics)
+        try:
+            results, self.breached = self.results.get_nowait()
+        except queue.Empty:
+            results = None
+        if results is not None:
+            self.update_cpu_metrics(results.get('cpu'))
+            self.update_memory_metrics(results.get('memory'))
+            self.update_disk_metrics(results.get('disk'))
+            self.update_gpu_metrics(results.get('gpu'))
+            self.update_network_metrics(results.get('network'))
+            self.update_system_metrics(results.get('system'))
+        
+        for sparkline in self.sparklines:
+            sparkline.draw()
+        self.set_widget(self.perf_label,
+                        text=f"Threads: {threading.active_count()} | "
+                             f"Frame: {self.frame_ms:.0f} ms | "
+                             f"Skipped ticks: {self.skipped_ticks}")
+        self.flush_widgets()
+        
+        self.frame_ms = lag_ms + (time.monotonic() - started) * 1000
+        self._drain_due = time.monotonic() + DRAIN_INTERVAL / 1000
+        self.root.after(DRAIN_INTERVAL, self.drain_results)
+    
+    def set_widget(self, widget, **options):
+        """Queue widget options for the next batched redraw"""
+        self._pending.setdefault(str(widget), (widget, {}))[1].update(options)
+    
+    def flush_widgets(self):
+        """Configure only the widget options whose values changed"""
+        for key, (widget, options) in self._pending.items():
+            shown = self._widget_state.setdefault(key, {})
+            changed = {name: value for name, value in options.items()
+                       if shown.get(name) != value}
+            if changed:
+                widget.config(**changed)
+                shown.update(changed)
+        self._pending.clear()
     
     def start_monitoring(self):
         """Start monitoring"""
@@ -415,12 +644,15 @@ class SystemMonitorGUI:
             self.start_btn.config(text="⏸ Pause")
             self.status_label.config(text="● Monitoring Active", foreground="#00ff00")
             self.log_message("Monitoring resumed", "INFO")
+            # A pause and resume within one interval must not start a second chain
+            if self._tick_job is not None:
+                self.root.after_cancel(self._tick_job)
             self.update_all_metrics()
     
     def force_refresh(self):
         """Force immediate refresh"""
         self.log_message("Manual refresh triggered", "INFO")
-        threading.Thread(target=self.update_all_metrics, daemon=True).start()
+        self.request_tick()
     
     def change_interval(self, event=None):
         """Change update interval"""
@@ -435,7 +667,16 @@ class SystemMonitorGUI:
         self.report_btn.config(state="disabled", text="⏳ Generating...")
         
         def run_report():
-            output = self.run_monitor_command("report")
+            if self.collector is None:
+                output = self.run_monitor_command("report")
+            else:
+                # Summarises the stored history; collection carries on meanwhile
+                try:
+                    path, _ = generate_report("./data", "./reports", "./logs")
+                    output = f"Report generated: {path}"
+                except Exception as e:
+                    self.log_message(f"Error generating report: {str(e)}", "ERROR")
+                    output = None
             self.root.after(0, lambda: self.report_complete(output))
         
         threading.Thread(target=run_report, daemon=True).start()
@@ -450,6 +691,11 @@ class SystemMonitorGUI:
     
     def log_message(self, message, level="INFO"):
         """Add message to log"""
+        if threading.current_thread() is not threading.main_thread():
+            # Tk is not thread-safe; the drain loop logs it on the main thread
+            self.messages.put((message, level))
+            return
+        
         timestamp = datetime.now().strftime("%H:%M:%S")
         
         # Color based on level
@@ -491,6 +737,13 @@ def main():
     # Handle window close
     def on_closing():
         app.monitoring = False
+        app.stop_worker()
+        # Pending runs and anomaly baselines carry over to the next start
+        app.alert_rules.save()
+        if app.collector is not None:
+            app.collector.close()
+        for writer in app.writers:
+            writer.close()
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -0,0 +1,28 @@
+"""
+Shared Python components for the System Monitor
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+"""
+
+from sysmon.collector import (
+    METRICS,
+    Collector,
+    CpuSample,
+    CsvWriter,
+    DiskSample,
+    GpuSample,
+    MemorySample,
+    NetworkSample,
+    SystemSample,
+)
+
+__all__ = [
+    'METRICS',
+    'Collector',
+    'CpuSample',
+    'CsvWriter',
+    'DiskSample',
+    'GpuSample',
+    'MemorySample',
+    'NetworkSample',
+    'SystemSample',
+]
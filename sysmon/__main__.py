@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Command line entry point for the in-process collector
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Mirrors the monitor.sh commands so the shell script can hand its
+long-running modes over to a single Python process:
+
+    python3 -m sysmon monitor       # one cycle, append to data/*.csv
+    python3 -m sysmon continuous    # per-family adaptive intervals
+    python3 -m sysmon cpu           # one metric, printed as JSON
+    python3 -m sysmon bench         # per-sample collection cost
+    python3 -m sysmon convert       # one-shot CSV -> columnar conversion
+    python3 -m sysmon migrate       # one-shot CSV -> SQLite (data/metrics.db) import
+    python3 -m sysmon report        # Markdown summary of the stored history
+    python3 -m sysmon retain        # rotate, compress and expire old files
+    python3 -m sysmon check         # alert rules on the newest CSV rows (monitor.sh)
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import sys
+import time
+
+from sysmon import selfstats
+from sysmon.collector import METRICS, STATE_FILE, Collector, CsvWriter
+from sysmon.push import PushWriter
+from sysmon.report import generate_report, parse_time
+from sysmon.retention import RetentionJob, apply_retention, policy_from_env
+from sysmon.rollup import RollupWriter
+from sysmon.rules import AlertRules, MonitorLog
+from sysmon.scheduler import (DEFAULT_FAST_INTERVALS, DEFAULT_INTERVALS, Scheduler,
+                              parse_intervals)
+from sysmon.storage import (ColumnarWriter, convert_csv, csv_values, parse_duration,
+                            parse_timestamp)
+from sysmon.tail import read_last_line
+from sysmon.tsdb import BACKEND, BACKENDS, DB_FILE, SqliteWriter, migrate_csv
+
+# Colors for output
+RED = '\033[0;31m'
+GREEN = '\033[0;32m'
+YELLOW = '\033[1;33m'
+NC = '\033[0m'
+
+def collect_cycle(collector, writers, log, alerts, metrics=METRICS):
+    """Collect the given metric families once and append them to every store
+
+    Returns (samples, {metric: rule breached}).
+    """
+    samples = {}
+    for metric in metrics:
+        try:
+            samples[metric] = collector.collect(metric)
+        except Exception as e:
+            log.message('ERROR', f'Failed to collect {metric} metrics: {e}')
+    for writer in writers:
+        writer.write_all(samples)
+    return samples, alerts.check(samples)
+
+
+def newest_rows(data_dir, metrics):
+    """{metric: [(epoch, value, ...)]} from the last row of each metric's CSV"""
+    rows = {}
+    for metric in metrics:
+        try:
+            line = read_last_line(os.path.join(data_dir, f'{metric}_metrics.csv'))
+        except FileNotFoundError:
+            continue
+        if not line:
+            continue
+        fields = line.decode('utf-8', errors='replace').split(',')
+        try:
+            rows[metric] = [(parse_timestamp(fields[0]), *csv_values(metric, fields))]
+        except (ValueError, IndexError):
+            continue
+    return rows
+
+
+def run_check(args, log):
+    """Apply the alert rules to the rows the Bash collector just appended
+
+    Prints ``metric=1`` or ``metric=0`` per family (a rule breached or an
+    incident open) on one line. With --follow, answers one such line for
+    every line of family names read from stdin, so a single process
+    serves a whole continuous run of monitor.sh.
+    """
+    try:
+        alerts = AlertRules(args.data_dir, log)
+    except ValueError as e:
+        print(f'{RED}[ERROR]{NC} {e}', file=sys.stderr)
+        return 1
+    checked = {}
+    breached = {}
+    requests = sys.stdin if args.follow else [args.metrics]
+    for request in requests:
+        metrics = [metric for metric in request.replace(',', ' ').split() if metric in METRICS]
+        # A row already evaluated (the family failed to collect) is not counted twice
+        rows = {metric: metric_rows
+                for metric, metric_rows in newest_rows(args.data_dir, metrics).items()
+                if metric_rows[0][0] > checked.get(metric, -1)}
+        for metric, metric_rows in rows.items():
+            checked[metric] = metric_rows[0][0]
+        breached.update(alerts.check_rows(rows))
+        print(' '.join(f'{metric}={int(breached.get(metric, False))}' for metric in metrics),
+              flush=True)
+    alerts.save()
+    return 0
+
+
+def open_log(args, quiet=False):
+    """The day's monitor log, or --log-file"""
+    # One log per day rather than per run keeps logs/ small
+    log_file = args.log_file or os.path.join(
+        args.log_dir, f'monitor_{time.strftime("%Y%m%d")}.log')
+    return MonitorLog(log_file, quiet=quiet)
+
+
+def build_scheduler(args):
+    """Scheduler from --intervals/--fast-intervals (or their environment variables)"""
+    intervals = DEFAULT_INTERVALS
+    if args.interval is not None:
+        # A single --interval keeps the old fixed-period behaviour
+        intervals = dict.fromkeys(METRICS, args.interval)
+    intervals = parse_intervals(args.intervals, intervals)
+    fast_intervals = parse_intervals(args.fast_intervals, DEFAULT_FAST_INTERVALS)
+    return Scheduler(intervals, fast_intervals)
+
+
+def format_intervals(intervals):
+    return ', '.join(f'{metric}={intervals[metric]:g}s' for metric in METRICS)
+
+
+def run_continuous(collector, writers, log, alerts, scheduler, retention=None):
+    """Collect each family on its own schedule until interrupted"""
+    breached = {}
+    while True:
+        if retention is not None:
+            retention.tick()
+        due = scheduler.wait()
+        if not due:
+            continue
+        _, checked = collect_cycle(collector, writers, log, alerts, due)
+        scheduler.mark_done(due)
+        breached.update(checked)
+        if scheduler.set_fast(any(breached.values())):
+            if scheduler.fast:
+                log.message('INFO', 'Threshold exceeded, sampling at the fast intervals: '
+                            + format_intervals({m: scheduler.interval(m) for m in METRICS}))
+            else:
+                log.message('INFO', 'All metrics below thresholds, back to the normal intervals')
+
+
+def run_bench(collector, count):
+    """Print the mean cost of collecting each metric family"""
+    print(f'{"metric":<10} {"mean (us)":>12} {"min (us)":>12}')
+    for metric in METRICS:
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            collector.collect(metric)
+            timings.append(time.perf_counter() - start)
+        mean = sum(timings) / len(timings) * 1e6
+        print(f'{metric:<10} {mean:>12.1f} {min(timings) * 1e6:>12.1f}')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m sysmon',
+                                     description='In-process system metric collector')
+    parser.add_argument('command', nargs='?', default='monitor',
+                        choices=['monitor', 'continuous', 'bench', 'convert', 'migrate',
+                                 'report', 'retain', 'check', *METRICS])
+    parser.add_argument('--data-dir', default=os.getenv('DATA_DIR', './data'))
+    parser.add_argument('--log-dir', default=os.getenv('LOG_DIR', './logs'))
+    parser.add_argument('--report-dir', default=os.getenv('REPORT_DIR', './reports'))
+    parser.add_argument('--log-file', default=None,
+                        help='Log file to append to (default: monitor_<YYYYmmdd>.log)')
+    parser.add_argument('--interval', type=float, default=None,
+                        help='Sample every family every N seconds in continuous mode')
+    parser.add_argument('--intervals', default=os.getenv('SAMPLE_INTERVALS'),
+                        help='Per-family seconds, e.g. "cpu=1,memory=1,disk=300"')
+    parser.add_argument('--fast-intervals', default=os.getenv('FAST_SAMPLE_INTERVALS'),
+                        help='Per-family seconds while a threshold is exceeded')
+    parser.add_argument('--top-processes', type=int,
+                        default=int(os.getenv('PROCESS_TOP_N', 5)),
+                        help='Processes kept per ranking in data/process_metrics.csv')
+    parser.add_argument('--count', type=int, default=1000,
+                        help='Samples per metric in bench mode')
+    parser.add_argument('--no-columnar', action='store_true',
+                        help='Only write the CSV files, not data/columnar/ (or data/metrics.db) '
+                             'and data/rollups/')
+    parser.add_argument('--backend', default=BACKEND, choices=BACKENDS,
+                        help='Typed sample store next to the CSVs: columnar segments or '
+                             'the SQLite database (default: $STORAGE_BACKEND or columnar)')
+    parser.add_argument('--push-url', default=os.getenv('PUSH_URL'),
+                        help='Also push rows to a web server, e.g. http://monitor:8080/api/ingest')
+    parser.add_argument('--host', default=os.getenv('MONITOR_HOST') or socket.gethostname(),
+                        help='Name this node reports under when pushing')
+    parser.add_argument('--push-token', default=os.getenv('INGEST_TOKEN'),
+                        help='Bearer token expected by the ingest endpoint')
+    parser.add_argument('--window', default=os.getenv('REPORT_WINDOW', '24h'),
+                        help='Report on the last N seconds (or 30m, 24h, 7d, ...)')
+    parser.add_argument('--from', dest='start', default=None,
+                        help='Report window start (epoch or YYYYmmdd_HHMMSS)')
+    parser.add_argument('--to', dest='end', default=None,
+                        help='Report window end (default: now)')
+    parser.add_argument('--retention-interval', type=float,
+                        default=float(os.getenv('RETENTION_INTERVAL', 3600)),
+                        help='Seconds between retention passes in continuous mode (0 = off)')
+    parser.add_argument('--metrics', default=','.join(METRICS),
+                        help='Families whose newest CSV row check evaluates, e.g. "cpu,memory"')
+    parser.add_argument('--follow', action='store_true',
+                        help='check: read family names from stdin, one line per cycle')
+    parser.add_argument('--force', action='store_true',
+                        help='Let convert/migrate replace existing columnar/SQLite data')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command in ('convert', 'migrate'):
+        rollup_dir = os.path.join(args.data_dir, 'rollups')
+        if args.force:
+            shutil.rmtree(rollup_dir, ignore_errors=True)
+        rollups = RollupWriter(rollup_dir)
+        convert = convert_csv if args.command == 'convert' else migrate_csv
+        try:
+            converted = convert(args.data_dir, force=args.force, extra_writers=[rollups])
+        except FileExistsError as e:
+            print(f'{RED}[ERROR]{NC} {e}', file=sys.stderr)
+            return 1
+        finally:
+            rollups.close()
+        for metric, rows in converted.items():
+            print(f'{metric:<10} {rows:>10} rows')
+        return 0
+
+    if args.command == 'report':
+        try:
+            path, _ = generate_report(
+                args.data_dir, args.report_dir, args.log_dir,
+                start=parse_time(args.start) if args.start else None,
+                end=parse_time(args.end) if args.end else None,
+                window=parse_duration(args.window), host=args.host)
+        except ValueError as e:
+            print(f'{RED}[ERROR]{NC} {e}', file=sys.stderr)
+            return 1
+        print(path)
+        return 0
+
+    if args.command == 'retain':
+        try:
+            counts = apply_retention(args.data_dir, args.log_dir, args.report_dir,
+                                     policy_from_env())
+        except ValueError as e:
+            print(f'{RED}[ERROR]{NC} {e}', file=sys.stderr)
+            return 1
+        for action, count in counts.items():
+            print(f'{action:<10} {count:>10}')
+        return 0
+
+    if args.command == 'check':
+        return run_check(args, open_log(args, quiet=True))
+
+    # Long-running modes keep the previous counters in memory; one-shot runs
+    # resume them from the state file so usage and rates span the gap
+    state_path = None
+    if args.command not in ('continuous', 'bench'):
+        os.makedirs(args.data_dir, exist_ok=True)
+        state_path = os.path.join(args.data_dir, STATE_FILE)
+    if selfstats.STATS is not None and args.command != 'bench':
+        # Collection timings and failures, next to the samples they cost
+        os.makedirs(args.data_dir, exist_ok=True)
+        selfstats.STATS.start_writer(os.path.join(args.data_dir, selfstats.SELF_STATS_FILE),
+                                     'collector')
+
+    with Collector(state_path=state_path, top_processes=args.top_processes) as collector:
+        if args.command == 'bench':
+            run_bench(collector, args.count)
+            return 0
+
+        log = open_log(args, quiet=args.command in METRICS)
+        writers = [CsvWriter(args.data_dir)]
+        if not args.no_columnar:
+            if args.backend == 'sqlite':
+                # One transaction per cycle: write_all gets every due family at once
+                writers.append(SqliteWriter(os.path.join(args.data_dir, DB_FILE)))
+            else:
+                writers.append(ColumnarWriter(os.path.join(args.data_dir, 'columnar')))
+            if args.command == 'continuous':
+                # Rollup buckets only make sense for an uninterrupted stream
+                writers.append(RollupWriter(os.path.join(args.data_dir, 'rollups')))
+        if args.push_url:
+            writers.append(PushWriter(args.push_url, args.host, args.push_token))
+        try:
+            alerts = AlertRules(args.data_dir, log)
+        except ValueError as e:
+            print(f'{RED}[ERROR]{NC} {e}', file=sys.stderr)
+            return 1
+
+        try:
+            return run_command(args, collector, writers, log, alerts)
+        finally:
+            # Flushes open rollups and makes a last delivery attempt for pushes
+            for writer in writers:
+                writer.close()
+            # Pending runs and anomaly baselines carry over to the next run
+            alerts.save()
+
+
+def run_command(args, collector, writers, log, alerts):
+    """Collect for a monitor, continuous or single-metric command"""
+    if args.command in ('monitor', 'continuous', 'cpu') and not collector.has_cpu_baseline:
+        # Give the first CPU reading a short window instead of since-boot
+        collector.cpu()
+        time.sleep(0.1)
+
+    if args.command in METRICS:
+        sample = collector.collect(args.command)
+        for writer in writers:
+            writer.write(args.command, sample)
+        alerts.check({args.command: sample})
+        print(json.dumps(sample.to_dict(), indent=2))
+        return 0
+
+    if args.command == 'monitor':
+        collect_cycle(collector, writers, log, alerts)
+        print(f'{GREEN}Monitoring complete!{NC}')
+        return 0
+
+    try:
+        scheduler = build_scheduler(args)
+    except ValueError as e:
+        print(f'{RED}[ERROR]{NC} {e}', file=sys.stderr)
+        return 1
+    log.message('INFO', 'Continuous monitoring started with the Python collector: '
+                + format_intervals(scheduler.intervals))
+    if args.push_url:
+        log.message('INFO', f'Pushing samples as {args.host} to {args.push_url}')
+    # docker stop sends SIGTERM; unwind normally so open rollups are flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    retention = None
+    if args.retention_interval > 0:
+        try:
+            retention = RetentionJob(args.data_dir, args.log_dir, args.report_dir,
+                                     args.retention_interval, policy_from_env(), log.message)
+        except ValueError as e:
+            print(f'{RED}[ERROR]{NC} {e}', file=sys.stderr)
+            return 1
+    try:
+        run_continuous(collector, writers, log, alerts, scheduler, retention)
+    except KeyboardInterrupt:
+        log.message('INFO', 'Continuous monitoring stopped')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Incremental index of the WARNING/ERROR lines in the monitor logs
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Log lines look like ``[2026-10-17 00:47:43] [WARNING] CPU usage is high``.
+Each log file is read once from the start and afterwards only from the
+remembered byte offset; matching lines are parsed into Alert tuples kept
+in a bounded deque next to running per-level totals, so serving the last
+N alerts costs O(N) whatever the size of the log.
+"""
+
+import glob
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+ALERT_LEVELS = ('WARNING', 'ERROR')
+LOG_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+Alert = namedtuple('Alert', 'time timestamp level message line')
+
+
+def parse_alert(line):
+    """Parse a WARNING/ERROR log line into an Alert, or return None"""
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', errors='replace')
+    line = line.strip()
+    if not line.startswith('['):
+        return None
+    stamp, _, rest = line[1:].partition('] [')
+    level, _, message = rest.partition('] ')
+    if level not in ALERT_LEVELS:
+        return None
+    try:
+        epoch = time.mktime(time.strptime(stamp, LOG_TIME_FORMAT))
+    except ValueError:
+        epoch = None
+    return Alert(epoch, stamp, level, message, line)
+
+
+class AlertLog:
+    """Alerts of one log file, fed from the last byte offset
+
+    A changed inode or a file shorter than the offset (rotation or
+    truncation) resets the index and re-reads from the start.
+    """
+
+    def __init__(self, path, capacity=1000, chunk_size=1 << 20):
+        self.path = path
+        self.alerts = deque(maxlen=capacity)
+        self.counts = dict.fromkeys(ALERT_LEVELS, 0)
+        self.chunk_size = chunk_size
+        self._inode = None
+        self._offset = 0
+        self._partial = b''
+        self._lock = threading.Lock()
+
+    def _reset(self, inode):
+        self.alerts.clear()
+        self.counts = dict.fromkeys(ALERT_LEVELS, 0)
+        self._inode = inode
+        self._offset = 0
+        self._partial = b''
+
+    def _ingest(self, f):
+        f.seek(self._offset)
+        while True:
+            chunk = f.read(self.chunk_size)
+            if not chunk:
+                break
+            self._offset += len(chunk)
+            lines = (self._partial + chunk).split(b'\n')
+            self._partial = lines.pop()
+            for line in lines:
+                # Cheap byte test first; most lines are INFO
+                if b'] [WARNING] ' in line or b'] [ERROR] ' in line:
+                    alert = parse_alert(line)
+                    if alert is not None:
+                        self.alerts.append(alert)
+                        self.counts[alert.level] += 1
+
+    def refresh(self):
+        """Index the lines appended since the last refresh"""
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            with self._lock:
+                if st.st_ino != self._inode or st.st_size < self._offset:
+                    self._reset(st.st_ino)
+                if st.st_size > self._offset:
+                    self._ingest(f)
+
+    def recent(self, limit=50, since=None, level=None):
+        """Return (per-level totals, newest ``limit`` matching alerts, oldest first)"""
+        self.refresh()
+        selected = []
+        with self._lock:
+            counts = dict(self.counts)
+            # Newest first, stopping at ``since`` or once the page is full
+            for alert in reversed(self.alerts):
+                if len(selected) >= limit:
+                    break
+                if since is not None:
+                    if alert.time is None:
+                        continue
+                    if alert.time < since:
+                        break
+                if level is None or alert.level == level:
+                    selected.append(alert)
+        selected.reverse()
+        return counts, selected
+
+
+class AlertIndex:
+    """One AlertLog per ``*.log`` file in a directory"""
+
+    def __init__(self, log_dir, capacity=1000, manifest=None):
+        self.log_dir = log_dir
+        self.capacity = capacity
+        # A sysmon.manifest.Manifest of log_dir saves a glob and stat per call
+        self.manifest = manifest
+        self._logs = {}
+        self._lock = threading.Lock()
+
+    def latest_path(self):
+        """Most recently modified log file, or None"""
+        if self.manifest is not None:
+            logs = self.manifest.files()
+            return os.path.join(self.log_dir, logs[0]['filename']) if logs else None
+        log_files = glob.glob(os.path.join(self.log_dir, '*.log'))
+        if not log_files:
+            return None
+        return max(log_files, key=os.path.getmtime)
+
+    def get(self, path):
+        with self._lock:
+            log = self._logs.get(path)
+            if log is None:
+                # Forget logs that have been deleted since
+                for stale in [p for p in self._logs if not os.path.exists(p)]:
+                    del self._logs[stale]
+                log = self._logs[path] = AlertLog(path, self.capacity)
+        return log
+
+    def latest(self):
+        """AlertLog of the newest log file, or None when there are no logs"""
+        path = self.latest_path()
+        return self.get(path) if path is not None else None
@@ -0,0 +1,740 @@
+"""
+In-process metric collector for the System Monitor
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Reads the kernel interfaces (/proc, /sys, statvfs) directly instead of
+forking top, free, df, ps, awk and bc for every sample. Kernel files are
+opened once and re-read from offset 0 on each sample, so collecting a
+metric costs a handful of pread() calls rather than a process tree.
+"""
+
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sysmon import selfstats
+from sysmon.processes import ProcessInfo, ProcessTracker, process_rows
+
+try:
+    import fcntl
+except ImportError:  # Windows: the GUI goes through WSL instead
+    fcntl = None
+
+# Metric families in the order monitor.sh collects them
+METRICS = ('cpu', 'memory', 'disk', 'gpu', 'network', 'system')
+
+TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S'
+
+SIOCGIFADDR = 0x8915
+UTMP_RECORD_SIZE = 384
+UTMP_USER_PROCESS = 7
+
+
+def format_timestamp(epoch):
+    """Format an epoch time the way monitor.sh stamps its CSV rows"""
+    return time.strftime(TIMESTAMP_FORMAT, time.localtime(epoch))
+
+
+def _fmt(value):
+    """Render an optional number the way the shell tools print it"""
+    if value is None:
+        return 'N/A'
+    return f'{value:g}'
+
+
+def _rate(value):
+    """Render an optional per-second rate; N/A until there is a previous sample"""
+    if value is None:
+        return 'N/A'
+    return f'{value:.1f}'
+
+
+def human_size(num_bytes):
+    """Render a byte count like ``df -h`` (1024 based, rounded up)"""
+    value = float(num_bytes)
+    if value < 1024:
+        return str(int(value))
+    for unit in 'KMGTPE':
+        value /= 1024.0
+        if value < 10:
+            rounded = -(-value * 10 // 1) / 10
+            if rounded < 10:
+                return f'{rounded:.1f}{unit}'
+        rounded = -(-value // 1)
+        if rounded < 1024:
+            return f'{int(rounded)}{unit}'
+    return f'{int(rounded)}E'
+
+
+################################################################################
+# Samples
+################################################################################
+
+@dataclass(frozen=True)
+class Sample:
+    """Base class for one collected metric family"""
+    time: float
+
+    @property
+    def timestamp(self):
+        return format_timestamp(self.time)
+
+
+@dataclass(frozen=True)
+class CpuSample(Sample):
+    """CPU utilisation over the last sampling interval"""
+    usage: float
+    cores: int
+    load_1: float
+    load_5: float
+    load_15: float
+    temperature: Optional[float]
+    per_core: Tuple[float, ...] = ()
+
+    def to_csv_row(self):
+        # Per-core usage trails the original columns so positions stay stable
+        return (f"{self.timestamp},CPU,{self.usage:.1f},{self.cores},"
+                f"{self.load_1:.2f}, {self.load_5:.2f}, {self.load_15:.2f},"
+                f"{_fmt(self.temperature)}"
+                + ''.join(f',{usage:.1f}' for usage in self.per_core))
+
+    def to_dict(self):
+        return {
+            'timestamp': self.timestamp,
+            'cpu_usage': f'{self.usage:.1f}',
+            'cpu_cores': str(self.cores),
+            'load_average': f'{self.load_1:.2f}, {self.load_5:.2f}, {self.load_15:.2f}',
+            'temperature': _fmt(self.temperature),
+            'per_core': [f'{usage:.1f}' for usage in self.per_core]
+        }
+
+
+@dataclass(frozen=True)
+class MemorySample(Sample):
+    """RAM and swap consumption in MiB"""
+    total_mb: int
+    used_mb: int
+    free_mb: int
+    available_mb: int
+    percent: float
+    swap_total_mb: int
+    swap_used_mb: int
+    swap_free_mb: int
+
+    def to_csv_row(self):
+        return (f"{self.timestamp},MEMORY,{self.total_mb},{self.used_mb},"
+                f"{self.free_mb},{self.available_mb},{self.percent:.2f},"
+                f"{self.swap_total_mb},{self.swap_used_mb}")
+
+    def to_dict(self):
+        return {
+            'timestamp': self.timestamp,
+            'memory_total_mb': str(self.total_mb),
+            'memory_used_mb': str(self.used_mb),
+            'memory_free_mb': str(self.free_mb),
+            'memory_available_mb': str(self.available_mb),
+            'memory_percent': f'{self.percent:.2f}',
+            'swap_total_mb': str(self.swap_total_mb),
+            'swap_used_mb': str(self.swap_used_mb),
+            'swap_free_mb': str(self.swap_free_mb)
+        }
+
+
+@dataclass(frozen=True)
+class DiskSample(Sample):
+    """Usage of the root filesystem"""
+    usage_percent: int
+    total_bytes: int
+    used_bytes: int
+    available_bytes: int
+    smart_status: str
+
+    def to_csv_row(self):
+        return (f"{self.timestamp},DISK,{self.usage_percent},"
+                f"{human_size(self.total_bytes)},{human_size(self.used_bytes)},"
+                f"{human_size(self.available_bytes)},{self.smart_status}")
+
+    def to_dict(self):
+        return {
+            'timestamp': self.timestamp,
+            'disk_usage_percent': str(self.usage_percent),
+            'disk_total': human_size(self.total_bytes),
+            'disk_used': human_size(self.used_bytes),
+            'disk_available': human_size(self.available_bytes),
+            'smart_status': self.smart_status
+        }
+
+
+@dataclass(frozen=True)
+class GpuSample(Sample):
+    """GPU utilisation as reported by the vendor tool, if any"""
+    name: str
+    usage: str
+    memory: str
+    temperature: str
+
+    def to_csv_row(self):
+        return (f"{self.timestamp},GPU,{self.name},{self.usage},"
+                f"{self.memory},{self.temperature}")
+
+    def to_dict(self):
+        return {
+            'timestamp': self.timestamp,
+            'gpu_name': self.name,
+            'gpu_usage': self.usage,
+            'gpu_memory': self.memory,
+            'gpu_temperature': self.temperature
+        }
+
+
+@dataclass(frozen=True)
+class NetworkSample(Sample):
+    """Counters of the primary network interface and their per-second rates"""
+    interface: str
+    rx_bytes: int
+    tx_bytes: int
+    rx_packets: int
+    tx_packets: int
+    ip_address: str
+    status: str
+    rx_rate: Optional[float] = None
+    tx_rate: Optional[float] = None
+    rx_pps: Optional[float] = None
+    tx_pps: Optional[float] = None
+
+    @property
+    def rx_mb(self):
+        return self.rx_bytes / 1024 / 1024
+
+    @property
+    def tx_mb(self):
+        return self.tx_bytes / 1024 / 1024
+
+    def to_csv_row(self):
+        return (f"{self.timestamp},NETWORK,{self.interface},{self.rx_mb:.2f},"
+                f"{self.tx_mb:.2f},{self.rx_packets},{self.tx_packets},"
+                f"{self.ip_address},{self.status},{_rate(self.rx_rate)},"
+                f"{_rate(self.tx_rate)},{_rate(self.rx_pps)},{_rate(self.tx_pps)}")
+
+    def to_dict(self):
+        return {
+            'timestamp': self.timestamp,
+            'interface': self.interface,
+            'rx_mb': f'{self.rx_mb:.2f}',
+            'tx_mb': f'{self.tx_mb:.2f}',
+            'rx_packets': str(self.rx_packets),
+            'tx_packets': str(self.tx_packets),
+            'ip_address': self.ip_address,
+            'status': self.status,
+            'rx_bytes_per_sec': _rate(self.rx_rate),
+            'tx_bytes_per_sec': _rate(self.tx_rate),
+            'rx_packets_per_sec': _rate(self.rx_pps),
+            'tx_packets_per_sec': _rate(self.tx_pps)
+        }
+
+
+@dataclass(frozen=True)
+class SystemSample(Sample):
+    """Load averages, process counts and logged-in users"""
+    uptime_seconds: float
+    load_1: float
+    load_5: float
+    load_15: float
+    total_processes: int
+    running_processes: int
+    zombie_processes: int
+    logged_users: int
+    top_cpu: Tuple[ProcessInfo, ...] = ()
+    top_rss: Tuple[ProcessInfo, ...] = ()
+
+    @property
+    def uptime(self):
+        """Uptime rendered like ``uptime -p``"""
+        minutes = int(self.uptime_seconds // 60)
+        parts = []
+        for name, size in (('week', 10080), ('day', 1440), ('hour', 60)):
+            count, minutes = divmod(minutes, size)
+            if count:
+                parts.append(f"{count} {name}{'s' if count != 1 else ''}")
+        if minutes or not parts:
+            parts.append(f"{minutes} minute{'s' if minutes != 1 else ''}")
+        return 'up ' + ', '.join(parts)
+
+    def to_csv_row(self):
+        return (f"{self.timestamp},SYSTEM,{self.load_1:.2f},{self.load_5:.2f},"
+                f"{self.load_15:.2f},{self.total_processes},"
+                f"{self.running_processes},{self.zombie_processes},"
+                f"{self.logged_users}")
+
+    def to_dict(self):
+        return {
+            'timestamp': self.timestamp,
+            'uptime': self.uptime,
+            'load_1min': f'{self.load_1:.2f}',
+            'load_5min': f'{self.load_5:.2f}',
+            'load_15min': f'{self.load_15:.2f}',
+            'total_processes': str(self.total_processes),
+            'running_processes': str(self.running_processes),
+            'zombie_processes': str(self.zombie_processes),
+            'logged_users': str(self.logged_users),
+            'top_cpu': [_process_dict(process) for process in self.top_cpu],
+            'top_rss': [_process_dict(process) for process in self.top_rss]
+        }
+
+
+def _process_dict(process):
+    return {
+        'pid': process.pid,
+        'name': process.name,
+        'state': process.state,
+        'cpu_percent': f'{process.cpu_percent:.1f}',
+        'rss_mb': f'{process.rss_bytes / 1048576:.1f}'
+    }
+
+
+################################################################################
+# Kernel file access
+################################################################################
+
+class ProcFile:
+    """A /proc or /sys file kept open and re-read from offset 0 per sample"""
+
+    __slots__ = ('path', '_fd', '_size')
+
+    def __init__(self, path, size=4096):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY | getattr(os, 'O_CLOEXEC', 0))
+        self._size = size
+
+    def read(self):
+        """Return the current file content as bytes"""
+        while True:
+            data = os.pread(self._fd, self._size, 0)
+            if len(data) < self._size:
+                return data
+            # Buffer was too small for a consistent snapshot, grow and retry
+            self._size *= 2
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def _open_optional(path):
+    """Open a kernel file, returning None when the system does not expose it"""
+    try:
+        return ProcFile(path)
+    except OSError:
+        return None
+
+
+################################################################################
+# Collector state
+################################################################################
+
+# Default location of the state kept between one-shot runs, shared with
+# the monitor.sh collectors. One record per line:
+#   cpu <total jiffies> <idle jiffies>          (cpu0, cpu1, ... per core)
+#   net <iface> <epoch us> <rx bytes> <tx bytes> <rx packets> <tx packets>
+STATE_FILE = '.collector_state'
+
+# A previous CPU sample fewer jiffies ago than this is too close to diff
+MIN_CPU_WINDOW = 10
+
+
+def read_state(path):
+    """Previous counters from a state file: {'cpu': {name: (total, idle)}, 'net': tuple}"""
+    state = {'cpu': {}, 'net': None}
+    try:
+        with open(path) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) == 3 and fields[0].startswith('cpu'):
+                    state['cpu'][fields[0]] = (int(fields[1]), int(fields[2]))
+                elif len(fields) == 7 and fields[0] == 'net':
+                    state['net'] = (fields[1], int(fields[2]) / 1e6,
+                                    *(int(value) for value in fields[3:]))
+    except (OSError, ValueError):
+        return {'cpu': {}, 'net': None}
+    return state
+
+
+def write_state(path, state):
+    """Atomically replace the state file"""
+    lines = [f'{name} {total} {idle}\n' for name, (total, idle) in state['cpu'].items()]
+    if state['net'] is not None:
+        interface, when, *counters = state['net']
+        lines.append(f"net {interface} {int(when * 1e6)} {' '.join(map(str, counters))}\n")
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        f.writelines(lines)
+    os.replace(tmp, path)
+
+
+################################################################################
+# Collector
+################################################################################
+
+class Collector:
+    """Collects every metric family from long-lived kernel file handles
+
+    CPU usage and network rates are deltas against the previous sample,
+    kept in memory. With ``state_path`` the previous counters are also
+    loaded from and saved to a small state file, so one-shot runs report
+    usage and rates over the time since the last run.
+    """
+
+    def __init__(self, disk_path='/', smart_interval=300.0, state_path=None, top_processes=5):
+        self._stat = ProcFile('/proc/stat', 16384)
+        self._meminfo = ProcFile('/proc/meminfo')
+        self._loadavg = ProcFile('/proc/loadavg')
+        self._uptime = ProcFile('/proc/uptime')
+        self._net_dev = ProcFile('/proc/net/dev')
+        self._net_route = ProcFile('/proc/net/route')
+        self._thermal = _open_optional('/sys/class/thermal/thermal_zone0/temp')
+        self._operstate = {}
+        self._disk_path = disk_path
+        self._disk_fd = os.open(disk_path, os.O_RDONLY)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._processes = ProcessTracker(top_processes)
+
+        try:
+            self._cores = len(os.sched_getaffinity(0))
+        except AttributeError:
+            self._cores = os.cpu_count() or 1
+        # Previous counters: {'cpu': (total, idle), 'cpu0': ...} and
+        # (interface, time, rx bytes, tx bytes, rx packets, tx packets)
+        self._prev_cpu = {}
+        self._prev_net = None
+        self._state_path = state_path
+        if state_path is not None:
+            state = read_state(state_path)
+            self._prev_cpu = state['cpu']
+            self._prev_net = state['net']
+
+        # External tools are looked up once instead of on every sample
+        self._nvidia_smi = shutil.which('nvidia-smi')
+        self._radeontop = shutil.which('radeontop')
+        self._smartctl = shutil.which('smartctl')
+        self._smart_interval = smart_interval
+        self._smart_checked = None
+        self._smart_status = 'N/A'
+
+    @property
+    def has_cpu_baseline(self):
+        """Whether the next cpu() has previous counters far enough back to diff"""
+        prev = self._prev_cpu.get('cpu')
+        if prev is None:
+            return False
+        fields = self._stat.read().split(b'\n', 1)[0].split()
+        return sum(int(value) for value in fields[1:9]) - prev[0] >= MIN_CPU_WINDOW
+
+    def save_state(self):
+        if self._state_path is not None:
+            try:
+                write_state(self._state_path, {'cpu': self._prev_cpu, 'net': self._prev_net})
+            except OSError:
+                pass  # Read-only data dir: rates just restart next run
+
+    def close(self):
+        """Save the state file (if any) and release every kept-open handle"""
+        self.save_state()
+        for handle in (self._stat, self._meminfo, self._loadavg, self._uptime,
+                       self._net_dev, self._net_route, self._thermal,
+                       *self._operstate.values()):
+            if handle is not None:
+                handle.close()
+        self._operstate.clear()
+        if self._disk_fd is not None:
+            os.close(self._disk_fd)
+            self._disk_fd = None
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def collect(self, metric):
+        """Collect a single metric family by name"""
+        if metric not in METRICS:
+            raise ValueError(f'Unknown metric: {metric}')
+        stats = selfstats.STATS
+        if stats is None:
+            return getattr(self, metric)()
+
+        labels = (('metric', metric),)
+        started = time.perf_counter()
+        try:
+            return getattr(self, metric)()
+        except Exception:
+            stats.inc('sysmon_collect_failures_total', labels)
+            raise
+        finally:
+            stats.observe('sysmon_collect_duration_seconds', labels, time.perf_counter() - started)
+
+    def collect_all(self) -> Dict[str, Sample]:
+        """Collect every metric family, keyed by name"""
+        return {metric: self.collect(metric) for metric in METRICS}
+
+    # CPU -------------------------------------------------------------------
+
+    def _loads(self):
+        fields = self._loadavg.read().split()
+        return float(fields[0]), float(fields[1]), float(fields[2])
+
+    def _usage(self, name, fields):
+        """Busy percentage of one /proc/stat cpu line since the previous sample"""
+        # user nice system idle iowait irq softirq steal (guest is in user)
+        jiffies = [int(value) for value in fields[1:9]]
+        idle = jiffies[3] + jiffies[4]
+        total = sum(jiffies)
+
+        prev = self._prev_cpu.get(name)
+        self._prev_cpu[name] = (total, idle)
+        if prev is not None and total > prev[0] and idle >= prev[1]:
+            total, idle = total - prev[0], idle - prev[1]
+        return 100.0 * (1.0 - idle / total) if total else 0.0
+
+    def cpu(self):
+        now = time.time()
+        usage = None
+        per_core = []
+        for line in self._stat.read().split(b'\n'):
+            if not line.startswith(b'cpu'):
+                break  # The cpu lines come first
+            fields = line.split()
+            name = fields[0].decode()
+            if name == 'cpu':
+                usage = self._usage(name, fields)
+            else:
+                per_core.append(self._usage(name, fields))
+
+        temperature = None
+        if self._thermal is not None:
+            try:
+                temperature = int(self._thermal.read()) / 1000
+            except (OSError, ValueError):
+                temperature = None
+
+        load_1, load_5, load_15 = self._loads()
+        return CpuSample(now, usage, self._cores, load_1, load_5, load_15,
+                         temperature, tuple(per_core))
+
+    # Memory ----------------------------------------------------------------
+
+    def memory(self):
+        now = time.time()
+        info = {}
+        for line in self._meminfo.read().split(b'\n'):
+            key, _, rest = line.partition(b':')
+            if rest:
+                info[key] = int(rest.split()[0])
+
+        total = info.get(b'MemTotal', 0)
+        free = info.get(b'MemFree', 0)
+        available = info.get(b'MemAvailable', free)
+        used = total - available
+        swap_total = info.get(b'SwapTotal', 0)
+        swap_free = info.get(b'SwapFree', 0)
+
+        percent = used / total * 100 if total else 0.0
+        return MemorySample(now, total // 1024, used // 1024, free // 1024,
+                            available // 1024, percent, swap_total // 1024,
+                            (swap_total - swap_free) // 1024, swap_free // 1024)
+
+    # Disk ------------------------------------------------------------------
+
+    def _smart(self, now):
+        """SMART health is slow to query and rarely changes, so it is cached"""
+        if self._smartctl is None:
+            return 'N/A'
+        if self._smart_checked is not None and now - self._smart_checked < self._smart_interval:
+            return self._smart_status
+
+        self._smart_checked = now
+        self._smart_status = 'N/A'
+        device = None
+        with open('/proc/mounts') as mounts:
+            for line in mounts:
+                fields = line.split()
+                if len(fields) > 1 and fields[1] == self._disk_path:
+                    device = fields[0].rstrip('0123456789')
+        if device:
+            try:
+                result = subprocess.run(['sudo', '-n', self._smartctl, '-H', device],
+                                        capture_output=True, text=True, timeout=10)
+                for line in result.stdout.splitlines():
+                    if 'smart overall-health' in line.lower():
+                        self._smart_status = line.split()[-1]
+            except (OSError, subprocess.SubprocessError):
+                pass
+        return self._smart_status
+
+    def disk(self):
+        now = time.time()
+        st = os.fstatvfs(self._disk_fd)
+        total = st.f_blocks * st.f_frsize
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+        available = st.f_bavail * st.f_frsize
+        # df rounds the percentage up and ignores reserved blocks
+        usable = used + available
+        percent = -(-used * 100 // usable) if usable else 0
+        return DiskSample(now, percent, total, used, available, self._smart(now))
+
+    # GPU -------------------------------------------------------------------
+
+    def gpu(self):
+        now = time.time()
+        name = usage = memory = temperature = 'N/A'
+        if self._nvidia_smi:
+            try:
+                result = subprocess.run(
+                    [self._nvidia_smi,
+                     '--query-gpu=name,utilization.gpu,memory.used,memory.total,temperature.gpu',
+                     '--format=csv,noheader,nounits'],
+                    capture_output=True, text=True, timeout=5)
+                fields = [field.strip() for field in result.stdout.split('\n', 1)[0].split(',')]
+                if len(fields) == 5:
+                    name, usage = fields[0], fields[1]
+                    memory = f'{fields[2]}, {fields[3]}'
+                    temperature = fields[4]
+            except (OSError, subprocess.SubprocessError):
+                pass
+        elif self._radeontop:
+            name = 'AMD GPU'
+            try:
+                result = subprocess.run([self._radeontop, '-d', '-', '-l', '1'],
+                                        capture_output=True, text=True, timeout=1)
+                output = result.stdout
+            except subprocess.TimeoutExpired as e:
+                output = e.stdout.decode() if isinstance(e.stdout, bytes) else (e.stdout or '')
+            except OSError:
+                output = ''
+            marker = output.find('gpu ')
+            if marker != -1:
+                usage = output[marker + 4:].split('%', 1)[0].strip() or 'N/A'
+        return GpuSample(now, name, usage, memory, temperature)
+
+    # Network ---------------------------------------------------------------
+
+    def _primary_interface(self):
+        for line in self._net_route.read().split(b'\n')[1:]:
+            fields = line.split()
+            # Default route: destination 0.0.0.0 with RTF_UP set
+            if len(fields) > 3 and fields[1] == b'00000000' and int(fields[3], 16) & 1:
+                return fields[0].decode()
+        return 'eth0'
+
+    def _ip_address(self, interface):
+        if fcntl is None:
+            return 'N/A'
+        try:
+            request = struct.pack('256s', interface[:15].encode())
+            packed = fcntl.ioctl(self._sock.fileno(), SIOCGIFADDR, request)
+            return socket.inet_ntoa(packed[20:24])
+        except OSError:
+            return 'N/A'
+
+    def _link_state(self, interface):
+        handle = self._operstate.get(interface)
+        if handle is None:
+            handle = _open_optional(f'/sys/class/net/{interface}/operstate')
+            if handle is None:
+                return 'unknown'
+            self._operstate[interface] = handle
+        try:
+            return handle.read().strip().decode() or 'unknown'
+        except OSError:
+            # Interface went away; reopen on the next sample
+            self._operstate.pop(interface).close()
+            return 'unknown'
+
+    def network(self):
+        now = time.time()
+        interface = self._primary_interface()
+        rx_bytes = tx_bytes = rx_packets = tx_packets = 0
+        prefix = interface.encode() + b':'
+        for line in self._net_dev.read().split(b'\n')[2:]:
+            line = line.strip()
+            if line.startswith(prefix):
+                fields = line[len(prefix):].split()
+                rx_bytes, rx_packets = int(fields[0]), int(fields[1])
+                tx_bytes, tx_packets = int(fields[8]), int(fields[9])
+                break
+
+        counters = (rx_bytes, tx_bytes, rx_packets, tx_packets)
+        rates = (None,) * 4
+        prev = self._prev_net
+        if prev is not None and prev[0] == interface and now > prev[1]:
+            deltas = [current - last for current, last in zip(counters, prev[2:])]
+            # Counters only go backwards on reset (reboot, driver reload)
+            if min(deltas) >= 0:
+                rates = tuple(delta / (now - prev[1]) for delta in deltas)
+        self._prev_net = (interface, now, *counters)
+
+        return NetworkSample(now, interface, rx_bytes, tx_bytes, rx_packets,
+                             tx_packets, self._ip_address(interface),
+                             self._link_state(interface), *rates)
+
+    # System load -----------------------------------------------------------
+
+    @staticmethod
+    def _logged_users():
+        try:
+            with open('/var/run/utmp', 'rb') as utmp:
+                data = utmp.read()
+        except OSError:
+            return 0
+        users = 0
+        for offset in range(0, len(data) - UTMP_RECORD_SIZE + 1, UTMP_RECORD_SIZE):
+            if struct.unpack_from('=h', data, offset)[0] == UTMP_USER_PROCESS:
+                users += 1
+        return users
+
+    def system(self):
+        now = time.time()
+        uptime_seconds = float(self._uptime.read().split()[0])
+        load_1, load_5, load_15 = self._loads()
+        # The same /proc walk counts processes and ranks the busiest ones
+        total, running, zombie, top_cpu, top_rss = self._processes.sample()
+        return SystemSample(now, uptime_seconds, load_1, load_5, load_15,
+                            total, running, zombie, self._logged_users(),
+                            tuple(top_cpu), tuple(top_rss))
+
+
+################################################################################
+# CSV output
+################################################################################
+
+class CsvWriter:
+    """Appends samples to the ``*_metrics.csv`` files monitor.sh maintains"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        os.makedirs(data_dir, exist_ok=True)
+
+    def path(self, metric):
+        return os.path.join(self.data_dir, f'{metric}_metrics.csv')
+
+    def write(self, metric, sample):
+        with open(self.path(metric), 'a') as f:
+            f.write(sample.to_csv_row() + '\n')
+        if metric == 'system' and (sample.top_cpu or sample.top_rss):
+            rows = process_rows(sample.timestamp, sample.top_cpu, sample.top_rss)
+            with open(self.path('process'), 'a') as f:
+                f.write('\n'.join(rows) + '\n')
+
+    def write_all(self, samples):
+        for metric, sample in samples.items():
+            self.write(metric, sample)
+
+    def close(self):
+        """Files are opened per write, so there is nothing to release"""
@@ -0,0 +1,247 @@
+"""
+Per-host storage and fleet aggregates for rows pushed by remote collectors
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Remote nodes POST their CSV rows to the web server, which keeps each host
+under ``DATA_DIR/hosts/<host>/`` in exactly the local layout: the
+``*_metrics.csv`` files plus a ``columnar/`` store. Every reader the
+server already has therefore works per host unchanged. Appends from
+several server workers are serialised with a per-host lock file.
+
+Ingest is idempotent: ``<host>/.ingest_state.json`` remembers the recent
+``X-Batch-Id`` values and the newest stored timestamp of every metric, so
+a retried batch the server already stored, or rows no newer than what the
+host already has (a second pusher under the same name, a clock stepped
+back), are skipped rather than appended twice or out of order.
+
+Each pushed batch is also run through the alert rules in one vectorized
+pass per metric; incidents are logged to ``<host>/alerts.log`` and the
+rule state is kept in ``<host>/.alert_state.json`` between batches.
+"""
+
+import os
+import re
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from sysmon.alerts import LOG_TIME_FORMAT
+from sysmon.rules import ALERT_STATE_FILE, RuleEngine, load_state, save_state
+from sysmon.storage import SCHEMAS, ColumnarWriter, csv_values, parse_timestamp
+from sysmon.tail import read_last_line
+
+HOST_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$')
+
+# CSV metric tag -> file prefix; PROCESS rows have no columnar schema
+TAGS = {metric.upper(): metric for metric in (*SCHEMAS, 'process')}
+
+# Hosts listed in fleet aggregates
+FLEET_TOP = 5
+
+# Incidents of a pushing host, in the monitor log format
+ALERT_LOG = 'alerts.log'
+
+# Batch ids and newest stored timestamp per metric of a pushing host
+INGEST_STATE_FILE = '.ingest_state.json'
+
+# Batch ids remembered per host to recognise a retried batch
+RECENT_BATCHES = 64
+
+
+def valid_host(host):
+    return bool(host) and HOST_PATTERN.match(host) is not None
+
+
+class HostStore:
+    """Per-host CSV files and columnar segments under one root directory"""
+
+    def __init__(self, root, rules=None):
+        self.root = root
+        self.rules = rules
+        self._writers = {}
+        self._lock = threading.Lock()
+
+    def host_dir(self, host):
+        """Data directory of a host; raises ValueError for unsafe names"""
+        if not valid_host(host):
+            raise ValueError(f'Invalid host name: {host!r}')
+        return os.path.join(self.root, host)
+
+    def hosts(self):
+        """Names of the hosts that have pushed data, sorted"""
+        try:
+            return sorted(entry.name for entry in os.scandir(self.root)
+                          if entry.is_dir() and valid_host(entry.name))
+        except FileNotFoundError:
+            return []
+
+    def _writer(self, host):
+        with self._lock:
+            writer = self._writers.get(host)
+            if writer is None:
+                writer = self._writers[host] = ColumnarWriter(
+                    os.path.join(self.host_dir(host), 'columnar'))
+            return writer
+
+    def ingest(self, host, lines, batch_id=None):
+        """Append pushed CSV lines for ``host``
+
+        Returns (accepted, rejected, skipped). Skipped lines were already
+        stored: the whole batch when ``batch_id`` was seen before, else
+        the rows not newer than the host's last stored row of the metric.
+        """
+        directory = self.host_dir(host)
+        grouped = {}
+        rejected = 0
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            fields = line.split(',')
+            metric = TAGS.get(fields[1]) if len(fields) > 2 else None
+            if metric is None:
+                rejected += 1
+                continue
+            try:
+                epoch = parse_timestamp(fields[0])
+                values = csv_values(metric, fields) if metric in SCHEMAS else None
+            except (ValueError, IndexError):
+                rejected += 1
+                continue
+            grouped.setdefault(metric, []).append((epoch, line, values))
+
+        if not grouped:
+            return 0, rejected, 0
+        os.makedirs(directory, exist_ok=True)
+        writer = self._writer(host)
+        with open(os.path.join(directory, '.ingest.lock'), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            state_path = os.path.join(directory, INGEST_STATE_FILE)
+            state = load_state(state_path)
+            batches = state.setdefault('batches', [])
+            if batch_id and batch_id in batches:
+                return 0, rejected, sum(len(entries) for entries in grouped.values())
+
+            last_ts = state.setdefault('last_ts', {})
+            stored = {}
+            skipped = 0
+            for metric, entries in grouped.items():
+                last = last_ts.get(metric)
+                if last is None:
+                    last = self._last_stored(directory, metric)
+                # The rows of one process tick share a timestamp and may
+                # arrive split across two batches
+                kept = [entry for entry in entries if last is None or entry[0] > last
+                        or (metric == 'process' and entry[0] == last)]
+                skipped += len(entries) - len(kept)
+                if not kept:
+                    continue
+                kept.sort(key=lambda entry: entry[0])
+                with open(os.path.join(directory, f'{metric}_metrics.csv'), 'a') as f:
+                    f.write('\n'.join(line for _, line, _ in kept) + '\n')
+                rows = [(epoch, *values) for epoch, _, values in kept if values is not None]
+                if rows:
+                    writer.append_rows(metric, rows)
+                last_ts[metric] = kept[-1][0]
+                stored[metric] = rows
+
+            if batch_id:
+                batches.append(batch_id)
+                del batches[:-RECENT_BATCHES]
+            save_state(state_path, state)
+            if self.rules and stored:
+                self._check_rules(directory, stored)
+        return sum(len(entries) for entries in grouped.values()) - skipped, rejected, skipped
+
+    @staticmethod
+    def _last_stored(directory, metric):
+        """Epoch of the last line of a host's CSV file, or None"""
+        try:
+            line = read_last_line(os.path.join(directory, f'{metric}_metrics.csv'))
+            return parse_timestamp(line.split(b',', 1)[0].decode()) if line else None
+        except (OSError, ValueError, UnicodeDecodeError):
+            return None
+
+    def _check_rules(self, directory, stored):
+        """Log the incidents a batch opens or closes; the caller holds the host lock"""
+        state_path = os.path.join(directory, ALERT_STATE_FILE)
+        engine = RuleEngine(self.rules, load_state(state_path))
+        events = []
+        for metric, rows in stored.items():
+            events.extend(engine.evaluate_rows(metric, rows)[0])
+        if events:
+            events.sort(key=lambda event: event.time)
+            with open(os.path.join(directory, ALERT_LOG), 'a') as f:
+                f.writelines(f'[{time.strftime(LOG_TIME_FORMAT, time.localtime(event.time))}] '
+                             f'[{event.level}] {event.message}\n' for event in events)
+        save_state(state_path, engine.state)
+
+    def close(self):
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) else None
+
+
+def fleet_latest(latest_by_host, top=FLEET_TOP):
+    """Fleet-wide aggregates over {host: latest_metrics()} results
+
+    CPU usage is field 1 and memory percent field 5 of the latest rows.
+    """
+    cpu, memory = [], []
+    for host, metrics in latest_by_host.items():
+        data = metrics.get('cpu', {}).get('data')
+        if data and len(data) > 1 and _number(data[1]) is not None:
+            cpu.append((data[1], host))
+        data = metrics.get('memory', {}).get('data')
+        if data and len(data) > 5 and _number(data[5]) is not None:
+            memory.append((data[5], host))
+
+    cpu.sort(reverse=True)
+    memory.sort(reverse=True)
+    return {
+        'hosts': len(latest_by_host),
+        'reporting': len({host for _, host in cpu + memory}),
+        'max_cpu': {'host': cpu[0][1], 'usage': cpu[0][0]} if cpu else None,
+        'mean_cpu': sum(value for value, _ in cpu) / len(cpu) if cpu else None,
+        'top_cpu': [{'host': host, 'usage': value} for value, host in cpu[:top]],
+        'top_memory': [{'host': host, 'percent': value} for value, host in memory[:top]]
+    }
+
+
+def fleet_summary(summaries):
+    """Combine per-host ColumnarReader.summary() results into one"""
+    columns = {}
+    count = 0
+    starts, ends = [], []
+    for summary in summaries.values():
+        count += summary['count']
+        if summary['from'] is not None:
+            starts.append(summary['from'])
+            ends.append(summary['to'])
+        for name, stats in summary['columns'].items():
+            if stats['min'] is None:
+                continue
+            combined = columns.setdefault(name, {'min': stats['min'], 'max': stats['max'],
+                                                 'weighted': 0.0, 'count': 0})
+            combined['min'] = min(combined['min'], stats['min'])
+            combined['max'] = max(combined['max'], stats['max'])
+            combined['weighted'] += stats['mean'] * summary['count']
+            combined['count'] += summary['count']
+    return {
+        'count': count,
+        'from': min(starts) if starts else None,
+        'to': max(ends) if ends else None,
+        'columns': {name: {'min': stats['min'], 'max': stats['max'],
+                           'mean': stats['weighted'] / stats['count'] if stats['count'] else None}
+                    for name, stats in columns.items()}
+    }
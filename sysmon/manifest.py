@@ -0,0 +1,197 @@
+"""
+Directory manifests for the report and log listings
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+A listing used to glob a directory and stat every file in it on each
+request. A Manifest keeps the listing in ``<directory>/.index/manifest.json``
+together with the directory's mtime, which changes whenever a file is
+created, renamed or deleted (but not when one is appended to). While the
+mtime is unchanged the listing is the index file, and within one process
+not even that has to be re-read. When the directory did change, only
+names the index has not seen are stat-ed. The index lives in a
+subdirectory so that saving it does not touch the directory's own mtime.
+For directories whose files grow in place (logs), files modified within
+``active_seconds`` are re-stat-ed on every listing.
+
+With a DirectoryVersions tracker, inotify events bump a per-directory
+counter and a listing whose counter has not moved costs no system call
+at all; directories inotify cannot watch fall back to the mtime check.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from sysmon.stream import (IN_ATTRIB, IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_MODIFY,
+                           IN_MOVE_SELF, IN_MOVED_FROM, IN_MOVED_TO, DirectoryWatcher)
+
+INDEX_DIR = '.index'
+MANIFEST_FILE = 'manifest.json'
+
+# Anything that can change a listing, plus the directory itself going away
+LISTING_EVENTS = (IN_MODIFY | IN_ATTRIB | IN_CREATE | IN_DELETE | IN_MOVED_FROM |
+                  IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF)
+
+
+def _entry(name, st):
+    return {
+        'filename': name,
+        'size': st.st_size,
+        'created': datetime.fromtimestamp(st.st_ctime).isoformat(),
+        'modified': datetime.fromtimestamp(st.st_mtime).isoformat(),
+        'mtime': st.st_mtime
+    }
+
+
+class DirectoryVersions:
+    """Change counters for a set of directories, advanced by inotify
+
+    version() is None for a directory that is not being watched (no
+    inotify, the directory did not exist yet, or it was removed since),
+    in which case callers have to look at the directory themselves.
+    """
+
+    def __init__(self, directories):
+        self.watcher = DirectoryWatcher(directories, mask=LISTING_EVENTS)
+        self._versions = {directory: 0 for directory in self.watcher.directories}
+        self._lock = threading.Lock()
+        if self.watcher.uses_inotify:
+            threading.Thread(target=self._run, name='directory-versions', daemon=True).start()
+
+    def version(self, directory):
+        return self._versions.get(directory)
+
+    def _run(self):
+        while True:
+            changed = self.watcher.wait(3600)
+            with self._lock:
+                if changed is None:
+                    # Events were lost; everything may have changed
+                    for directory in self._versions:
+                        self._versions[directory] += 1
+                    continue
+                for path in changed:
+                    if path in self._versions:
+                        # The watch itself is gone; stop trusting the counter
+                        del self._versions[path]
+                        continue
+                    directory = os.path.dirname(path)
+                    if directory in self._versions:
+                        self._versions[directory] += 1
+
+
+class Manifest:
+    """Cached listing of the files with one suffix in a directory"""
+
+    def __init__(self, directory, suffix, active_seconds=0, versions=None):
+        self.directory = directory
+        self.suffix = suffix
+        self.active_seconds = active_seconds
+        self.versions = versions
+        self.path = os.path.join(directory, INDEX_DIR, MANIFEST_FILE)
+        # Epoch seconds of the newest change files() has seen
+        self.last_modified = 0.0
+        self._version = None
+        self._mtime_ns = None
+        self._entries = {}
+        self._listing = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """(directory mtime, entries) from the index file, or (None, {})"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get('suffix') != self.suffix:
+                return None, {}
+            return data['mtime_ns'], {entry['filename']: entry for entry in data['files']}
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, {}
+
+    def _save(self, mtime_ns, entries):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f'{self.path}.{os.getpid()}.tmp'
+            # dumps() uses the C encoder, dump() to a file does not
+            data = json.dumps({'suffix': self.suffix, 'mtime_ns': mtime_ns,
+                               'files': list(entries.values())})
+            with open(temp_path, 'w') as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass  # A read-only directory still gets the in-memory listing
+
+    def _rescan(self, entries):
+        """Stat names the entries do not cover and drop deleted ones"""
+        names = {name for name in os.listdir(self.directory) if name.endswith(self.suffix)}
+        fresh = {}
+        for name in names:
+            entry = entries.get(name)
+            if entry is None:
+                try:
+                    entry = _entry(name, os.stat(os.path.join(self.directory, name)))
+                except FileNotFoundError:
+                    continue
+            fresh[name] = entry
+        return fresh
+
+    def refresh(self):
+        """Bring the index up to date; returns {filename: entry}"""
+        # Read before looking, so a change made while scanning bumps it again
+        version = self.versions.version(self.directory) if self.versions else None
+        if version is not None and version == self._version:
+            return self._entries
+        try:
+            mtime_ns = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            with self._lock:
+                if self._mtime_ns is not None:
+                    self._invalidate()
+                self._mtime_ns, self._entries, self._version = None, {}, None
+            return {}
+
+        with self._lock:
+            if mtime_ns != self._mtime_ns:
+                # Another process may already have indexed this state
+                stored_mtime, entries = self._load() if self._mtime_ns is None else (None, None)
+                if stored_mtime != mtime_ns:
+                    entries = self._rescan(entries or self._entries)
+                    self._save(mtime_ns, entries)
+                self._mtime_ns, self._entries = mtime_ns, entries
+                self._invalidate()
+
+            if self.active_seconds:
+                # Files still being appended to change size without a directory change
+                recent = time.time() - self.active_seconds
+                for name, entry in list(self._entries.items()):
+                    if entry['mtime'] < recent:
+                        continue
+                    try:
+                        st = os.stat(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        continue
+                    if st.st_mtime != entry['mtime'] or st.st_size != entry['size']:
+                        self._entries[name] = _entry(name, st)
+                        self._invalidate()
+            self._version = version
+            return self._entries
+
+    def _invalidate(self):
+        # files() builds a new list, so callers can cache on its identity
+        self._listing = None
+
+    def files(self):
+        """Listing in the /api/reports and /api/logs format, newest first"""
+        self.refresh()
+        with self._lock:
+            if self._listing is None:
+                entries = sorted(self._entries.values(), key=lambda entry: entry['mtime'],
+                                 reverse=True)
+                self._listing = [{key: value for key, value in entry.items() if key != 'mtime'}
+                                 for entry in entries]
+                # A deletion only shows in the directory's own mtime
+                newest = entries[0]['mtime'] if entries else 0.0
+                self.last_modified = max(newest, (self._mtime_ns or 0) / 1e9)
+            return self._listing
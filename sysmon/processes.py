@@ -0,0 +1,151 @@
+"""
+Per-process top-N tracker for the system load collector
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+One walk over /proc/[pid]/stat per tick yields the process counts the
+system metric reports and, from the same reads, the CPU time and resident
+set of every process. The previous tick is kept as parallel arrays sorted
+by PID, so CPU deltas come from a merge walk instead of a dict of
+per-process objects, and only the top N by CPU and by RSS are turned into
+Python objects. Command lines are read once per process (keyed on PID and
+start time) and only for processes that make it into a top list.
+"""
+
+import heapq
+import os
+from array import array
+from collections import namedtuple
+
+# utime, stime, start time and rss positions after the ")" closing comm
+STAT_STATE = 0
+STAT_UTIME = 11
+STAT_STIME = 12
+STAT_STARTTIME = 19
+STAT_RSS = 21
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# CSV field order after "TIMESTAMP,PROCESS"
+PROCESS_FIELDS = ('ranking', 'rank', 'pid', 'name', 'cpu_percent', 'rss_mb', 'state')
+RANKINGS = ('cpu', 'rss')
+
+ProcessInfo = namedtuple('ProcessInfo', 'pid name state cpu_percent rss_bytes')
+
+
+class ProcessTracker:
+    """Keeps per-PID counters between ticks and ranks the busiest processes"""
+
+    def __init__(self, top_n=5, proc_dir='/proc'):
+        self.top_n = top_n
+        self.proc_dir = proc_dir
+        # Previous tick, sorted by PID
+        self._pids = array('i')
+        self._starts = array('Q')
+        self._ticks = array('Q')
+        self._uptime = None
+        # (pid, start time) -> command line, for processes seen in a top list
+        self._names = {}
+
+    @staticmethod
+    def _read(path, size=1024, dir_fd=None):
+        fd = os.open(path, os.O_RDONLY, dir_fd=dir_fd)
+        try:
+            return os.read(fd, size)
+        finally:
+            os.close(fd)
+
+    def _name(self, pid, start, comm):
+        """Command name, resolved from cmdline once per process"""
+        key = (pid, start)
+        name = self._names.get(key)
+        if name is None:
+            try:
+                cmdline = self._read(f'{self.proc_dir}/{pid}/cmdline', 4096)
+            except OSError:
+                cmdline = b''
+            argv0 = cmdline.split(b'\0', 1)[0]
+            name = os.path.basename(argv0).decode('utf-8', errors='replace') if argv0 else ''
+            # Kernel threads and renamed processes keep their comm
+            name = (name or comm).replace(',', ' ')
+            self._names[key] = name
+        return name
+
+    def sample(self):
+        """Walk /proc once; return (total, running, zombie, top by CPU, top by RSS)"""
+        with open(f'{self.proc_dir}/uptime', 'rb') as f:
+            uptime = float(f.read().split()[0])
+        elapsed = uptime - self._uptime if self._uptime is not None else None
+
+        pids = sorted(int(name) for name in os.listdir(self.proc_dir) if name.isdigit())
+        cur_pids, starts, ticks = array('i'), array('Q'), array('Q')
+        cpu, rss, states, comms = array('d'), array('Q'), [], []
+        prev_pids, prev_starts, prev_ticks = self._pids, self._starts, self._ticks
+        prev_count = len(prev_pids)
+        total = running = zombie = 0
+        j = 0
+
+        # Paths relative to an open /proc skip one lookup per process
+        proc_fd = os.open(self.proc_dir, os.O_RDONLY)
+        try:
+            for pid in pids:
+                try:
+                    data = self._read(f'{pid}/stat', dir_fd=proc_fd)
+                except OSError:
+                    continue  # Exited while walking
+                close = data.rfind(b')')
+                fields = data[close + 2:].split(None, STAT_RSS + 1)
+                state = fields[STAT_STATE]
+                total += 1
+                if state == b'R':
+                    running += 1
+                elif state == b'Z':
+                    zombie += 1
+
+                start = int(fields[STAT_STARTTIME])
+                busy = int(fields[STAT_UTIME]) + int(fields[STAT_STIME])
+                while j < prev_count and prev_pids[j] < pid:
+                    j += 1
+                if elapsed and j < prev_count and prev_pids[j] == pid and prev_starts[j] == start:
+                    window = elapsed
+                    busy_delta = busy - prev_ticks[j]
+                else:
+                    # New since the last tick (or first tick): its whole lifetime
+                    window = uptime - start / CLOCK_TICKS
+                    busy_delta = busy
+
+                cur_pids.append(pid)
+                starts.append(start)
+                ticks.append(busy)
+                cpu.append(busy_delta / CLOCK_TICKS / window * 100 if window > 0 else 0.0)
+                rss.append(int(fields[STAT_RSS]) * PAGE_SIZE)
+                states.append(state)
+                comms.append(data[data.find(b'(') + 1:close])
+        finally:
+            os.close(proc_fd)
+
+        self._pids, self._starts, self._ticks, self._uptime = cur_pids, starts, ticks, uptime
+        if len(self._names) > 4 * len(cur_pids) + 64:
+            live = set(zip(cur_pids, starts))
+            self._names = {key: name for key, name in self._names.items() if key in live}
+
+        def info(index):
+            comm = comms[index].decode('utf-8', errors='replace')
+            return ProcessInfo(cur_pids[index], self._name(cur_pids[index], starts[index], comm),
+                               states[index].decode(), cpu[index], rss[index])
+
+        indices = range(len(cur_pids))
+        top_cpu = [info(i) for i in heapq.nlargest(self.top_n, indices, key=cpu.__getitem__)]
+        top_rss = [info(i) for i in heapq.nlargest(self.top_n, indices, key=rss.__getitem__)]
+        return total, running, zombie, top_cpu, top_rss
+
+
+def process_rows(timestamp, top_cpu, top_rss):
+    """CSV lines for one tick: TIMESTAMP,PROCESS,ranking,rank,pid,name,cpu%,rss MB,state"""
+    rows = []
+    for ranking, processes in zip(RANKINGS, (top_cpu, top_rss)):
+        for rank, process in enumerate(processes, 1):
+            rows.append(f'{timestamp},PROCESS,{ranking},{rank},{process.pid},{process.name},'
+                        f'{process.cpu_percent:.1f},{process.rss_bytes / 1048576:.1f},'
+                        f'{process.state}')
+    return rows
@@ -0,0 +1,157 @@
+"""
+Batched push of collected rows to a central web server
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+A writer like CsvWriter, except that rows are queued in memory and a
+background thread POSTs them as gzip-compressed CSV to the server's
+/api/ingest endpoint. Delivery failures keep the rows queued and retry
+with exponential backoff, so a restarting server loses nothing; only
+when more than ``max_pending`` rows pile up are the oldest dropped.
+
+Every batch carries an ``X-Batch-Id`` and a failed batch is retried
+unchanged under the same id, so a batch the server stored before the
+response was lost is recognised and not stored twice.
+"""
+
+import gzip
+import http.client
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import deque
+
+from sysmon.processes import process_rows
+
+
+class PushWriter:
+    """Queues CSV rows and sends them in compressed batches"""
+
+    def __init__(self, url, host, token=None, batch_size=500, flush_interval=5.0,
+                 max_pending=100000, timeout=10.0, max_backoff=60.0):
+        separator = '&' if '?' in url else '?'
+        self.url = f"{url}{separator}{urllib.parse.urlencode({'host': host})}"
+        self.host = host
+        self.token = token
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.sent = 0
+        self.dropped = 0
+        self.failures = 0
+        self.last_error = None
+        self._pending = deque()
+        # (batch id, rows) being delivered; kept as is until the server answers
+        self._unsent = None
+        self._sender = uuid.uuid4().hex[:16]
+        self._sequence = 0
+        self._cond = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='push', daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        with self._cond:
+            return len(self._pending) + (len(self._unsent[1]) if self._unsent else 0)
+
+    def _trim(self):
+        """Drop the oldest rows beyond max_pending (caller holds the lock)"""
+        while len(self._pending) > self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+
+    def add_rows(self, rows):
+        """Queue CSV lines (without newlines) for the next batch"""
+        with self._cond:
+            self._pending.extend(rows)
+            self._trim()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def write(self, metric, sample):
+        rows = [sample.to_csv_row()]
+        if metric == 'system' and (sample.top_cpu or sample.top_rss):
+            rows += process_rows(sample.timestamp, sample.top_cpu, sample.top_rss)
+        self.add_rows(rows)
+
+    def write_all(self, samples):
+        for metric, sample in samples.items():
+            self.write(metric, sample)
+
+    def _post(self, batch_id, rows):
+        body = gzip.compress(('\n'.join(rows) + '\n').encode(), compresslevel=6)
+        headers = {'Content-Type': 'text/csv', 'Content-Encoding': 'gzip',
+                   'X-Batch-Id': batch_id}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        request = urllib.request.Request(self.url, data=body, headers=headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def flush(self):
+        """Send everything queued now; returns False when a batch failed"""
+        with self._send_lock:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return True
+                batch_id, rows = batch
+                try:
+                    self._post(batch_id, rows)
+                except urllib.error.HTTPError as e:
+                    self.failures += 1
+                    self.last_error = f'HTTP {e.code}'
+                    if 400 <= e.code < 500 and e.code != 429:
+                        # The server will never accept these rows
+                        self.dropped += len(rows)
+                        self._unsent = None
+                        continue
+                    return False
+                except (OSError, http.client.HTTPException) as e:
+                    self.failures += 1
+                    self.last_error = str(e)
+                    return False
+                self._unsent = None
+                self.sent += len(rows)
+
+    def _next_batch(self):
+        """The batch to retry, else the next ``batch_size`` queued rows under a new id"""
+        with self._cond:
+            if self._unsent is None:
+                count = min(self.batch_size, len(self._pending))
+                if not count:
+                    return None
+                self._sequence += 1
+                self._unsent = (f'{self._sender}-{self._sequence}',
+                                [self._pending.popleft() for _ in range(count)])
+            return self._unsent
+
+    def _run(self):
+        delay = self.flush_interval
+        failing = False
+        while True:
+            with self._cond:
+                # After a failure wait out the backoff even if a batch is ready
+                if not self._closed and (failing or len(self._pending) < self.batch_size):
+                    self._cond.wait(delay)
+                if self._closed:
+                    return
+            if self.flush():
+                failing = False
+                delay = self.flush_interval
+            else:
+                failing = True
+                delay = min(max(delay * 2, 1.0), self.max_backoff)
+
+    def close(self):
+        """Stop the sender thread and make one last attempt to deliver"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
@@ -0,0 +1,262 @@
+"""
+Time-range and downsampling queries over the columnar store
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+A query binary-searches the ``ts`` column for the requested window and
+folds the samples into fixed-width buckets with NumPy reductions, so the
+number of points returned depends on the window and step only, never on
+how many raw samples fall inside it. When a rollup tier is at least as
+fine as the requested step, the query reads that tier instead of the raw
+samples; only the spans it does not cover (the newest, not yet rolled-up
+tail, or history collected without rollups) come from finer tiers or the
+raw data.
+"""
+
+import math
+
+import numpy as np
+
+AGGREGATES = ('mean', 'min', 'max', 'p95')
+DEFAULT_POINTS = 300
+MAX_POINTS = 5000
+DEFAULT_WINDOW = 3600
+
+
+def _empty(columns):
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), {
+        name: np.empty(0) for name in columns}
+
+
+def _bucket_starts(ts, step):
+    """Bucket index of every sample and the offset where each bucket begins"""
+    buckets = np.asarray(ts, dtype=np.int64) // step
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    return buckets, starts
+
+
+def bucket_aggregate(ts, columns, step, agg='mean'):
+    """Fold samples into ``step``-second buckets aligned to the epoch
+
+    ``ts`` must be sorted. Returns (bucket start times, sample counts,
+    {column: aggregated values}); buckets without samples are omitted and
+    NaN values are ignored. Every reduction is a single NumPy call over
+    the whole batch.
+    """
+    if agg not in AGGREGATES:
+        raise ValueError(f'Unknown aggregate: {agg}')
+    if len(ts) == 0:
+        return _empty(columns)
+
+    buckets, starts = _bucket_starts(ts, step)
+    counts = np.diff(np.append(starts, len(buckets)))
+
+    result = {}
+    for name, column in columns.items():
+        values = np.asarray(column, dtype=np.float64)
+        valid = ~np.isnan(values)
+        n_valid = np.add.reduceat(valid.astype(np.int64), starts)
+        empty = n_valid == 0
+
+        if agg == 'mean':
+            sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out = sums / n_valid
+        elif agg == 'min':
+            out = np.minimum.reduceat(np.where(valid, values, np.inf), starts)
+        elif agg == 'max':
+            out = np.maximum.reduceat(np.where(valid, values, -np.inf), starts)
+        else:
+            # Nearest-rank p95: sort by (bucket, value) with NaN last, then
+            # pick the ranked element of each bucket
+            order = np.lexsort((np.where(valid, values, np.inf), buckets))
+            ordered = values[order]
+            rank = np.maximum(np.ceil(0.95 * n_valid).astype(np.int64) - 1, 0)
+            out = ordered[np.minimum(starts + rank, len(ordered) - 1)]
+        out = np.where(empty, np.nan, out)
+        result[name] = out
+
+    return buckets[starts] * step, counts, result
+
+
+def bucket_rollup(ts, counts, stats, step, agg='mean'):
+    """Re-bucket pre-aggregated rows into coarser ``step``-second buckets
+
+    ``stats`` maps each column to its (min, max, mean) arrays; means are
+    combined weighted by the row counts. p95 cannot be derived from
+    rollups and is rejected.
+    """
+    if agg not in ('mean', 'min', 'max'):
+        raise ValueError(f'Aggregate {agg} needs raw samples')
+    if len(ts) == 0:
+        return _empty(stats)
+
+    buckets, starts = _bucket_starts(ts, step)
+    counts = np.asarray(counts, dtype=np.int64)
+    samples = np.add.reduceat(counts, starts)
+
+    result = {}
+    for name, (mins, maxs, means) in stats.items():
+        valid = ~np.isnan(means)
+        empty = np.add.reduceat(valid.astype(np.int64), starts) == 0
+        if agg == 'min':
+            out = np.minimum.reduceat(np.where(valid, mins, np.inf), starts)
+        elif agg == 'max':
+            out = np.maximum.reduceat(np.where(valid, maxs, -np.inf), starts)
+        else:
+            weights = np.where(valid, counts, 0)
+            sums = np.add.reduceat(np.where(valid, means * counts, 0.0), starts)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out = sums / np.add.reduceat(weights, starts)
+        result[name] = np.where(empty, np.nan, out)
+
+    return buckets[starts] * step, samples, result
+
+
+def _rollup_parts(rollups, reader, metric, tiers, start, end, used):
+    """Yield (ts, counts, {column: [mins, maxs, means]}) pieces covering [start, end]
+
+    Rows of the first of ``tiers`` are used where they exist. The spans it
+    does not cover come from the next finer tier and finally from the raw
+    samples: before its first row (history older than the rollups), between
+    rows more than a bucket apart (GUI or one-shot collection, which write
+    no rollups) and after its last row (the bucket the collector still
+    holds in memory). The first and last bucket of every run of rows may
+    have been rolled up from part of its samples only, so they are read
+    from the finer source too. Tiers that yielded rows are appended to
+    ``used``.
+    """
+    names = [name for name, _ in reader.schemas[metric]]
+    if not tiers:
+        raw = reader.query(metric, start, end)
+        if len(raw['ts']):
+            columns = {name: np.asarray(raw[name], dtype=np.float64) for name in names}
+            yield (raw['ts'], np.ones(len(raw['ts']), dtype=np.int64),
+                   {name: [column] * 3 for name, column in columns.items()})
+        return
+
+    (tier, seconds), finer = tiers[0], tiers[1:]
+    rows = rollups.readers[tier].query(metric, start, end)
+    ts = np.asarray(rows['ts'], dtype=np.int64)
+    whole = np.zeros(len(ts), dtype=bool)
+    contiguous = ts[1:] == ts[:-1] + seconds
+    whole[1:-1] = contiguous[:-1] & contiguous[1:]
+    ts = ts[whole]
+    if len(ts):
+        used.append(tier)
+        yield ts, rows['count'][whole], {
+            name: [rows[f'{name}_{stat}'][whole] for stat in ('min', 'max', 'mean')]
+            for name in names}
+
+    gap_starts = np.concatenate(([start], ts + seconds))
+    gap_ends = np.concatenate((ts - 1, [end]))
+    uncovered = gap_ends >= gap_starts
+    for gap_start, gap_end in zip(gap_starts[uncovered], gap_ends[uncovered]):
+        yield from _rollup_parts(rollups, reader, metric, finer,
+                                 int(gap_start), int(gap_end), used)
+
+
+def _rollup_history(rollups, reader, metric, start, end, step, agg):
+    """Answer a query from the rollup tiers, or return None when none has rows"""
+    tiers = rollups.candidates(metric, step)
+    used = []
+    parts = list(_rollup_parts(rollups, reader, metric, tiers, start, end, used))
+    if not used:
+        return None
+
+    # Align buckets to the coarsest tier read so no rollup row straddles two
+    tier = used[0]
+    seconds = dict(tiers)[tier]
+    step = -(-step // seconds) * seconds
+    ts = np.concatenate([part[0] for part in parts]).astype(np.int64)
+    order = np.argsort(ts, kind='stable')
+    counts = np.concatenate([part[1] for part in parts]).astype(np.int64)[order]
+    stats = {name: [np.concatenate([np.asarray(part[2][name][i], dtype=np.float64)
+                                    for part in parts])[order] for i in range(3)]
+             for name in parts[0][2]}
+
+    bucket_ts, samples, values = bucket_rollup(ts[order], counts, stats, step, agg)
+    return tier, step, bucket_ts, samples, values
+
+
+def _window(reader, metric, start, end):
+    """Missing bounds default to the newest sample and one hour before it"""
+    if end is None or start is None:
+        latest = reader.latest_ts(metric)
+        if end is None:
+            end = latest if latest is not None else 0
+        if start is None:
+            start = end - DEFAULT_WINDOW
+    return start, end
+
+
+def history(reader, metric, start=None, end=None, step=None, agg='mean',
+            points=DEFAULT_POINTS, rollups=None):
+    """Downsampled history of one metric family from a ColumnarReader
+
+    Missing bounds default to the newest sample and one hour before it.
+    Without an explicit step the window is split into ``points`` buckets;
+    either way at most MAX_POINTS buckets are produced. With a
+    RollupReader the coarsest tier no wider than the step is used. A
+    SqliteReader aggregates raw samples in SQL (except p95).
+    """
+    start, end = _window(reader, metric, start, end)
+    window = max(end - start, 1)
+    if step is None:
+        step = max(1, math.ceil(window / max(1, min(points, MAX_POINTS))))
+    # Widen the step rather than return an unbounded number of points
+    step = max(step, math.ceil(window / MAX_POINTS))
+
+    answer = None
+    if rollups is not None and agg != 'p95':
+        answer = _rollup_history(rollups, reader, metric, start, end, step, agg)
+    if answer is not None:
+        tier, step, bucket_ts, counts, values = answer
+    else:
+        tier = 'raw'
+        # A database reader folds the buckets itself instead of returning every sample
+        folded = None
+        if hasattr(reader, 'bucket_aggregate'):
+            folded = reader.bucket_aggregate(metric, start, end, step, agg)
+        if folded is None:
+            columns = reader.query(metric, start, end)
+            ts = columns.pop('ts')
+            folded = bucket_aggregate(ts, columns, step, agg)
+        bucket_ts, counts, values = folded
+
+    return {
+        'metric_type': metric,
+        'from': int(start),
+        'to': int(end),
+        'step': int(step),
+        'agg': agg,
+        'tier': tier,
+        'count': int(counts.sum()),
+        'ts': bucket_ts,
+        'samples': counts,
+        'columns': values
+    }
+
+
+def raw_history(reader, metric, start=None, end=None):
+    """Every stored sample of one metric family between two bounds
+
+    Same result layout as history() with ``step`` 0 and no ``samples``
+    counts; the columns keep their stored dtypes and a window inside one
+    segment stays a set of memmap views, so nothing is copied until the
+    caller encodes it.
+    """
+    start, end = _window(reader, metric, start, end)
+    columns = reader.query(metric, start, end)
+    ts = columns.pop('ts')
+    return {
+        'metric_type': metric,
+        'from': int(start),
+        'to': int(end),
+        'step': 0,
+        'agg': None,
+        'tier': 'raw',
+        'count': int(len(ts)),
+        'ts': ts,
+        'samples': None,
+        'columns': columns
+    }
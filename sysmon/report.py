@@ -0,0 +1,472 @@
+"""
+Streaming summary reports over the stored metric history
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+A report covers a time window instead of a single instant. Each
+``*_metrics.csv`` file is read once, after any rotated archives that
+overlap the window: the files are append-only and so in time order, which
+lets a binary search over byte offsets find the first row of the window,
+and every row inside it updates running min/max/mean, a p95 sketch and
+the threshold-breach episodes. The log files are scanned the same way for
+WARNING/ERROR lines. Memory does not grow with the window: the p95 comes
+from logarithmic buckets, not from the samples themselves. The Markdown is
+built in memory and written with a single write, and nothing is collected
+or appended to the data files while a report is generated.
+"""
+
+import gzip
+import math
+import os
+import platform
+import socket
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from sysmon.alerts import ALERT_LEVELS, parse_alert
+from sysmon.collector import METRICS, format_timestamp
+from sysmon.retention import STAMP_LENGTH, metric_archives
+from sysmon.rules import load_rules, threshold_limits
+from sysmon.storage import SCHEMAS, csv_values, parse_timestamp
+
+DEFAULT_WINDOW = 86400
+# A gap between samples longer than this ends a breach (the collector stopped)
+BREACH_GAP = 600
+SEEK_BLOCK = 64 * 1024
+RECENT_ALERTS = 20
+
+# Relative error of the p95 estimate, and the most buckets one column keeps
+SKETCH_ACCURACY = 0.002
+SKETCH_MAX_BINS = 4096
+# Values a sketch holds before binning them in one numpy pass
+SKETCH_BUFFER = 8192
+
+# Columns summarised per metric family, with the labels used in the report
+REPORT_COLUMNS = {
+    'cpu': (('usage', 'Usage (%)'), ('temperature', 'Temperature (°C)'),
+            ('load_1', 'Load (1m)')),
+    'memory': (('percent', 'Usage (%)'), ('used_mb', 'Used (MB)'),
+               ('swap_used_mb', 'Swap used (MB)')),
+    'disk': (('usage_percent', 'Usage (%)'),),
+    'gpu': (('usage', 'Usage (%)'), ('temperature', 'Temperature (°C)')),
+    'network': (('rx_rate', 'RX (bytes/s)'), ('tx_rate', 'TX (bytes/s)')),
+    'system': (('load_1', 'Load (1m)'), ('total_processes', 'Processes'),
+               ('zombie_processes', 'Zombies')),
+}
+
+TITLES = {'cpu': 'CPU', 'memory': 'Memory', 'disk': 'Disk', 'gpu': 'GPU',
+          'network': 'Network', 'system': 'System Load'}
+
+
+def parse_time(value):
+    """Epoch seconds from epoch digits or a ``%Y%m%d_%H%M%S`` stamp"""
+    value = str(value).strip()
+    return int(value) if value.isdigit() else parse_timestamp(value)
+
+
+class StampClock:
+    """Epoch seconds of CSV stamps with one mktime call per hour of data"""
+
+    def __init__(self):
+        self._hours = {}
+
+    def epoch(self, stamp):
+        if len(stamp) != STAMP_LENGTH:
+            raise ValueError(f'Bad timestamp: {stamp!r}')
+        hour = stamp[:11]
+        base = self._hours.get(hour)
+        if base is None:
+            base = self._hours[hour] = parse_timestamp(hour + '0000')
+        return base + int(stamp[11:13]) * 60 + int(stamp[13:15])
+
+
+class QuantileSketch:
+    """Quantiles within a relative error, in memory bounded by max_bins
+
+    Values fall into logarithmic buckets (the DDSketch layout): positive
+    bucket i holds (gamma**(i-1), gamma**i], negative values mirror it and
+    zeros are counted apart. Values are binned with numpy a buffer at a
+    time. Past ``max_bins`` the lowest buckets are merged, which only
+    coarsens the low quantiles.
+    """
+
+    def __init__(self, accuracy=SKETCH_ACCURACY, max_bins=SKETCH_MAX_BINS):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.count = 0
+        self._buffer = array('d')
+        self._zeros = 0
+        self._positive = {}
+        self._negative = {}
+        # Merged buckets: positive indices below _floor count at _floor,
+        # negative ones above _ceiling at _ceiling
+        self._floor = None
+        self._ceiling = None
+
+    def add(self, value):
+        self._buffer.append(value)
+        if len(self._buffer) >= SKETCH_BUFFER:
+            self._flush()
+
+    def _bin(self, buckets, magnitudes, clip):
+        indices = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        if clip is not None:
+            indices = clip(indices)
+        for index, count in zip(*np.unique(indices, return_counts=True)):
+            buckets[int(index)] = buckets.get(int(index), 0) + int(count)
+
+    def _flush(self):
+        values = np.frombuffer(self._buffer, dtype=np.float64)
+        self.count += len(values)
+        self._zeros += int(np.count_nonzero(values == 0))
+        self._bin(self._positive, values[values > 0],
+                  None if self._floor is None else lambda i: np.maximum(i, self._floor))
+        self._bin(self._negative, -values[values < 0],
+                  None if self._ceiling is None else lambda i: np.minimum(i, self._ceiling))
+        del values
+        self._buffer = array('d')
+        if len(self._positive) + len(self._negative) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        """Merge the lowest buckets until three quarters of max_bins are left"""
+        excess = len(self._positive) + len(self._negative) - self.max_bins * 3 // 4
+        if self._negative:
+            keys = sorted(self._negative, reverse=True)[:excess + 1]
+            self._ceiling = keys[-1]
+            self._negative[self._ceiling] = sum(self._negative.pop(key) for key in keys)
+            excess -= len(keys) - 1
+        if excess > 0:
+            keys = sorted(self._positive)[:excess + 1]
+            self._floor = keys[-1]
+            self._positive[self._floor] = sum(self._positive.pop(key) for key in keys)
+
+    def _value(self, index):
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def quantile(self, q):
+        """Nearest-rank estimate of quantile ``q``, or None without values"""
+        if self._buffer:
+            self._flush()
+        if not self.count:
+            return None
+        rank = max(math.ceil(q * self.count) - 1, 0)
+        for index in sorted(self._negative, reverse=True):
+            rank -= self._negative[index]
+            if rank < 0:
+                return -self._value(index)
+        rank -= self._zeros
+        if rank < 0:
+            return 0.0
+        for index in sorted(self._positive):
+            rank -= self._positive[index]
+            if rank < 0:
+                return self._value(index)
+
+
+class ColumnStats:
+    """Running min/max/mean of one column, plus a sketch for the p95"""
+
+    def __init__(self):
+        self.sketch = QuantileSketch()
+        self.total = 0.0
+        self.low = math.inf
+        self.high = -math.inf
+
+    def add(self, value):
+        if value != value:
+            return  # NaN: the collector wrote N/A
+        self.sketch.add(value)
+        self.total += value
+        if value < self.low:
+            self.low = value
+        if value > self.high:
+            self.high = value
+
+    def result(self):
+        p95 = self.sketch.quantile(0.95)
+        count = self.sketch.count
+        if not count:
+            return {'count': 0, 'min': None, 'max': None, 'mean': None, 'p95': None}
+        # Nearest rank like the p95 aggregate of /api/metrics/history, within
+        # SKETCH_ACCURACY of it; the exact min/max bound the estimate
+        p95 = min(max(p95, self.low), self.high)
+        return {'count': count, 'min': self.low, 'max': self.high,
+                'mean': self.total / count, 'p95': p95}
+
+
+class BreachTracker:
+    """Episodes of consecutive samples above a threshold
+
+    An episode lasts from its first sample above the threshold to the
+    first sample back below it, or to its last sample when the window
+    ends or the collector stopped for longer than BREACH_GAP.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.episodes = 0
+        self.seconds = 0
+        self.longest = 0
+        self._start = None
+        self._previous = None
+
+    def _close(self, end):
+        duration = end - self._start
+        self.seconds += duration
+        self.longest = max(self.longest, duration)
+        self._start = None
+
+    def add(self, ts, value):
+        above = value > self.threshold  # False for NaN
+        if self._start is not None:
+            if ts - self._previous > BREACH_GAP:
+                self._close(self._previous)
+            elif not above:
+                self._close(ts)
+        if above and self._start is None:
+            self._start = ts
+            self.episodes += 1
+        self._previous = ts
+
+    def result(self):
+        if self._start is not None:
+            self._close(self._previous)
+        return {'threshold': self.threshold, 'episodes': self.episodes,
+                'seconds': self.seconds, 'longest': self.longest}
+
+
+def seek_window(f, first_stamp, block=SEEK_BLOCK):
+    """Move a binary file to a line start at or before the first row >= first_stamp"""
+    lo, hi = 0, f.seek(0, os.SEEK_END)
+    while hi - lo > block:
+        mid = (lo + hi) // 2
+        f.seek(mid)
+        f.readline()  # Finish the line ``mid`` fell into
+        line = f.readline()
+        if line and line[:STAMP_LENGTH] < first_stamp:
+            lo = mid
+        else:
+            hi = mid
+    f.seek(lo)
+    if lo:
+        f.readline()
+
+
+def summarize_metric(paths, metric, start, end, limits, clock=None):
+    """One pass over a metric's CSV files (oldest first) between two epoch times"""
+    clock = clock or StampClock()
+    names = [name for name, _ in SCHEMAS[metric]]
+    wanted = [(names.index(name), name) for name, _ in REPORT_COLUMNS[metric]]
+    stats = {name: ColumnStats() for _, name in wanted}
+    breaches = {name: BreachTracker(limits[(metric, name)])
+                for _, name in wanted if (metric, name) in limits}
+    first_stamp = format_timestamp(start).encode()
+    last_stamp = format_timestamp(end).encode()
+    count = 0
+    first = last = None
+
+    for path in paths:
+        # Rotated archives are compressed and read from the start
+        compressed = path.endswith('.gz')
+        with (gzip.open(path, 'rb') if compressed else open(path, 'rb')) as f:
+            if not compressed:
+                seek_window(f, first_stamp)
+            for line in f:
+                stamp = line[:STAMP_LENGTH]
+                if stamp < first_stamp:
+                    continue
+                if stamp > last_stamp:
+                    break
+                if not line.endswith(b'\n'):
+                    break  # Still being written by the collector
+                fields = line.decode('utf-8', errors='replace').rstrip('\r\n').split(',')
+                try:
+                    ts = clock.epoch(fields[0])
+                    values = csv_values(metric, fields)
+                except (ValueError, IndexError):
+                    continue  # Skip malformed rows
+                count += 1
+                if first is None:
+                    first = ts
+                last = ts
+                for index, name in wanted:
+                    stats[name].add(values[index])
+                    if name in breaches:
+                        breaches[name].add(ts, values[index])
+
+    return {
+        'count': count,
+        'first': first,
+        'last': last,
+        'columns': {name: column.result() for name, column in stats.items()},
+        'breaches': {name: tracker.result() for name, tracker in breaches.items()}
+    }
+
+
+def summarize_alerts(log_dir, start, end, recent=RECENT_ALERTS):
+    """Per-level counts and the newest WARNING/ERROR lines logged in the window"""
+    counts = dict.fromkeys(ALERT_LEVELS, 0)
+    newest = deque(maxlen=recent)
+    try:
+        paths = [entry.path for entry in os.scandir(log_dir)
+                 if entry.name.endswith('.log') and entry.stat().st_mtime >= start]
+    except FileNotFoundError:
+        paths = []
+    paths.sort(key=os.path.getmtime)
+    for path in paths:
+        with open(path, 'rb') as f:
+            for line in f:
+                # Cheap byte test first; most lines are INFO
+                if b'] [WARNING] ' not in line and b'] [ERROR] ' not in line:
+                    continue
+                alert = parse_alert(line)
+                if alert is None or alert.time is None or not start <= alert.time <= end:
+                    continue
+                counts[alert.level] += 1
+                newest.append(alert.line)
+    return {'counts': counts, 'recent': list(newest)}
+
+
+def build_report(data_dir, log_dir=None, start=None, end=None, window=DEFAULT_WINDOW,
+                 limits=None, host=None):
+    """Summary statistics of every metric family between ``start`` and ``end``
+
+    Missing bounds default to now and ``window`` seconds before the end.
+    Alerts are only summarised when ``log_dir`` is given.
+    """
+    end = int(time.time()) if end is None else end
+    start = end - window if start is None else start
+    if start > end:
+        raise ValueError('Report window ends before it starts')
+    # Breach episodes are measured against the 'above' alert rules
+    limits = threshold_limits(load_rules()) if limits is None else limits
+    clock = StampClock()
+
+    metrics = {}
+    for metric in METRICS:
+        paths = metric_archives(data_dir, metric, start, end)
+        path = os.path.join(data_dir, f'{metric}_metrics.csv')
+        if os.path.exists(path):
+            paths.append(path)
+        if paths:
+            metrics[metric] = summarize_metric(paths, metric, start, end, limits, clock)
+
+    return {
+        'host': host or socket.gethostname(),
+        'generated': int(time.time()),
+        'from': start,
+        'to': end,
+        'metrics': metrics,
+        'alerts': summarize_alerts(log_dir, start, end) if log_dir else None
+    }
+
+
+################################################################################
+# Markdown
+################################################################################
+
+def _time(epoch):
+    return datetime.fromtimestamp(epoch).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _duration(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f'{hours}h {minutes:02d}m'
+    if minutes:
+        return f'{minutes}m {seconds:02d}s'
+    return f'{seconds}s'
+
+
+def _number(value):
+    if value is None:
+        return 'N/A'
+    return f'{value:,.0f}' if abs(value) >= 1000 else f'{value:.2f}'
+
+
+def render_markdown(report):
+    """The report as a Markdown document, in the layout monitor.sh used"""
+    lines = [
+        '# System Monitoring Report',
+        '',
+        '---',
+        '',
+        '## Report Information',
+        f'- **Generated**: {_time(report["generated"])}',
+        f'- **Hostname**: {report["host"]}',
+        f'- **OS**: {platform.system()} {platform.release()}',
+        f'- **Window**: {_time(report["from"])} to {_time(report["to"])} '
+        f'({_duration(report["to"] - report["from"])})',
+        '',
+        '## System Overview',
+        '',
+    ]
+
+    for metric, summary in report['metrics'].items():
+        lines.append(f'### {TITLES[metric]} Metrics')
+        if not summary['count']:
+            lines += ['No samples in this window.', '']
+            continue
+        lines += [
+            f'{summary["count"]} samples from {_time(summary["first"])} '
+            f'to {_time(summary["last"])}.',
+            '',
+            '| Column | Min | Max | Mean | p95 |',
+            '|--------|-----|-----|------|-----|',
+        ]
+        for name, label in REPORT_COLUMNS[metric]:
+            column = summary['columns'][name]
+            lines.append(f'| {label} | {_number(column["min"])} | {_number(column["max"])} '
+                         f'| {_number(column["mean"])} | {_number(column["p95"])} |')
+        lines.append('')
+
+        breaches = [(name, label, summary['breaches'][name])
+                    for name, label in REPORT_COLUMNS[metric] if name in summary['breaches']]
+        if breaches:
+            lines += ['| Threshold | Breaches | Time above | Longest |',
+                      '|-----------|----------|------------|---------|']
+            for _, label, breach in breaches:
+                lines.append(f'| {label} > {breach["threshold"]:g} | {breach["episodes"]} '
+                             f'| {_duration(breach["seconds"])} | {_duration(breach["longest"])} |')
+            lines.append('')
+
+    alerts = report['alerts']
+    if alerts is not None:
+        lines += ['## Alerts and Warnings', '']
+        if any(alerts['counts'].values()):
+            lines.append(', '.join(f'**{level}**: {count}'
+                                   for level, count in alerts['counts'].items()))
+            lines += ['', f'Most recent {len(alerts["recent"])}:', '```',
+                      *alerts['recent'], '```']
+        else:
+            lines.append('No warnings or errors detected.')
+        lines.append('')
+
+    lines += ['---', '*Report generated by System Monitor v1.0*', '']
+    return '\n'.join(lines)
+
+
+def write_report(report_dir, report):
+    """Render ``report`` into REPORT_DIR/system_report_<timestamp>.md; returns the path
+
+    The file appears atomically, so report listings never see half of one.
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, f'system_report_{format_timestamp(report["generated"])}.md')
+    temp_path = os.path.join(report_dir, f'.{os.path.basename(path)}.tmp')
+    with open(temp_path, 'w') as f:
+        f.write(render_markdown(report))
+    os.replace(temp_path, path)
+    return path
+
+
+def generate_report(data_dir, report_dir, log_dir=None, **kwargs):
+    """Build and write a report; returns (path, report)"""
+    report = build_report(data_dir, log_dir, **kwargs)
+    return write_report(report_dir, report), report
@@ -0,0 +1,331 @@
+"""
+Retention, rotation and compaction of data/, logs/ and reports/
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+One pass applies every size and age policy:
+
+- A ``*_metrics.csv`` larger than CSV_ROTATE_SIZE, or whose first row is
+  older than CSV_ROTATE_AGE, is renamed into ``data/archive/`` as
+  ``<metric>_metrics_<first>-<last>.csv``. The next pass gzips it, after
+  any writer that still had it open is done. Archives older than
+  ARCHIVE_RETENTION or beyond ARCHIVE_MAX_SIZE are deleted, oldest first.
+- Columnar segments older than RAW_RETENTION are folded into each rollup
+  tier that has no segment for that day (and is still within its own
+  retention), then deleted. GPU has no rollups and is simply dropped.
+  Samples in ``data/metrics.db`` (STORAGE_BACKEND=sqlite) older than
+  RAW_RETENTION are deleted; the collector rolled them up as they came.
+- Logs untouched for LOG_COMPRESS_AGE are gzipped into ``logs/archive/``,
+  where LOG_RETENTION and LOG_MAX_SIZE apply; reports older than
+  REPORT_RETENTION are deleted.
+
+Pushed hosts under ``data/hosts/`` get the same CSV and raw-segment
+policies. Finally the report and log manifests are refreshed, so the
+listing endpoints start from an up-to-date index.
+"""
+
+import gzip
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+from sysmon.collector import format_timestamp
+from sysmon.fleet import valid_host
+from sysmon.manifest import Manifest
+from sysmon.rollup import ROLLUP_SCHEMAS, TIERS, RollupWriter
+from sysmon.storage import (SCHEMAS, TYPECODES, parse_duration, parse_human_size,
+                            parse_timestamp, segment_name)
+from sysmon.tail import read_last_line
+from sysmon.tsdb import DB_FILE, prune_rows
+
+ARCHIVE_DIR = 'archive'
+STAMP_LENGTH = len('20260101_000000')
+STAMP_PATTERN = re.compile(r'^\d{8}_\d{6}$')
+ARCHIVE_PATTERN = re.compile(
+    r'^(?P<metric>[a-z]+)_metrics_(?P<first>\d{8}_\d{6})-(?P<last>\d{8}_\d{6})\.csv(?:\.gz)?$')
+
+# Rotated files are compressed once nothing has written to them for this long
+SETTLE_SECONDS = 60
+# Seconds between passes run by the continuous collector
+DEFAULT_INTERVAL = 3600
+
+RetentionPolicy = namedtuple('RetentionPolicy', [
+    'csv_rotate_size', 'csv_rotate_age', 'archive_retention', 'archive_max_size',
+    'raw_retention', 'log_compress_age', 'log_retention', 'log_max_size',
+    'report_retention'])
+
+# (policy field, environment variable, default); 0 or "off" disables a policy
+POLICY_SETTINGS = (
+    ('csv_rotate_size', 'CSV_ROTATE_SIZE', '64M'),
+    ('csv_rotate_age', 'CSV_ROTATE_AGE', '7d'),
+    ('archive_retention', 'ARCHIVE_RETENTION', '90d'),
+    ('archive_max_size', 'ARCHIVE_MAX_SIZE', '1G'),
+    ('raw_retention', 'RAW_RETENTION', '30d'),
+    ('log_compress_age', 'LOG_COMPRESS_AGE', '1d'),
+    ('log_retention', 'LOG_RETENTION', '30d'),
+    ('log_max_size', 'LOG_MAX_SIZE', '256M'),
+    ('report_retention', 'REPORT_RETENTION', '90d'),
+)
+SIZE_FIELDS = ('csv_rotate_size', 'archive_max_size', 'log_max_size')
+
+
+def policy_from_env(environ=os.environ):
+    """RetentionPolicy from the environment; raises ValueError for bad values"""
+    values = {}
+    for field, name, default in POLICY_SETTINGS:
+        value = environ.get(name, default).strip()
+        if value.lower() in ('', '0', 'off', 'none'):
+            values[field] = None
+        elif field in SIZE_FIELDS:
+            values[field] = parse_human_size(value.upper())
+        else:
+            values[field] = parse_duration(value)
+    return RetentionPolicy(**values)
+
+
+################################################################################
+# CSV rotation
+################################################################################
+
+def metric_archives(data_dir, metric, start=None, end=None):
+    """Archived CSV files of a metric overlapping [start, end], oldest first"""
+    first_stamp = format_timestamp(start) if start is not None else None
+    last_stamp = format_timestamp(end) if end is not None else None
+    try:
+        names = os.listdir(os.path.join(data_dir, ARCHIVE_DIR))
+    except FileNotFoundError:
+        return []
+    archives = []
+    for name in names:
+        match = ARCHIVE_PATTERN.match(name)
+        if match is None or match['metric'] != metric:
+            continue
+        if (first_stamp and match['last'] < first_stamp) or \
+                (last_stamp and match['first'] > last_stamp):
+            continue
+        archives.append((match['first'], os.path.join(data_dir, ARCHIVE_DIR, name)))
+    return [path for _, path in sorted(archives)]
+
+
+def _row_stamp(line, fallback):
+    stamp = line[:STAMP_LENGTH].decode('ascii', errors='replace') if line else ''
+    return stamp if STAMP_PATTERN.match(stamp) else fallback
+
+
+def rotate_csv(data_dir, policy, now):
+    """Move oversized or old ``*_metrics.csv`` files into the archive directory"""
+    rotated = []
+    for entry in os.scandir(data_dir):
+        if not entry.name.endswith('_metrics.csv') or not entry.is_file():
+            continue
+        st = entry.stat()
+        if not st.st_size:
+            continue
+        with open(entry.path, 'rb') as f:
+            first = _row_stamp(f.readline(), format_timestamp(st.st_mtime))
+        too_big = policy.csv_rotate_size and st.st_size > policy.csv_rotate_size
+        too_old = policy.csv_rotate_age and parse_timestamp(first) < now - policy.csv_rotate_age
+        if not (too_big or too_old):
+            continue
+
+        last = _row_stamp(read_last_line(entry.path), format_timestamp(st.st_mtime))
+        archive = os.path.join(data_dir, ARCHIVE_DIR)
+        os.makedirs(archive, exist_ok=True)
+        # Writers reopen the file per append, so the next row starts a new one
+        target = os.path.join(archive, f'{entry.name[:-len(".csv")]}_{first}-{last}.csv')
+        os.rename(entry.path, target)
+        rotated.append(target)
+    return rotated
+
+
+def gzip_file(source, target):
+    """Compress ``source`` into ``target`` and remove it, keeping its mtime"""
+    st = os.stat(source)
+    temp_path = f'{target}.tmp'
+    with open(source, 'rb') as src, gzip.open(temp_path, 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.utime(temp_path, (st.st_atime, st.st_mtime))
+    os.replace(temp_path, target)
+    os.remove(source)
+
+
+def compress_settled(directory, suffix, before):
+    """Gzip files with ``suffix`` last modified before ``before``"""
+    compressed = []
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return compressed
+    for entry in entries:
+        if entry.name.endswith(suffix) and entry.is_file() and entry.stat().st_mtime < before:
+            gzip_file(entry.path, entry.path + '.gz')
+            compressed.append(entry.path + '.gz')
+    return compressed
+
+
+def expire_files(directory, suffix, max_age, max_size, now):
+    """Delete files past ``max_age``, then the oldest beyond ``max_size`` bytes"""
+    try:
+        files = sorted((entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                       for entry in os.scandir(directory)
+                       if entry.name.endswith(suffix) and entry.is_file())
+    except FileNotFoundError:
+        return []
+    total = sum(size for _, size, _ in files)
+    deleted = []
+    for mtime, size, path in files:
+        expired = max_age and mtime < now - max_age
+        if not expired and not (max_size and total > max_size):
+            break
+        os.remove(path)
+        total -= size
+        deleted.append(path)
+    return deleted
+
+
+################################################################################
+# Raw segment compaction
+################################################################################
+
+def segment_rows(path, schema):
+    """(ts, value, ...) rows of a columnar segment, read with the standard library"""
+    columns = []
+    for name, dtype in (('ts', 'i8'),) + tuple(schema):
+        column = array(TYPECODES[dtype])
+        try:
+            with open(os.path.join(path, f'{name}.{dtype}'), 'rb') as f:
+                data = f.read()
+            column.frombytes(data[:len(data) // column.itemsize * column.itemsize])
+        except FileNotFoundError:
+            column = None  # The segment predates this column
+        if column is not None and sys.byteorder == 'big':
+            column.byteswap()
+        columns.append(column)
+
+    rows = min(len(column) for column in columns if column is not None)
+    filled = []
+    for column, (_, dtype) in zip(columns, (('ts', 'i8'),) + tuple(schema)):
+        if column is None:
+            column = array(TYPECODES[dtype], [float('nan') if dtype == 'f8' else 0]) * rows
+        filled.append(column[:rows])
+    return list(zip(*filled))
+
+
+def compact_raw(columnar_root, rollup_root, max_age, now, tiers=TIERS):
+    """Fold raw segments older than ``max_age`` into missing rollup days, then delete them"""
+    compacted = []
+    if not max_age:
+        return compacted
+    oldest = segment_name(now - max_age)
+    for metric in SCHEMAS:
+        metric_root = os.path.join(columnar_root, metric)
+        try:
+            segments = sorted(name for name in os.listdir(metric_root)
+                              if name.isdigit() and name < oldest)
+        except FileNotFoundError:
+            continue
+        for segment in segments:
+            path = os.path.join(metric_root, segment)
+            if rollup_root and metric in ROLLUP_SCHEMAS:
+                # The continuous collector already rolled up the days it saw
+                missing = [tier for tier in tiers
+                           if segment >= segment_name(now - tier[2] * 86400)
+                           and not os.path.isdir(os.path.join(rollup_root, tier[0],
+                                                              metric, segment))]
+                if missing:
+                    writer = RollupWriter(rollup_root, missing)
+                    try:
+                        writer.append_rows(metric, segment_rows(path, SCHEMAS[metric]))
+                    finally:
+                        writer.close()
+            shutil.rmtree(path, ignore_errors=True)
+            compacted.append(path)
+    return compacted
+
+
+################################################################################
+# One retention pass
+################################################################################
+
+def host_data_dirs(data_dir):
+    """The local data directory followed by those of pushing hosts"""
+    directories = [data_dir]
+    try:
+        directories += sorted(entry.path for entry in os.scandir(os.path.join(data_dir, 'hosts'))
+                              if entry.is_dir() and valid_host(entry.name))
+    except FileNotFoundError:
+        pass
+    return directories
+
+
+def apply_retention(data_dir, log_dir, report_dir, policy=None, now=None):
+    """Run every policy once; returns {'rotated', 'compressed', 'compacted', 'deleted'} counts"""
+    policy = policy_from_env() if policy is None else policy
+    now = time.time() if now is None else now
+    counts = dict.fromkeys(('rotated', 'compressed', 'compacted', 'deleted'), 0)
+
+    for directory in host_data_dirs(data_dir):
+        archive = os.path.join(directory, ARCHIVE_DIR)
+        # Files rotated by an earlier pass are settled by now
+        counts['compressed'] += len(compress_settled(archive, '.csv', now - SETTLE_SECONDS))
+        counts['rotated'] += len(rotate_csv(directory, policy, now))
+        counts['deleted'] += len(expire_files(archive, '.csv.gz', policy.archive_retention,
+                                              policy.archive_max_size, now))
+        rollup_root = os.path.join(directory, 'rollups') if directory == data_dir else None
+        counts['compacted'] += len(compact_raw(os.path.join(directory, 'columnar'),
+                                               rollup_root, policy.raw_retention, now))
+        if policy.raw_retention:
+            counts['compacted'] += len(prune_rows(os.path.join(directory, DB_FILE),
+                                                  now - policy.raw_retention))
+
+    if os.path.isdir(log_dir):
+        log_archive = os.path.join(log_dir, ARCHIVE_DIR)
+        if policy.log_compress_age:
+            for entry in os.scandir(log_dir):
+                if entry.name.endswith('.log') and entry.is_file() and \
+                        entry.stat().st_mtime < now - policy.log_compress_age:
+                    os.makedirs(log_archive, exist_ok=True)
+                    gzip_file(entry.path, os.path.join(log_archive, entry.name + '.gz'))
+                    counts['compressed'] += 1
+        counts['deleted'] += len(expire_files(log_archive, '.log.gz', policy.log_retention,
+                                              policy.log_max_size, now))
+
+    counts['deleted'] += len(expire_files(report_dir, '.md', policy.report_retention, None, now))
+
+    Manifest(report_dir, '.md').refresh()
+    Manifest(log_dir, '.log', active_seconds=86400).refresh()
+    return counts
+
+
+class RetentionJob:
+    """Runs apply_retention in the background every ``interval`` seconds"""
+
+    def __init__(self, data_dir, log_dir, report_dir, interval=DEFAULT_INTERVAL,
+                 policy=None, log=None):
+        self.args = (data_dir, log_dir, report_dir, policy)
+        self.interval = interval
+        self.log = log
+        self._next = time.monotonic()
+        self._thread = None
+
+    def _run(self):
+        try:
+            counts = apply_retention(*self.args)
+            if self.log is not None and any(counts.values()):
+                self.log('INFO', 'Retention: ' + ', '.join(
+                    f'{count} {action}' for action, count in counts.items()))
+        except Exception as e:
+            if self.log is not None:
+                self.log('ERROR', f'Retention pass failed: {e}')
+
+    def tick(self):
+        """Start a pass when one is due and the previous one has finished"""
+        if time.monotonic() < self._next or (self._thread and self._thread.is_alive()):
+            return
+        self._next = time.monotonic() + self.interval
+        self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+        self._thread.start()
@@ -0,0 +1,166 @@
+"""
+Pre-aggregated rollup tiers for long-window queries
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+As samples arrive the continuous collector folds them into 1 minute,
+5 minute and 1 hour buckets holding count plus min/max/mean of every
+numeric column. Closed buckets are appended to columnar segments under
+
+    data/rollups/<tier>/<metric>/<YYYYMMDD>/
+
+and each tier prunes its own segments past its retention, so a 30-day
+chart reads ~720 hourly rows instead of ~43k raw samples.
+"""
+
+import os
+import time
+
+from sysmon.storage import (
+    NAN,
+    SCHEMAS,
+    ColumnarWriter,
+    prune_segments,
+    sample_values,
+    segment_name,
+)
+
+# (name, bucket seconds, retention days), finest first
+TIERS = (
+    ('1m', 60, 7),
+    ('5m', 300, 30),
+    ('1h', 3600, 365),
+)
+
+# GPU columns are N/A on most hosts and are not worth rolling up
+ROLLUP_METRICS = ('cpu', 'memory', 'disk', 'network', 'system')
+
+STATS = ('min', 'max', 'mean')
+
+
+def rollup_schema(metric):
+    """Columns of a rollup row: count then min/max/mean per raw column"""
+    return (('count', 'i8'),) + tuple(
+        (f'{name}_{stat}', 'f8') for name, _ in SCHEMAS[metric] for stat in STATS)
+
+
+ROLLUP_SCHEMAS = {metric: rollup_schema(metric) for metric in ROLLUP_METRICS}
+
+
+class _Bucket:
+    """Running count/min/max/sum of one open bucket"""
+
+    __slots__ = ('start', 'count', 'mins', 'maxs', 'sums', 'valid')
+
+    def __init__(self, start, width):
+        self.start = start
+        self.count = 0
+        self.mins = [NAN] * width
+        self.maxs = [NAN] * width
+        self.sums = [0.0] * width
+        self.valid = [0] * width
+
+    def add(self, values):
+        self.count += 1
+        for i, value in enumerate(values):
+            if value != value:  # NaN: N/A in the source sample
+                continue
+            if self.valid[i]:
+                if value < self.mins[i]:
+                    self.mins[i] = value
+                if value > self.maxs[i]:
+                    self.maxs[i] = value
+            else:
+                self.mins[i] = self.maxs[i] = value
+            self.sums[i] += value
+            self.valid[i] += 1
+
+    def row(self):
+        row = [self.start, self.count]
+        for i in range(len(self.sums)):
+            mean = self.sums[i] / self.valid[i] if self.valid[i] else NAN
+            row.extend((self.mins[i], self.maxs[i], mean))
+        return tuple(row)
+
+
+class RollupWriter:
+    """Maintains every rollup tier from the stream of raw samples
+
+    Buckets are kept in memory until a sample for a later bucket arrives;
+    close() flushes the partial buckets so nothing is lost on shutdown.
+    """
+
+    def __init__(self, root, tiers=TIERS):
+        self.root = root
+        self.tiers = tiers
+        self._writers = {name: ColumnarWriter(os.path.join(root, name), ROLLUP_SCHEMAS)
+                         for name, _, _ in tiers}
+        self._open = {}
+        self._pruned = {}
+
+    def _flush(self, tier, metric, bucket):
+        self._writers[tier].append_rows(metric, [bucket.row()])
+
+    def _prune(self, tier, retention_days, now):
+        """Drop segments past the tier's retention, at most once a day"""
+        today = segment_name(now)
+        if self._pruned.get(tier) == today:
+            return
+        self._pruned[tier] = today
+        oldest = segment_name(now - retention_days * 86400)
+        for metric in ROLLUP_METRICS:
+            prune_segments(os.path.join(self.root, tier), metric, oldest)
+
+    def add(self, metric, epoch, values):
+        """Fold one raw sample (epoch, numeric values) into every tier"""
+        if metric not in ROLLUP_SCHEMAS:
+            return
+        for tier, seconds, retention_days in self.tiers:
+            start = epoch // seconds * seconds
+            key = (tier, metric)
+            bucket = self._open.get(key)
+            if bucket is not None and bucket.start != start:
+                self._flush(tier, metric, bucket)
+                self._prune(tier, retention_days, epoch)
+                bucket = None
+            if bucket is None:
+                bucket = self._open[key] = _Bucket(start, len(values))
+            bucket.add(values)
+
+    def append_rows(self, metric, rows):
+        """Fold already-stored (epoch, value, ...) rows, e.g. from a CSV import"""
+        for row in rows:
+            self.add(metric, row[0], row[1:])
+
+    def write(self, metric, sample):
+        if metric in ROLLUP_SCHEMAS:
+            self.add(metric, int(sample.time), sample_values(metric, sample))
+
+    def write_all(self, samples):
+        for metric, sample in samples.items():
+            self.write(metric, sample)
+
+    def close(self):
+        for (tier, metric), bucket in self._open.items():
+            self._flush(tier, metric, bucket)
+        self._open.clear()
+        for tier, _, retention_days in self.tiers:
+            self._prune(tier, retention_days, time.time())
+        for writer in self._writers.values():
+            writer.close()
+
+
+class RollupReader:
+    """ColumnarReaders over each rollup tier"""
+
+    def __init__(self, root, tiers=TIERS):
+        from sysmon.storage import ColumnarReader
+        self.tiers = tiers
+        self.readers = {name: ColumnarReader(os.path.join(root, name), ROLLUP_SCHEMAS)
+                        for name, _, _ in tiers}
+
+    def candidates(self, metric, step):
+        """Tiers whose buckets fit in ``step``, coarsest first"""
+        if metric not in ROLLUP_SCHEMAS:
+            return []
+        return [(name, seconds) for name, seconds, _ in reversed(self.tiers)
+                if seconds <= step]
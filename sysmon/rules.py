@@ -0,0 +1,517 @@
+"""
+Alert rules shared by the collector, the GUI and the web server
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Rules are read from a YAML file (``ALERT_RULES``, by default rules.yaml
+next to monitor.sh). A threshold rule fires when a column stays above
+(or below) a limit for a duration and clears only once it is back past a
+separate ``clear`` level; an anomaly rule does the same with the z-score
+of each sample against an EWMA or rolling-window baseline.
+
+Each batch of samples is evaluated with NumPy: the scores, the runs
+above the trigger and the hysteresis state all come from array
+operations, and Python only loops over the few samples where an incident
+opens or closes. One incident therefore logs one WARNING/ERROR when it
+opens and one INFO when it clears, however long it lasts.
+"""
+
+import json
+import math
+import os
+import re
+import sys
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+from sysmon.alerts import ALERT_LEVELS
+from sysmon.storage import SCHEMAS, parse_duration, sample_values
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'rules.yaml')
+ALERT_STATE_FILE = '.alert_state.json'
+ANOMALY_METHODS = ('ewma', 'zscore')
+
+# A run of breaching samples interrupted for longer than this starts over
+MAX_GAP = 900
+
+# Console colors of MonitorLog, as in monitor.sh
+LEVEL_COLORS = {'ERROR': '\033[0;31m', 'WARNING': '\033[1;33m', 'INFO': '\033[0;32m'}
+NO_COLOR = '\033[0m'
+
+# ${NAME} or ${NAME:-default} inside rule values
+ENV_PATTERN = re.compile(r'\$\{(\w+)(?::-([^}]*))?\}')
+
+# Thresholds monitor.sh exports, used when there is no rules file
+ENV_RULES = (
+    ('cpu_usage', 'cpu', 'usage', 'CPU_THRESHOLD', 80, 'CPU usage is high: {value:.1f}%'),
+    ('cpu_temperature', 'cpu', 'temperature', 'TEMP_THRESHOLD', 75,
+     'CPU temperature is high: {value:g}°C'),
+    ('memory_percent', 'memory', 'percent', 'MEMORY_THRESHOLD', 85,
+     'Memory usage is high: {value:.2f}%'),
+    ('disk_usage', 'disk', 'usage_percent', 'DISK_THRESHOLD', 90,
+     'Disk usage is high: {value:g}%'),
+)
+
+# monitor.sh / Sample.to_dict() keys of the numeric columns, for the GUI
+DICT_FIELDS = {
+    'cpu': {'usage': 'cpu_usage', 'cores': 'cpu_cores', 'temperature': 'temperature'},
+    'memory': {'total_mb': 'memory_total_mb', 'used_mb': 'memory_used_mb',
+               'free_mb': 'memory_free_mb', 'available_mb': 'memory_available_mb',
+               'percent': 'memory_percent', 'swap_total_mb': 'swap_total_mb',
+               'swap_used_mb': 'swap_used_mb'},
+    'disk': {'usage_percent': 'disk_usage_percent'},
+    'gpu': {'usage': 'gpu_usage', 'temperature': 'gpu_temperature'},
+    'network': {'rx_rate': 'rx_bytes_per_sec', 'tx_rate': 'tx_bytes_per_sec',
+                'rx_pps': 'rx_packets_per_sec', 'tx_pps': 'tx_packets_per_sec'},
+    'system': {'load_1': 'load_1min', 'load_5': 'load_5min', 'load_15': 'load_15min',
+               'total_processes': 'total_processes',
+               'running_processes': 'running_processes',
+               'zombie_processes': 'zombie_processes', 'logged_users': 'logged_users'},
+}
+
+Event = namedtuple('Event', 'kind rule time value level message')
+
+
+def format_duration(seconds):
+    """Short human duration, e.g. 2m 30s"""
+    seconds = int(round(seconds))
+    parts = []
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size:
+            parts.append(f'{seconds // size}{unit}')
+            seconds %= size
+    if seconds or not parts:
+        parts.append(f'{seconds}s')
+    return ' '.join(parts[:2])
+
+
+def _expand(value):
+    if isinstance(value, str):
+        return ENV_PATTERN.sub(lambda m: os.getenv(m.group(1), m.group(2) or ''), value)
+    return value
+
+
+def _number(spec, key, default=None):
+    value = _expand(spec.get(key, default))
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{key} must be a number, got {value!r}')
+
+
+def _seconds(value):
+    value = _expand(value)
+    if value in (None, 0, '0', ''):
+        return 0.0
+    return float(parse_duration(str(value)))
+
+
+def recurrence(decay, inputs, initial):
+    """y[i] = decay * y[i - 1] + inputs[i] for every i, with y[-1] = initial
+
+    Solved in closed form per chunk; chunks keep decay ** -i finite.
+    """
+    out = np.empty(len(inputs))
+    chunk = max(1, int(300 / -math.log(decay)))
+    for start in range(0, len(inputs), chunk):
+        part = inputs[start:start + chunk]
+        powers = decay ** np.arange(1, len(part) + 1)
+        out[start:start + len(part)] = powers * (initial + np.cumsum(part / powers))
+        initial = out[start + len(part) - 1]
+    return out
+
+
+################################################################################
+# Rules
+################################################################################
+
+class Rule:
+    """One alert rule; see rules.yaml for the options"""
+
+    def __init__(self, spec):
+        self.metric = spec.get('metric')
+        self.column = spec.get('column')
+        columns = dict(SCHEMAS.get(self.metric, ()))
+        if self.column not in columns:
+            raise ValueError(f'unknown metric/column {self.metric}.{self.column}')
+        self.name = str(spec.get('name') or f'{self.metric}_{self.column}')
+        self.level = str(spec.get('level', 'WARNING')).upper()
+        if self.level not in ALERT_LEVELS:
+            raise ValueError(f"level must be one of {', '.join(ALERT_LEVELS)}")
+        self.hold = _seconds(spec.get('for'))
+        self.anomaly = spec.get('anomaly')
+        label = f'{self.metric} {self.column}'
+
+        if self.anomaly is None:
+            above, below = _number(spec, 'above'), _number(spec, 'below')
+            if (above is None) == (below is None):
+                raise ValueError('give exactly one of above, below or anomaly')
+            # Scores grow towards a breach either way: below rules negate
+            self.sign = 1.0 if above is not None else -1.0
+            self.threshold = above if above is not None else below
+            # hysteresis: how far back past the threshold the value must go
+            margin = _number(spec, 'hysteresis', 0)
+            clear = _number(spec, 'clear', self.threshold - self.sign * margin)
+            if (clear - self.threshold) * self.sign > 0:
+                raise ValueError('clear must not be past the threshold')
+            self.trigger, self.clear = self.sign * self.threshold, self.sign * clear
+            default = f'{label} is {"high" if above is not None else "low"}: {{value:g}}'
+        else:
+            if self.anomaly not in ANOMALY_METHODS:
+                raise ValueError(f"anomaly must be one of {', '.join(ANOMALY_METHODS)}")
+            self.threshold = _number(spec, 'threshold', 4)
+            self.trigger = self.threshold
+            self.clear = _number(spec, 'clear', self.threshold)
+            if self.clear > self.threshold:
+                raise ValueError('clear must not be past the threshold')
+            # ewma: the span in samples; zscore: the window length in samples
+            self.span = int(_number(spec, 'span', _number(spec, 'window', 300)))
+            if self.span < 2:
+                raise ValueError('span/window must be at least 2 samples')
+            self.min_samples = max(2, min(int(_number(spec, 'min_samples', 30)), self.span))
+            self.min_std = _number(spec, 'min_std', 0)
+            default = f'{label} is unusual: {{value:g}} (z={{score:.1f}})'
+        self.message = str(spec.get('message', default))
+        self.resolved = str(spec.get('resolved', f'{label} back to normal after {{duration}}: '
+                                                  '{value:g}'))
+        # Fail on unknown placeholders now rather than on the first incident
+        self.format(self.message, 0.0, 0.0, 0.0)
+        self.format(self.resolved, 0.0, 0.0, 0.0)
+
+    def format(self, template, value, score, duration):
+        try:
+            return template.format(value=value, score=score, threshold=self.threshold,
+                                   metric=self.metric, column=self.column, name=self.name,
+                                   duration=format_duration(duration))
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f'bad message template {template!r}: {e}')
+
+    def initial_state(self):
+        state = {'active': False, 'since': None, 'last': None, 'incident': None}
+        if self.anomaly == 'ewma':
+            state.update(count=0, mean=0.0, var=0.0)
+        elif self.anomaly == 'zscore':
+            state.update(count=0, window=[])
+        return state
+
+    def scores(self, values, state):
+        """Score of each sample (NaN where there is no value)"""
+        if self.anomaly is None:
+            return values * self.sign
+        scores = np.full(len(values), np.nan)
+        finite = np.flatnonzero(np.isfinite(values))
+        if len(finite):
+            x = values[finite]
+            z = self._ewma(x, state) if self.anomaly == 'ewma' else self._zscore(x, state)
+            scores[finite] = z
+        return scores
+
+    def _ewma(self, x, state):
+        alpha = 2.0 / (self.span + 1)
+        count, mean, var = state['count'], state['mean'], state['var']
+        if count == 0:
+            mean = x[0]
+        means = recurrence(1 - alpha, alpha * x, mean)
+        deviations = x - np.concatenate(([mean], means[:-1]))
+        variances = recurrence(1 - alpha, (1 - alpha) * alpha * deviations ** 2, var)
+        before = np.concatenate(([var], variances[:-1]))
+        std = np.maximum(np.sqrt(before), self.min_std)
+        seen = count + np.arange(len(x))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where((seen >= self.min_samples) & (std > 0), np.abs(deviations) / std, 0.0)
+        state.update(count=count + len(x), mean=float(means[-1]), var=float(variances[-1]))
+        return z
+
+    def _zscore(self, x, state):
+        history = np.asarray(state['window'], dtype=float)
+        values = np.concatenate((history, x))
+        # Shift by the first value so the running sums do not cancel
+        values = values - values[0]
+        sums = np.concatenate(([0.0], np.cumsum(values)))
+        squares = np.concatenate(([0.0], np.cumsum(values ** 2)))
+        position = len(history) + np.arange(len(x))
+        start = np.maximum(position - self.span, 0)
+        count = position - start
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = (sums[position] - sums[start]) / count
+            var = np.maximum((squares[position] - squares[start]) / count - mean ** 2, 0)
+            std = np.maximum(np.sqrt(var), self.min_std)
+            z = np.where((count >= self.min_samples) & (std > 0),
+                         np.abs(values[position] - mean) / std, 0.0)
+        tail = np.concatenate((history, x))[-self.span:]
+        state.update(count=state['count'] + len(x), window=tail.tolist())
+        return z
+
+    def transitions(self, times, scores, state):
+        """Indices where an incident opens and closes; updates ``state``
+
+        A sample is above when its score exceeds the trigger. An incident
+        opens once the samples have been above for ``hold`` seconds in a
+        row and stays open until a score drops to the clear level.
+        """
+        n = len(scores)
+        index = np.arange(n)
+        with np.errstate(invalid='ignore'):
+            above = scores > self.trigger
+            cleared = scores <= self.clear
+        # First sample of the run of above samples each sample belongs to
+        last_break = np.maximum.accumulate(np.where(above, -1, index))
+        starts = times[np.minimum(last_break + 1, n - 1)]
+        if state['since'] is not None and times[0] - state['last'] <= MAX_GAP:
+            starts[last_break < 0] = state['since']
+        held = above & (times - starts >= self.hold)
+
+        set_at = np.maximum.accumulate(np.where(held, index, -1))
+        reset_at = np.maximum.accumulate(np.where(cleared, index, -1))
+        active = np.where((set_at < 0) & (reset_at < 0), state['active'], set_at > reset_at)
+        previous = np.concatenate(([state['active']], active[:-1]))
+
+        state['active'] = bool(active[-1])
+        state['since'] = float(starts[-1]) if above[-1] else None
+        state['last'] = float(times[-1])
+        return np.flatnonzero(active & ~previous), np.flatnonzero(previous & ~active), bool(above[-1])
+
+
+def default_rules():
+    """The fixed thresholds monitor.sh exports, without duration or hysteresis"""
+    rules = []
+    for name, metric, column, variable, default, message in ENV_RULES:
+        rules.append(Rule({'name': name, 'metric': metric, 'column': column,
+                           'above': os.getenv(variable, default), 'message': message}))
+    return rules
+
+
+def load_rules(path=None):
+    """Rules from the YAML file, or the monitor.sh thresholds without one
+
+    Raises ValueError for an unreadable or invalid file.
+    """
+    path = path or os.getenv('ALERT_RULES')
+    if not path:
+        if not os.path.exists(DEFAULT_RULES_FILE):
+            return default_rules()
+        path = DEFAULT_RULES_FILE
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError(f'pyyaml is needed to read {path}')
+    try:
+        with open(path) as f:
+            config = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        raise ValueError(f'{path}: {e}')
+
+    defaults = config.get('defaults') or {}
+    rules = []
+    for number, spec in enumerate(config.get('rules') or [], 1):
+        try:
+            if not isinstance(spec, dict):
+                raise ValueError('expected a mapping')
+            rules.append(Rule({**defaults, **spec}))
+        except ValueError as e:
+            raise ValueError(f'{path}: rule {number}: {e}')
+    names = [rule.name for rule in rules]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f'{path}: duplicate rule names: {", ".join(duplicates)}')
+    return rules
+
+
+def threshold_limits(rules):
+    """{(metric, column): threshold} of the first 'above' rule per column"""
+    limits = {}
+    for rule in rules:
+        if rule.anomaly is None and rule.sign > 0:
+            limits.setdefault((rule.metric, rule.column), rule.threshold)
+    return limits
+
+
+def dict_columns(metric, data):
+    """Column values of a monitor.sh JSON / Sample.to_dict() sample"""
+    columns = {}
+    for column, key in DICT_FIELDS.get(metric, {}).items():
+        try:
+            columns[column] = [float(data[key])]
+        except (KeyError, TypeError, ValueError):
+            columns[column] = [math.nan]
+    return columns
+
+
+################################################################################
+# Evaluation and state
+################################################################################
+
+class RuleEngine:
+    """Evaluates batches of samples against the rules, one alert per incident
+
+    ``state`` (JSON-serialisable) carries pending runs, open incidents and
+    the anomaly baselines from one batch to the next.
+    """
+
+    def __init__(self, rules, state=None):
+        self.rules = rules
+        self.state = state if state is not None else {}
+        self._by_metric = {}
+        for rule in rules:
+            self._by_metric.setdefault(rule.metric, []).append(rule)
+
+    def evaluate(self, metric, times, columns):
+        """Evaluate one metric's samples in time order
+
+        ``columns`` maps column names to values aligned with ``times``.
+        Returns (events, above) where ``above`` tells whether any rule of
+        the metric is breached or has an open incident at the last sample.
+        """
+        events = []
+        breached = False
+        times = np.asarray(times, dtype=float)
+        if not len(times):
+            return events, breached
+        for rule in self._by_metric.get(metric, ()):
+            values = columns.get(rule.column)
+            if values is None:
+                continue
+            values = np.asarray(values, dtype=float)
+            state = self.state.get(rule.name)
+            if state is None:
+                state = self.state[rule.name] = rule.initial_state()
+            scores = rule.scores(values, state)
+            opened, closed, above = rule.transitions(times, scores, state)
+            breached = breached or above or state['active']
+            events.extend(self._events(rule, state, times, values, scores, opened, closed))
+        events.sort(key=lambda event: event.time)
+        return events, breached
+
+    def _events(self, rule, state, times, values, scores, opened, closed):
+        incident = state['incident']
+        for i in sorted([(i, 'open') for i in opened] + [(i, 'close') for i in closed]):
+            index, kind = i
+            value, when = float(values[index]), float(times[index])
+            if kind == 'open':
+                message = rule.format(rule.message, value, float(scores[index]), 0)
+                incident = {'since': when, 'value': value, 'level': rule.level,
+                            'message': message, 'metric': rule.metric, 'column': rule.column}
+                yield Event('open', rule.name, when, value, rule.level, message)
+            else:
+                since = incident['since'] if incident else when
+                message = rule.format(rule.resolved, value, float(scores[index]), when - since)
+                incident = None
+                yield Event('close', rule.name, when, value, 'INFO', message)
+        state['incident'] = incident
+
+    def evaluate_rows(self, metric, rows):
+        """Evaluate (epoch, value, ...) rows in the columnar schema order"""
+        if not rows or metric not in SCHEMAS:
+            return [], False
+        table = np.asarray(rows, dtype=float)
+        columns = {name: table[:, i + 1] for i, (name, _) in enumerate(SCHEMAS[metric])}
+        return self.evaluate(metric, table[:, 0], columns)
+
+    def evaluate_samples(self, samples):
+        """Evaluate one collector Sample per metric; returns (events, {metric: above})"""
+        events, breached = [], {}
+        for metric, sample in samples.items():
+            if metric not in SCHEMAS:
+                continue
+            found, breached[metric] = self.evaluate_rows(
+                metric, [(sample.time, *sample_values(metric, sample))])
+            events.extend(found)
+        return events, breached
+
+    def incidents(self):
+        return open_incidents(self.state)
+
+
+def open_incidents(state):
+    """Open incidents in a rule engine state, oldest first"""
+    incidents = [dict(rule_state['incident'], rule=name)
+                 for name, rule_state in state.items()
+                 if isinstance(rule_state, dict) and rule_state.get('incident')]
+    return sorted(incidents, key=lambda incident: incident['since'])
+
+
+def load_state(path):
+    """Rule engine state saved by save_state(), or {}"""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path, state):
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(json.dumps(state))
+    os.replace(temp_path, path)
+
+
+################################################################################
+# Incident log
+################################################################################
+
+class MonitorLog:
+    """Writes log lines in the same format as monitor.sh's log_message"""
+
+    def __init__(self, path, quiet=False):
+        self.path = path
+        self.quiet = quiet
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def message(self, level, text):
+        stamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with open(self.path, 'a') as f:
+            f.write(f'[{stamp}] [{level}] {text}\n')
+        if not self.quiet:
+            color = LEVEL_COLORS.get(level)
+            print(f'{color}[{level}]{NO_COLOR} {text}' if color else text, file=sys.stderr)
+
+
+class AlertRules:
+    """Rule engine whose state survives between runs in data/.alert_state.json
+
+    Used by the collector, the GUI and monitor.sh (through ``python3 -m
+    sysmon check``), so every incident reaches the monitor log that
+    /api/alerts and the stream read. ``rules`` defaults to load_rules().
+    """
+
+    def __init__(self, data_dir, log, rules=None):
+        self.path = os.path.join(data_dir, ALERT_STATE_FILE)
+        self.log = log
+        self.engine = RuleEngine(load_rules() if rules is None else rules,
+                                 load_state(self.path))
+
+    def check(self, samples):
+        """Log the incidents ``samples`` open or close; returns {metric: above}"""
+        events, breached = self.engine.evaluate_samples(samples)
+        self.record(events)
+        return breached
+
+    def check_rows(self, rows):
+        """check() for {metric: [(epoch, value, ...), ...]} rows in schema order"""
+        events, breached = [], {}
+        for metric, metric_rows in rows.items():
+            found, breached[metric] = self.engine.evaluate_rows(metric, metric_rows)
+            events.extend(found)
+        self.record(events)
+        return breached
+
+    def record(self, events):
+        """Log events from self.engine and keep the state they leave behind"""
+        for event in events:
+            self.log.message(event.level, event.message)
+        if events:
+            # The web server lists open incidents from the state file
+            self.save()
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            save_state(self.path, self.engine.state)
+        except OSError as e:
+            self.log.message('ERROR', f'Failed to save the alert state: {e}')
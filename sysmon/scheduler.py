@@ -0,0 +1,114 @@
+"""
+Adaptive sampling scheduler for the continuous collector
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Every metric family has its own interval on a monotonic clock. Deadlines
+sit on a fixed grid (anchor + k * interval), so the time spent collecting
+never shifts later samples, and a cycle that overruns skips the missed
+ticks instead of bursting to catch up. While any threshold is exceeded
+the scheduler switches to the fast intervals and drops back afterwards.
+"""
+
+import math
+import time
+
+from sysmon.collector import METRICS
+
+# Seconds between samples; df and smartctl make disk the expensive family
+DEFAULT_INTERVALS = {
+    'cpu': 1.0,
+    'memory': 1.0,
+    'disk': 300.0,
+    'gpu': 10.0,
+    'network': 5.0,
+    'system': 5.0,
+}
+
+# Used while any metric is above its threshold
+DEFAULT_FAST_INTERVALS = {
+    'cpu': 0.5,
+    'memory': 0.5,
+    'disk': 30.0,
+    'gpu': 2.0,
+    'network': 1.0,
+    'system': 1.0,
+}
+
+
+def parse_intervals(spec, defaults):
+    """Parse ``"cpu=1,disk=300"`` over a copy of ``defaults``
+
+    Raises ValueError for unknown families or non-positive intervals.
+    """
+    intervals = dict(defaults)
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        metric, _, value = item.partition('=')
+        metric = metric.strip()
+        if metric not in METRICS:
+            raise ValueError(f'unknown metric family: {metric}')
+        seconds = float(value)
+        if seconds <= 0:
+            raise ValueError(f'interval for {metric} must be positive')
+        intervals[metric] = seconds
+    return intervals
+
+
+class Scheduler:
+    """Tells the collector which metric families are due and when to wake"""
+
+    def __init__(self, intervals=None, fast_intervals=None, clock=time.monotonic):
+        self.intervals = dict(intervals or DEFAULT_INTERVALS)
+        self.fast_intervals = dict(fast_intervals or DEFAULT_FAST_INTERVALS)
+        self.clock = clock
+        self.fast = False
+        start = clock()
+        # Every family is due on the first tick
+        self._anchors = {metric: start - self.intervals[metric] for metric in self.intervals}
+
+    def interval(self, metric):
+        if self.fast:
+            return min(self.fast_intervals.get(metric, self.intervals[metric]),
+                       self.intervals[metric])
+        return self.intervals[metric]
+
+    def deadline(self, metric):
+        return self._anchors[metric] + self.interval(metric)
+
+    def due(self, now=None):
+        """Families whose deadline has passed, in METRICS order"""
+        now = self.clock() if now is None else now
+        return [metric for metric in METRICS
+                if metric in self._anchors and self.deadline(metric) <= now]
+
+    def mark_done(self, metrics, now=None):
+        """Advance each family to its next grid point after ``now``"""
+        now = self.clock() if now is None else now
+        for metric in metrics:
+            interval = self.interval(metric)
+            anchor = self.deadline(metric)
+            if anchor + interval <= now:
+                # Overran: skip the ticks that were missed
+                anchor += math.floor((now - anchor) / interval) * interval
+            self._anchors[metric] = anchor
+
+    def set_fast(self, fast):
+        """Switch between the normal and fast intervals; True if it changed"""
+        fast = bool(fast)
+        if fast == self.fast:
+            return False
+        self.fast = fast
+        return True
+
+    def sleep_time(self, now=None):
+        """Seconds until the earliest deadline"""
+        now = self.clock() if now is None else now
+        return max(0.0, min(self.deadline(metric) for metric in self._anchors) - now)
+
+    def wait(self, sleep=time.sleep):
+        """Sleep until something is due and return the due families"""
+        delay = self.sleep_time()
+        if delay > 0:
+            sleep(delay)
+        return self.due()
@@ -0,0 +1,247 @@
+"""
+Self-instrumentation: what the monitor itself costs
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+With SELF_STATS=1 the web server counts requests and their latency per
+endpoint, the collector times every metric family and counts its
+failures, and the GUI records how late its render ticks run. Each thread
+updates counters of its own, so recording never takes a lock; reading
+sums the per-thread shards. Every process appends its totals to
+``data/self_metrics.csv`` each SELF_STATS_INTERVAL seconds, and the web
+server's ``/metrics`` serves its own counters plus the newest flush of
+every other process in the Prometheus text format.
+
+Without SELF_STATS, ``STATS`` is None and the instrumented code paths
+skip recording after a single ``is None`` check.
+"""
+
+import atexit
+import bisect
+import os
+import threading
+import time
+
+from sysmon.tail import read_lines_backward
+
+ENABLED = os.getenv('SELF_STATS', '0').strip().lower() not in ('', '0', 'off', 'false', 'no')
+INTERVAL = float(os.getenv('SELF_STATS_INTERVAL', 60))
+SELF_STATS_FILE = 'self_metrics.csv'
+
+# Flushes older than this many intervals are from processes that are gone
+STALE_INTERVALS = 3
+TAIL_LINES = 5000
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Latency histogram bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# Exposed families: name -> (type, help)
+FAMILIES = {
+    'sysmon_http_requests_total':
+        ('counter', 'HTTP requests handled, by endpoint, method and status'),
+    'sysmon_http_request_duration_seconds':
+        ('histogram', 'Time until the response is handed to the server, by endpoint'),
+    'sysmon_collect_duration_seconds':
+        ('histogram', 'Time to collect one metric family'),
+    'sysmon_collect_failures_total':
+        ('counter', 'Collections of a metric family that raised'),
+    'sysmon_gui_tick_lag_seconds':
+        ('histogram', 'How late the GUI render tick ran'),
+    'sysmon_gui_skipped_ticks_total':
+        ('counter', 'GUI ticks skipped while a collection was still running'),
+    'process_cpu_seconds_total':
+        ('counter', 'User and system CPU time of the process'),
+    'process_resident_memory_bytes':
+        ('gauge', 'Resident set size of the process'),
+    'process_open_fds':
+        ('gauge', 'Open file descriptors of the process'),
+    'process_threads':
+        ('gauge', 'Python threads of the process'),
+}
+
+HISTOGRAM_SUFFIXES = ('_bucket', '_sum', '_count')
+
+
+def _number(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def process_samples():
+    """CPU time, RSS, open files and threads of the calling process"""
+    times = os.times()
+    samples = [('process_cpu_seconds_total', (), round(times.user + times.system, 3))]
+    try:
+        with open('/proc/self/statm') as f:
+            samples.append(('process_resident_memory_bytes', (), int(f.read().split()[1]) * PAGE_SIZE))
+        samples.append(('process_open_fds', (), len(os.listdir('/proc/self/fd'))))
+    except OSError:
+        pass  # No /proc (Windows)
+    samples.append(('process_threads', (), threading.active_count()))
+    return samples
+
+
+class SelfStats:
+    """Counters and histograms kept per thread and summed when read
+
+    ``labels`` are tuples of (name, value) pairs in a fixed order.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._bounds = [_number(bound) for bound in buckets] + ['+Inf']
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:  # Once per thread
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, labels=(), value=1):
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, name, labels, seconds):
+        shard = self._shard()
+        key = (name, labels)
+        counts = shard.get(key)
+        if counts is None:
+            # One slot per bound, one for +Inf, then the sum
+            counts = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        counts[-1] += seconds
+
+    def samples(self):
+        """[(series name, labels, value)] over all threads, plus the process gauges"""
+        with self._lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            for key, value in list(shard.items()):
+                total = totals.get(key)
+                if isinstance(value, list):
+                    totals[key] = list(value) if total is None else [
+                        a + b for a, b in zip(total, value)]
+                else:
+                    totals[key] = (total or 0) + value
+
+        samples = []
+        for (name, labels), value in sorted(totals.items()):
+            if not isinstance(value, list):
+                samples.append((name, labels, value))
+                continue
+            count = 0
+            for bound, hits in zip(self._bounds, value):
+                count += hits
+                samples.append((name + '_bucket', labels + (('le', bound),), count))
+            samples.append((name + '_sum', labels, round(value[-1], 6)))
+            samples.append((name + '_count', labels, count))
+        return samples + process_samples()
+
+    def flush(self, path, source):
+        """Append the current totals to a self-stats CSV as ``source``"""
+        from sysmon.collector import format_timestamp
+        stamp = format_timestamp(time.time())
+        prefix = f'{stamp},SELF,{source},{os.getpid()},'
+        lines = [f"{prefix}{name},{';'.join(f'{key}={value}' for key, value in labels)},"
+                 f'{_number(value)}\n' for name, labels, value in self.samples()]
+        try:
+            with open(path, 'a') as f:
+                f.writelines(lines)
+        except OSError:
+            pass  # A read-only data directory still has /metrics
+
+    def start_writer(self, path, source, interval=INTERVAL):
+        """Flush every ``interval`` seconds on a daemon thread, and at exit"""
+        def run():
+            while True:
+                time.sleep(interval)
+                self.flush(path, source)
+
+        threading.Thread(target=run, name='self-stats', daemon=True).start()
+        atexit.register(self.flush, path, source)
+
+
+def read_flushes(path, max_age=STALE_INTERVALS * INTERVAL, skip=None):
+    """Newest flush of every process in a self-stats CSV
+
+    Returns [(source, pid, samples)], leaving out flushes older than
+    ``max_age`` seconds and the (source, pid) in ``skip``.
+    """
+    from sysmon.storage import parse_timestamp
+    try:
+        lines = read_lines_backward(path, TAIL_LINES)
+    except FileNotFoundError:
+        return []
+
+    newest = {}
+    flushes = {}
+    oldest = time.time() - max_age
+    for line in reversed(lines):
+        fields = line.decode('utf-8', errors='replace').rstrip('\n').split(',')
+        if len(fields) != 7 or fields[1] != 'SELF':
+            continue
+        stamp, _, source, pid, name, labels, value = fields
+        process = (source, pid)
+        if process == skip:
+            continue
+        if process not in newest:
+            try:
+                if parse_timestamp(stamp) < oldest:
+                    newest[process] = None
+                    continue
+            except ValueError:
+                continue
+            newest[process] = stamp
+        if stamp != newest[process]:
+            continue
+        try:
+            value = float(value) if '.' in value or 'e' in value else int(value)
+        except ValueError:
+            continue
+        pairs = tuple(tuple(pair.split('=', 1)) for pair in labels.split(';') if '=' in pair)
+        flushes.setdefault(process, []).append((name, pairs, value))
+    return [(source, pid, samples[::-1]) for (source, pid), samples in flushes.items()]
+
+
+def _family(name):
+    if name not in FAMILIES:
+        for suffix in HISTOGRAM_SUFFIXES:
+            if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+                return name[:-len(suffix)]
+    return name
+
+
+def render(processes):
+    """Prometheus text exposition of [(source, pid, samples)]
+
+    Every series gets ``source`` and ``pid`` labels; series of one family
+    are grouped under a single HELP/TYPE header.
+    """
+    families = {}
+    for source, pid, samples in processes:
+        for name, labels, value in samples:
+            families.setdefault(_family(name), []).append(
+                (name, (('source', source), ('pid', str(pid))) + tuple(labels), value))
+
+    lines = []
+    for family, series in families.items():
+        kind, description = FAMILIES.get(family, ('untyped', family))
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {kind}')
+        for name, labels, value in series:
+            text = ','.join(f'{key}="{value}"' for key, value in labels)
+            lines.append(f'{name}{{{text}}} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# This process's recorder; None when SELF_STATS is off
+STATS = SelfStats() if ENABLED else None
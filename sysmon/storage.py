@@ -0,0 +1,554 @@
+"""
+Columnar, memory-mappable metric storage
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Alongside the text ``*_metrics.csv`` files the collector appends every
+sample to one fixed-width little-endian file per column:
+
+    data/columnar/<metric>/<YYYYMMDD>/ts.i8        epoch seconds (int64)
+    data/columnar/<metric>/<YYYYMMDD>/usage.f8     float64, NaN = N/A
+    data/columnar/<metric>/<YYYYMMDD>/cores.i8     int64
+
+Segments are split per UTC day. Readers map the column files with
+numpy.memmap, so a range query is a binary search on ``ts`` plus array
+slicing and never tokenizes text. The writer itself uses only the
+standard library, but ``python3 -m sysmon`` also loads the rule engine and
+the report, which need numpy, so the collector image ships it. Writers in
+different processes (the collector and the GUI) take a lock file per
+segment around every append.
+"""
+
+import math
+import os
+import shutil
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from sysmon.collector import TIMESTAMP_FORMAT
+
+SEGMENT_FORMAT = '%Y%m%d'
+SEGMENT_LOCK = '.lock'
+# Column files a reader keeps mapped (~8 segments of every metric family)
+MAX_MAPPED_COLUMNS = 512
+MAX_EPOCH = 253402300799  # 9999-12-31T23:59:59Z
+NAN = float('nan')
+
+# Numeric columns stored per metric family: (name, dtype code)
+SCHEMAS = {
+    'cpu': (('usage', 'f8'), ('cores', 'i8'), ('load_1', 'f8'),
+            ('load_5', 'f8'), ('load_15', 'f8'), ('temperature', 'f8')),
+    'memory': (('total_mb', 'i8'), ('used_mb', 'i8'), ('free_mb', 'i8'),
+               ('available_mb', 'i8'), ('percent', 'f8'),
+               ('swap_total_mb', 'i8'), ('swap_used_mb', 'i8')),
+    'disk': (('usage_percent', 'f8'), ('total_bytes', 'i8'),
+             ('used_bytes', 'i8'), ('available_bytes', 'i8')),
+    'gpu': (('usage', 'f8'), ('memory_used_mb', 'f8'),
+            ('memory_total_mb', 'f8'), ('temperature', 'f8')),
+    'network': (('rx_bytes', 'i8'), ('tx_bytes', 'i8'),
+                ('rx_packets', 'i8'), ('tx_packets', 'i8'),
+                ('rx_rate', 'f8'), ('tx_rate', 'f8'),
+                ('rx_pps', 'f8'), ('tx_pps', 'f8')),
+    'system': (('load_1', 'f8'), ('load_5', 'f8'), ('load_15', 'f8'),
+               ('total_processes', 'i8'), ('running_processes', 'i8'),
+               ('zombie_processes', 'i8'), ('logged_users', 'i8')),
+}
+
+# array/struct type codes for the on-disk dtypes (always little-endian)
+TYPECODES = {'f8': 'd', 'i8': 'q'}
+ITEMSIZE = 8
+
+SIZE_UNITS = {'K': 1, 'M': 2, 'G': 3, 'T': 4, 'P': 5, 'E': 6}
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def segment_name(epoch):
+    """UTC day a sample belongs to"""
+    epoch = min(max(epoch, 0), MAX_EPOCH)
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime(SEGMENT_FORMAT)
+
+
+def parse_timestamp(value):
+    """Convert a ``%Y%m%d_%H%M%S`` stamp (local time) to epoch seconds"""
+    return int(time.mktime(time.strptime(value.strip(), TIMESTAMP_FORMAT)))
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def _int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_human_size(value):
+    """Invert ``df -h`` output such as ``252G`` back to (approximate) bytes"""
+    value = value.strip()
+    if value and value[-1] in SIZE_UNITS:
+        return int(_float(value[:-1]) * 1024 ** SIZE_UNITS[value[-1]])
+    return _int(value)
+
+
+def parse_duration(value):
+    """Parse a duration such as ``30``, ``30s``, ``5m``, ``1h`` or ``7d`` to seconds"""
+    value = str(value).strip().lower()
+    if value and value[-1] in DURATION_UNITS:
+        seconds = float(value[:-1]) * DURATION_UNITS[value[-1]]
+    else:
+        seconds = float(value)
+    if seconds <= 0:
+        raise ValueError('Duration must be positive')
+    return int(math.ceil(seconds))
+
+
+################################################################################
+# Sample / CSV row to column values
+################################################################################
+
+def sample_values(metric, sample):
+    """Numeric column values of a collector sample, in schema order"""
+    if metric == 'cpu':
+        temperature = NAN if sample.temperature is None else sample.temperature
+        return (sample.usage, sample.cores, sample.load_1, sample.load_5,
+                sample.load_15, temperature)
+    if metric == 'memory':
+        return (sample.total_mb, sample.used_mb, sample.free_mb,
+                sample.available_mb, sample.percent, sample.swap_total_mb,
+                sample.swap_used_mb)
+    if metric == 'disk':
+        return (sample.usage_percent, sample.total_bytes, sample.used_bytes,
+                sample.available_bytes)
+    if metric == 'gpu':
+        used, _, total = sample.memory.partition(',')
+        return (_float(sample.usage), _float(used), _float(total),
+                _float(sample.temperature))
+    if metric == 'network':
+        rates = (NAN if rate is None else rate for rate in
+                 (sample.rx_rate, sample.tx_rate, sample.rx_pps, sample.tx_pps))
+        return (sample.rx_bytes, sample.tx_bytes, sample.rx_packets,
+                sample.tx_packets, *rates)
+    if metric == 'system':
+        return (sample.load_1, sample.load_5, sample.load_15,
+                sample.total_processes, sample.running_processes,
+                sample.zombie_processes, sample.logged_users)
+    raise ValueError(f'Unknown metric: {metric}')
+
+
+def csv_values(metric, fields):
+    """Numeric column values of a monitor.sh CSV row (already split on ',')"""
+    if metric == 'cpu':
+        # load average is written as "1m, 5m, 15m" and so spans 3 fields
+        return (_float(fields[2]), _int(fields[3]), _float(fields[4]),
+                _float(fields[5]), _float(fields[6]), _float(fields[7]))
+    if metric == 'memory':
+        return (_int(fields[2]), _int(fields[3]), _int(fields[4]),
+                _int(fields[5]), _float(fields[6]), _int(fields[7]),
+                _int(fields[8]))
+    if metric == 'disk':
+        return (_float(fields[2]), parse_human_size(fields[3]),
+                parse_human_size(fields[4]), parse_human_size(fields[5]))
+    if metric == 'gpu':
+        # "used, total" memory spans 2 fields when a GPU is present
+        if len(fields) >= 7:
+            return (_float(fields[3]), _float(fields[4]), _float(fields[5]),
+                    _float(fields[6]))
+        return (_float(fields[3]), NAN, NAN, _float(fields[5]))
+    if metric == 'network':
+        # Rows written before rates were collected end after the status
+        rates = [_float(value) for value in fields[10:14]]
+        rates += [NAN] * (4 - len(rates))
+        return (int(_float(fields[3]) * 1024 * 1024),
+                int(_float(fields[4]) * 1024 * 1024),
+                _int(fields[5]), _int(fields[6]), *rates)
+    if metric == 'system':
+        return (_float(fields[2]), _float(fields[3]), _float(fields[4]),
+                _int(fields[5]), _int(fields[6]), _int(fields[7]),
+                _int(fields[8]))
+    raise ValueError(f'Unknown metric: {metric}')
+
+
+################################################################################
+# Writer
+################################################################################
+
+class _Segment:
+    """Open append handles for every column file of one segment
+
+    Opening, repairing and appending hold an exclusive flock on the
+    segment's lock file, so rows from several processes never interleave
+    across columns and a repair never cuts into another writer's append.
+    """
+
+    def __init__(self, path, schema):
+        self.name = os.path.basename(path)
+        os.makedirs(path, exist_ok=True)
+        self.columns = [('ts', 'i8')] + list(schema)
+        self.files = []
+        self._lock_file = open(os.path.join(path, SEGMENT_LOCK), 'a')
+        with self._locked():
+            added = []
+            for name, dtype in self.columns:
+                file_path = os.path.join(path, f'{name}.{dtype}')
+                if not os.path.exists(file_path):
+                    added.append(len(self.files))
+                # ts is read back to keep appends in time order
+                self.files.append(open(file_path, 'ab+'))
+            if len(added) < len(self.files):
+                self._backfill(added)
+            self._repair()
+
+    @contextmanager
+    def _locked(self):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _sizes(self):
+        # Another process may have appended since this one last wrote
+        return [os.fstat(f.fileno()).st_size for f in self.files]
+
+    def _backfill(self, added):
+        """Pad columns added to the schema after the segment was started"""
+        rows = self._sizes()[0] // ITEMSIZE
+        for index in added:
+            dtype = self.columns[index][1]
+            fill = array(TYPECODES[dtype], [NAN if dtype == 'f8' else 0]) * rows
+            if sys.byteorder == 'big':
+                fill.byteswap()
+            self.files[index].write(fill.tobytes())
+            self.files[index].flush()
+
+    def _repair(self):
+        """Trim columns to a common row count after an interrupted append
+
+        Returns that row count.
+        """
+        sizes = self._sizes()
+        rows = min(sizes) // ITEMSIZE
+        for f, size in zip(self.files, sizes):
+            if size != rows * ITEMSIZE:
+                f.truncate(rows * ITEMSIZE)
+                f.seek(0, os.SEEK_END)
+        return rows
+
+    def _last_ts(self, rows):
+        if rows == 0:
+            return None
+        f = self.files[0]
+        f.seek((rows - 1) * ITEMSIZE)
+        data = f.read(ITEMSIZE)
+        f.seek(0, os.SEEK_END)
+        return int.from_bytes(data, 'little', signed=True)
+
+    def append(self, rows):
+        """Append rows of (ts, value, ...) tuples column by column
+
+        Rows older than the segment's newest one (another writer got
+        ahead) are dropped so ``ts`` stays sorted.
+        """
+        with self._locked():
+            last = self._last_ts(self._repair())
+            if last is not None and rows[0][0] < last:
+                rows = [row for row in rows if row[0] >= last]
+                if not rows:
+                    return
+            for index, (f, (_, dtype)) in enumerate(zip(self.files, self.columns)):
+                column = array(TYPECODES[dtype], (row[index] for row in rows))
+                if sys.byteorder == 'big':
+                    column.byteswap()  # Files are always little-endian
+                f.write(column.tobytes())
+            # Data columns first, timestamps last: a reader that sees a new ts
+            # entry always finds its values already on disk
+            for f in self.files[1:]:
+                f.flush()
+            self.files[0].flush()
+
+    def close(self):
+        for f in self.files:
+            f.close()
+        self._lock_file.close()
+
+
+class ColumnarWriter:
+    """Appends collector samples to per-metric columnar segments"""
+
+    def __init__(self, root, schemas=SCHEMAS):
+        self.root = root
+        self.schemas = schemas
+        self._segments = {}
+        self._lock = threading.Lock()
+
+    def _segment(self, metric, epoch):
+        name = segment_name(epoch)
+        segment = self._segments.get(metric)
+        if segment is None or segment.name != name:
+            if segment is not None:
+                segment.close()
+            segment = _Segment(os.path.join(self.root, metric, name),
+                               self.schemas[metric])
+            self._segments[metric] = segment
+        return segment
+
+    def append_rows(self, metric, rows):
+        """Append (epoch, value, ...) rows; rows must be in time order"""
+        with self._lock:
+            # Segments are UTC days: compare day numbers, format names once per split
+            days = [min(max(row[0], 0), MAX_EPOCH) // 86400 for row in rows]
+            start = 0
+            for end in range(1, len(rows) + 1):
+                # Split the batch wherever it crosses a segment boundary
+                if end == len(rows) or days[end] != days[start]:
+                    self._segment(metric, rows[start][0]).append(rows[start:end])
+                    start = end
+
+    def write(self, metric, sample):
+        self.append_rows(metric, [(int(sample.time), *sample_values(metric, sample))])
+
+    def write_all(self, samples):
+        for metric, sample in samples.items():
+            self.write(metric, sample)
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+
+
+def prune_segments(root, metric, oldest):
+    """Delete a metric's segments older than the ``oldest`` segment name"""
+    removed = []
+    try:
+        names = os.listdir(os.path.join(root, metric))
+    except FileNotFoundError:
+        return removed
+    for name in names:
+        if name.isdigit() and name < oldest:
+            shutil.rmtree(os.path.join(root, metric, name), ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+def read_csv_rows(csv_path, metric):
+    """(epoch, value, ...) rows of a ``*_metrics.csv`` file, in time order
+
+    Malformed and half-written lines are skipped.
+    """
+    rows = []
+    with open(csv_path) as f:
+        for line in f:
+            fields = line.rstrip('\n').split(',')
+            if len(fields) < 3:
+                continue
+            try:
+                rows.append((parse_timestamp(fields[0]), *csv_values(metric, fields)))
+            except (ValueError, IndexError):
+                continue
+    # Stores need time order; CSV appends almost are
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+
+def convert_csv(data_dir, root=None, force=False, extra_writers=()):
+    """One-shot conversion of the existing ``*_metrics.csv`` files
+
+    Returns a {metric: rows converted} mapping. Refuses to append to a
+    metric that already has columnar data unless ``force`` is set, in
+    which case that metric's columnar data is replaced. The converted
+    rows are also fed to ``extra_writers`` (e.g. rollup tiers) through
+    their ``append_rows`` method.
+    """
+    root = root or os.path.join(data_dir, 'columnar')
+    writer = ColumnarWriter(root)
+    converted = {}
+    try:
+        for metric in SCHEMAS:
+            csv_path = os.path.join(data_dir, f'{metric}_metrics.csv')
+            if not os.path.exists(csv_path):
+                continue
+            metric_root = os.path.join(root, metric)
+            if os.path.isdir(metric_root) and os.listdir(metric_root):
+                if not force:
+                    raise FileExistsError(f'{metric_root} already has data (use force)')
+                shutil.rmtree(metric_root)
+
+            rows = read_csv_rows(csv_path, metric)
+            writer.append_rows(metric, rows)
+            for extra in extra_writers:
+                extra.append_rows(metric, rows)
+            converted[metric] = len(rows)
+    finally:
+        writer.close()
+    return converted
+
+
+################################################################################
+# Reader
+################################################################################
+
+class ColumnarReader:
+    """Zero-copy numpy.memmap access to the columnar segments
+
+    At most ``max_maps`` column files stay mapped, least recently used
+    first out, and the maps of segments that disappear (retention) are
+    dropped so their disk space is freed.
+    """
+
+    def __init__(self, root, schemas=SCHEMAS, max_maps=MAX_MAPPED_COLUMNS):
+        import numpy
+        self.np = numpy
+        self.root = root
+        self.schemas = schemas
+        self.max_maps = max_maps
+        self._maps = OrderedDict()
+        self._listed = {}
+        self._lock = threading.Lock()
+
+    def segments(self, metric):
+        """Segment directory names of a metric, oldest first"""
+        try:
+            names = sorted(name for name in os.listdir(os.path.join(self.root, metric))
+                           if name.isdigit())
+        except FileNotFoundError:
+            names = []
+        if self._listed.get(metric) != names:
+            self._forget(metric, names)
+        return names
+
+    def _forget(self, metric, names):
+        """Drop the maps of a metric's segments that are no longer listed"""
+        prefix = os.path.join(self.root, metric) + os.sep
+        kept = set(names)
+        with self._lock:
+            self._listed[metric] = names
+            for path in [path for path in self._maps if path.startswith(prefix)]:
+                if path[len(prefix):].split(os.sep, 1)[0] not in kept:
+                    del self._maps[path]
+
+    def _column(self, path, dtype):
+        """Memory-map one column file, re-mapping only when it has grown
+
+        Returns None for a column the segment predates.
+        """
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._maps.pop(path, None)
+            return None
+        with self._lock:
+            entry = self._maps.get(path)
+            if entry is not None and entry[0] == size:
+                self._maps.move_to_end(path)
+                return entry[1]
+        rows = size // ITEMSIZE
+        if rows == 0:
+            column = self.np.empty(0, dtype='<' + dtype)
+        else:
+            column = self.np.memmap(path, dtype='<' + dtype, mode='r', shape=(rows,))
+        with self._lock:
+            self._maps[path] = (size, column)
+            self._maps.move_to_end(path)
+            while len(self._maps) > self.max_maps:
+                self._maps.popitem(last=False)
+        return column
+
+    def read_segment(self, metric, segment):
+        """Return {column: array} for one segment, trimmed to complete rows"""
+        path = os.path.join(self.root, metric, segment)
+        # Read ts first: it is flushed last, so every row it covers is complete
+        ts = self._column(os.path.join(path, 'ts.i8'), 'i8')
+        if ts is None:
+            ts = self.np.empty(0, dtype='<i8')
+        columns = {'ts': ts}
+        for name, dtype in self.schemas[metric]:
+            column = self._column(os.path.join(path, f'{name}.{dtype}'), dtype)
+            if column is None:
+                column = self.np.full(len(ts), self.np.nan if dtype == 'f8' else 0,
+                                      dtype='<' + dtype)
+            columns[name] = column
+        rows = min(len(column) for column in columns.values())
+        return {name: column[:rows] for name, column in columns.items()}
+
+    def latest_ts(self, metric):
+        """Epoch seconds of the newest stored sample, or None"""
+        for segment in reversed(self.segments(metric)):
+            ts = self.read_segment(metric, segment)['ts']
+            if len(ts):
+                return int(ts[-1])
+        return None
+
+    def query(self, metric, start=None, end=None):
+        """Return {column: array} of samples with start <= ts <= end
+
+        A range inside a single segment is returned as memmap views; only
+        ranges spanning several segments are concatenated.
+        """
+        np = self.np
+        if metric not in self.schemas:
+            raise ValueError(f'Unknown metric: {metric}')
+        first = segment_name(start) if start is not None else None
+        last = segment_name(end) if end is not None else None
+
+        parts = []
+        for segment in self.segments(metric):
+            if (first and segment < first) or (last and segment > last):
+                continue
+            columns = self.read_segment(metric, segment)
+            ts = columns['ts']
+            lo = 0 if start is None else int(np.searchsorted(ts, start, 'left'))
+            hi = len(ts) if end is None else int(np.searchsorted(ts, end, 'right'))
+            if hi > lo:
+                parts.append({name: column[lo:hi] for name, column in columns.items()})
+
+        names = ['ts'] + [name for name, _ in self.schemas[metric]]
+        if not parts:
+            return {name: np.empty(0, dtype='<' + dtype)
+                    for name, dtype in [('ts', 'i8')] + list(self.schemas[metric])}
+        if len(parts) == 1:
+            return parts[0]
+        return {name: np.concatenate([part[name] for part in parts]) for name in names}
+
+    def summary(self, metric, start=None, end=None):
+        """Per-column count/min/max/mean over a time range"""
+        np = self.np
+        columns = self.query(metric, start, end)
+        ts = columns.pop('ts')
+        result = {
+            'count': int(len(ts)),
+            'from': int(ts[0]) if len(ts) else None,
+            'to': int(ts[-1]) if len(ts) else None,
+            'columns': {}
+        }
+        for name, column in columns.items():
+            values = column[~np.isnan(column)] if column.dtype.kind == 'f' else column
+            if len(values):
+                result['columns'][name] = {
+                    'min': float(values.min()),
+                    'max': float(values.max()),
+                    'mean': float(values.mean())
+                }
+            else:
+                result['columns'][name] = {'min': None, 'max': None, 'mean': None}
+        return result
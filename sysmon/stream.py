@@ -0,0 +1,264 @@
+"""
+Push stream of new samples and alerts for the web dashboard
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+One background thread watches the data and log directories (inotify,
+falling back to polling), reads only the newly appended lines and fans
+each update out to every connected client as a pre-encoded Server-Sent
+Events message. N dashboards therefore cost one file read per change
+instead of N full re-parses per poll.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import queue
+import select
+import struct
+import threading
+import time
+
+from sysmon.tail import LineFollower, parse_row
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct('iIII')
+
+ALERT_MARKERS = (b'[WARNING]', b'[ERROR]')
+
+# Queued on a subscriber that fell too far behind and has been dropped
+CLOSED = object()
+
+
+def sse_message(event, payload):
+    """Encode one Server-Sent Events message"""
+    return f'event: {event}\ndata: {json.dumps(payload)}\n\n'.encode()
+
+
+class DirectoryWatcher:
+    """Waits for files to change in a set of directories
+
+    Uses inotify through libc when available; otherwise wait() simply
+    sleeps for the poll interval and callers re-check their files.
+    """
+
+    def __init__(self, directories, poll_interval=1.0,
+                 mask=IN_MODIFY | IN_CREATE | IN_MOVED_TO):
+        self.poll_interval = poll_interval
+        self._fd = None
+        self._dirs = {}
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return
+            for directory in directories:
+                wd = libc.inotify_add_watch(fd, os.fsencode(directory), mask)
+                if wd >= 0:
+                    self._dirs[wd] = directory
+            if self._dirs:
+                self._fd = fd
+            else:
+                os.close(fd)
+        except (OSError, AttributeError):
+            self._fd = None
+
+    @property
+    def uses_inotify(self):
+        return self._fd is not None
+
+    @property
+    def directories(self):
+        """The directories inotify is watching"""
+        return list(self._dirs.values())
+
+    def wait(self, timeout):
+        """Block until something changes; return changed paths or None
+
+        None means "unknown, check everything" (polling mode, or events
+        were lost to a queue overflow). An event on a watched directory
+        itself (deleted, moved, unwatched) reports the directory's path.
+        """
+        if self._fd is None:
+            time.sleep(min(timeout, self.poll_interval))
+            return None
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        # Let the collector finish its burst of appends before reading
+        time.sleep(0.05)
+        changed = set()
+        overflowed = False
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflowed = True
+                elif wd in self._dirs:
+                    directory = self._dirs[wd]
+                    changed.add(os.path.join(directory, os.fsdecode(name)) if name else directory)
+        return None if overflowed else changed
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class StreamHub:
+    """Follows the metric CSVs and log files and broadcasts what is new"""
+
+    def __init__(self, data_dir, log_dir, metric_types, poll_interval=1.0,
+                 queue_size=256, heartbeat=15.0):
+        self.data_dir = data_dir
+        self.log_dir = log_dir
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._metrics = {os.path.join(data_dir, f'{metric}_metrics.csv'): metric
+                         for metric in metric_types}
+        self._metric_followers = {path: LineFollower(path) for path in self._metrics}
+        self._log_followers = {}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.watcher = None
+
+    # Subscribers -------------------------------------------------------------
+
+    def subscribe(self):
+        """Register a client; returns its message queue"""
+        self.start()
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def client_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def broadcast(self, message):
+        """Queue one pre-encoded message for every client"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # A stalled client must not hold the others back; it will
+                # reconnect (EventSource does so automatically)
+                self.unsubscribe(subscriber)
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait(CLOSED)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    # Watch loop ------------------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            # Remember the current ends so only later appends are pushed
+            for follower in self._metric_followers.values():
+                follower.read_new()
+            self._prime_logs()
+            # Deletions and renames are watched too so vanished logs are let go
+            self.watcher = DirectoryWatcher(
+                [self.data_dir, self.log_dir], self.poll_interval,
+                mask=IN_MODIFY | IN_CREATE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM)
+            self._thread = threading.Thread(target=self._run, name='stream-hub', daemon=True)
+            self._thread.start()
+
+    def _prime_logs(self):
+        """Follow existing logs from their current end"""
+        try:
+            names = [entry.name for entry in os.scandir(self.log_dir)
+                     if entry.name.endswith('.log')]
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.log_dir, name)
+            follower = self._log_followers[path] = LineFollower(path, from_end=True)
+            follower.read_new()
+
+    def _scan_logs(self):
+        """Polling mode: follow log files created since the last scan, drop removed ones"""
+        try:
+            paths = {os.path.join(self.log_dir, entry.name) for entry in os.scandir(self.log_dir)
+                     if entry.name.endswith('.log')}
+        except FileNotFoundError:
+            paths = set()
+        for path in list(self._log_followers):
+            if path not in paths:
+                del self._log_followers[path]
+        for path in paths:
+            if path not in self._log_followers:
+                self._log_followers[path] = LineFollower(path, from_end=False)
+
+    def _run(self):
+        while True:
+            changed = self.watcher.wait(self.heartbeat)
+            try:
+                self.poll(changed)
+            except Exception:
+                time.sleep(self.poll_interval)  # Never let the hub thread die
+
+    def poll(self, changed=None):
+        """Read what changed (None: check every file) and broadcast it"""
+        metric_paths = self._metrics if changed is None else \
+            [path for path in changed if path in self._metrics]
+        if changed is None:
+            self._scan_logs()
+            log_paths = list(self._log_followers)
+        else:
+            log_paths = [path for path in changed if path.endswith('.log')]
+            for path in log_paths:
+                if path not in self._log_followers:
+                    self._log_followers[path] = LineFollower(path, from_end=False)
+
+        metrics = {}
+        for path in metric_paths:
+            lines = self._metric_followers[path].read_new()
+            if lines:
+                row = parse_row(lines[-1])
+                metrics[self._metrics[path]] = {'timestamp': row[0], 'data': row[1:]}
+        if metrics:
+            self.broadcast(sse_message('metrics', metrics))
+
+        alerts = []
+        for path in log_paths:
+            follower = self._log_followers[path]
+            for line in follower.read_new():
+                if any(marker in line for marker in ALERT_MARKERS):
+                    alerts.append(line.decode('utf-8', errors='replace').strip())
+            if follower.missing:
+                # Deleted or rotated away; a new file at the path is followed afresh
+                del self._log_followers[path]
+        if alerts:
+            self.broadcast(sse_message('alerts', {'alerts': alerts}))
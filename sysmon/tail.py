@@ -0,0 +1,358 @@
+"""
+Tail readers for the append-only metric files
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+The collector only ever appends to the ``*_metrics.csv`` files, so the
+newest sample is always the last complete line and everything before a
+remembered byte offset is already known. These helpers read the latest
+row by seeking backwards from EOF and keep the recent history in ring
+buffers that only ever read the appended bytes.
+"""
+
+import os
+import threading
+from collections import deque
+from itertools import islice
+
+BLOCK_SIZE = 4096
+
+
+def read_last_line(path, block_size=BLOCK_SIZE):
+    """Return the last complete (newline-terminated) line of a file as bytes
+
+    A trailing line without a newline is still being written by the
+    collector and is ignored. Returns None when the file has no complete
+    non-empty line.
+    """
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        buf = b''
+        end = None
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+
+            if end is None:
+                end = buf.rfind(b'\n')
+                if end == -1:
+                    end = None
+                    continue
+            else:
+                end += step  # Keep the index valid after prepending
+
+            while True:
+                start = buf.rfind(b'\n', 0, end)
+                if start == -1:
+                    if pos > 0:
+                        break  # Line starts in an earlier block
+                    line = buf[:end]
+                else:
+                    line = buf[start + 1:end]
+                if line.strip():
+                    return line.rstrip(b'\r')
+                if start == -1:
+                    return None
+                end = start  # Skip blank lines
+    return None
+
+
+def iter_lines_backward(path, end=None, block_size=BLOCK_SIZE):
+    """Yield the lines of a file from the last one back to the first
+
+    ``end`` limits the read to the first ``end`` bytes of the file. Blocks
+    are read backwards from EOF only as lines are consumed, so stopping
+    early costs just the blocks holding the lines taken. Lines are bytes
+    without their newline.
+    """
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END) if end is None else end
+        if pos == 0:
+            return
+        f.seek(pos - 1)
+        if f.read(1) == b'\n':
+            pos -= 1  # The final newline terminates the last line
+        buf = b''
+        while True:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            while True:
+                newline = buf.rfind(b'\n')
+                if newline == -1 and pos > 0:
+                    break  # Line starts in an earlier block
+                line, buf = buf[newline + 1:], buf[:max(newline, 0)]
+                yield line
+                if newline == -1:
+                    return
+
+
+def read_lines_backward(path, count, skip=0, end=None, block_size=BLOCK_SIZE):
+    """Return up to ``count`` lines ending ``skip`` lines before EOF, oldest first
+
+    ``end`` limits the read to the first ``end`` bytes of the file. Every
+    line that has been passed is dropped, so memory stays bounded by the
+    lines returned plus one block.
+    """
+    if count <= 0:
+        return []
+    lines = list(islice(iter_lines_backward(path, end, block_size), skip, skip + count))
+    lines.reverse()
+    return lines
+
+
+def parse_value(field):
+    """Convert a CSV field to int or float when it looks numeric"""
+    field = field.strip()
+    if '_' in field:
+        return field  # int()/float() accept digit separators
+    try:
+        return int(field)
+    except ValueError:
+        pass
+    try:
+        return float(field)
+    except ValueError:
+        return field
+
+
+def parse_row(line):
+    """Split a metric CSV line into typed values"""
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', errors='replace')
+    timestamp, *fields = line.split(',')
+    # Timestamps are identifiers, keep them verbatim
+    return [timestamp.strip()] + [parse_value(field) for field in fields]
+
+
+class LatestRowCache:
+    """Caches the parsed last row of each file keyed on (inode, size, mtime)
+
+    A lookup with no new data costs a single stat(); the file is only
+    opened when the collector has appended or replaced it.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Return the parsed last row of ``path`` or None if it has no rows
+
+        Raises FileNotFoundError when the file does not exist.
+        """
+        st = os.stat(path)
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+
+        line = read_last_line(path)
+        row = parse_row(line) if line is not None else None
+        with self._lock:
+            self._entries[path] = (key, row)
+        return row
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TailBuffer:
+    """Ring buffer over the newest rows of one append-only CSV file
+
+    Each refresh reads only the bytes appended since the remembered
+    offset. A changed inode (rotation) or a file shorter than the offset
+    (truncation) resets the buffer and re-reads from the start.
+    """
+
+    def __init__(self, path, capacity=1000, chunk_size=1 << 20):
+        self.path = path
+        self.capacity = capacity
+        self.chunk_size = chunk_size
+        self.rows = deque(maxlen=capacity)
+        self.count = 0
+        self._inode = None
+        self._offset = 0
+        self._partial = b''
+        self._lock = threading.Lock()
+
+    def _reset(self, inode):
+        self.rows.clear()
+        self.count = 0
+        self._inode = inode
+        self._offset = 0
+        self._partial = b''
+
+    def _ingest(self, f):
+        f.seek(self._offset)
+        while True:
+            chunk = f.read(self.chunk_size)
+            if not chunk:
+                break
+            self._offset += len(chunk)
+            lines = (self._partial + chunk).split(b'\n')
+            # The last piece has no newline yet; keep it for the next read
+            self._partial = lines.pop()
+            self.count += len(lines) - lines.count(b'')
+            # Only the rows that can still be in the window get parsed
+            self.rows.extend(parse_row(line) for line in lines[-self.capacity:]
+                             if line.strip())
+
+    def refresh(self):
+        """Pull in rows appended since the last refresh"""
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            with self._lock:
+                if st.st_ino != self._inode or st.st_size < self._offset:
+                    self._reset(st.st_ino)
+                if st.st_size > self._offset:
+                    self._ingest(f)
+
+    def snapshot(self, limit=None):
+        """Return (total row count, newest ``limit`` rows)"""
+        self.refresh()
+        with self._lock:
+            rows = list(self.rows)
+            count = self.count
+        if limit is not None:
+            rows = rows[-limit:] if limit > 0 else []
+        return count, rows
+
+
+class HistoryCache:
+    """One TailBuffer per metric file, created on first use"""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        with self._lock:
+            buffer = self._buffers.get(path)
+            if buffer is None:
+                buffer = self._buffers[path] = TailBuffer(path, self.capacity)
+        return buffer
+
+
+class LineFollower:
+    """Returns the complete lines appended to a file since the last call
+
+    With ``from_end`` the first read starts after the file's current last
+    complete line, so only lines written afterwards are reported. A new
+    inode or a shrunken file restarts from the beginning. ``missing`` is
+    set while the last read found no file.
+    """
+
+    def __init__(self, path, from_end=True):
+        self.path = path
+        self.from_end = from_end
+        self.missing = False
+        self._inode = None
+        self._offset = 0
+        self._partial = b''
+
+    def _start_at_end(self, f, size):
+        block = min(size, BLOCK_SIZE)
+        f.seek(size - block)
+        tail = f.read(block)
+        newline = tail.rfind(b'\n')
+        if newline != -1 or block == size:
+            # Keep an unterminated last line so its remainder is not misread
+            self._partial = tail[newline + 1:]
+        else:
+            self._partial = None  # Line began before the block: drop it
+        self._offset = size
+
+    def read_new(self):
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            self.missing = True
+            if self._inode is None:
+                self.from_end = False  # Everything in it will be new
+            return []
+        self.missing = False
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != self._inode:
+                first = self._inode is None
+                self._inode = st.st_ino
+                self._offset = 0
+                self._partial = b''
+                if first and self.from_end:
+                    self._start_at_end(f, st.st_size)
+            elif st.st_size < self._offset:
+                self._offset = 0
+                self._partial = b''
+            if st.st_size <= self._offset:
+                return []
+
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+        self._offset += len(data)
+        if self._partial is None:
+            _, newline, data = data.partition(b'\n')
+            if not newline:
+                return []  # Still inside the dropped line
+            self._partial = b''
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        return [line.rstrip(b'\r') for line in lines if line.strip()]
+
+
+class LineCounter:
+    """Line count of an append-only file, advanced over appended bytes only
+
+    Counts like ``len(f.readlines())``: a final line without a newline
+    counts as a line. Rotation or truncation restarts the count.
+    """
+
+    def __init__(self, path, chunk_size=1 << 20):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._inode = None
+        self._offset = 0
+        self._newlines = 0
+        self._ends_with_newline = True
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Return (size counted up to, line count) of the file"""
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            with self._lock:
+                if st.st_ino != self._inode or st.st_size < self._offset:
+                    self._inode = st.st_ino
+                    self._offset = 0
+                    self._newlines = 0
+                    self._ends_with_newline = True
+                f.seek(self._offset)
+                while self._offset < st.st_size:
+                    chunk = f.read(min(self.chunk_size, st.st_size - self._offset))
+                    if not chunk:
+                        break
+                    self._offset += len(chunk)
+                    self._newlines += chunk.count(b'\n')
+                    self._ends_with_newline = chunk.endswith(b'\n')
+                lines = self._newlines + (0 if self._ends_with_newline else 1)
+                return self._offset, lines
+
+
+class LineCounterCache:
+    """One LineCounter per file, created on first use"""
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        with self._lock:
+            counter = self._counters.get(path)
+            if counter is None:
+                counter = self._counters[path] = LineCounter(path)
+        return counter
@@ -0,0 +1,321 @@
+"""
+SQLite metric storage in write-ahead-log mode
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+An alternative to the columnar segments, chosen with STORAGE_BACKEND=sqlite.
+Every sample goes into a single table of ``data/metrics.db``:
+
+    samples(metric TEXT, ts INTEGER, v0, v1, ..., v7)
+        PRIMARY KEY (metric, ts) WITHOUT ROWID
+
+The (metric, ts) key is the table's own b-tree, so a range query is one
+index seek followed by a sequential read, and the newest sample of a
+family is a single lookup. Values fill v0, v1, ... in SCHEMAS order; NaN
+is stored as NULL. In WAL mode the web server reads while the collector
+writes, and a reader only ever sees whole committed cycles, never a
+half-written row. The collector inserts each cycle in one transaction.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from sysmon.storage import MAX_EPOCH, SCHEMAS, read_csv_rows, sample_values
+
+DB_FILE = 'metrics.db'
+
+# Where /api/metrics/* range queries and the collector's typed samples go
+BACKENDS = ('columnar', 'sqlite')
+BACKEND = os.getenv('STORAGE_BACKEND', 'columnar')
+
+VALUE_SLOTS = max(len(schema) for schema in SCHEMAS.values())
+BUSY_TIMEOUT = 5.0
+POOL_SIZE = 4
+# Compiled statements each connection keeps (sqlite3's own LRU cache)
+STATEMENT_CACHE = 64
+
+# SQL aggregate of each query.AGGREGATES entry SQLite can fold by itself
+BUCKET_FUNCTIONS = {'mean': 'avg', 'min': 'min', 'max': 'max'}
+
+
+def _slots(count):
+    return [f'v{i}' for i in range(count)]
+
+
+def connect(path, readonly=False, timeout=BUSY_TIMEOUT):
+    """Connection to a metrics database in WAL mode
+
+    A writable connection creates the file and table; a read-only one
+    raises FileNotFoundError when there is no database yet.
+    """
+    if readonly:
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE, isolation_level=None)
+        conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE, isolation_level=None)
+    conn.execute('PRAGMA journal_mode = WAL')
+    # Commits survive a crashed process; only a power cut can lose the last ones
+    conn.execute('PRAGMA synchronous = NORMAL')
+    slots = ', '.join(_slots(VALUE_SLOTS))
+    conn.execute(f'CREATE TABLE IF NOT EXISTS samples (metric TEXT NOT NULL, ts INTEGER NOT NULL, '
+                 f'{slots}, PRIMARY KEY (metric, ts)) WITHOUT ROWID')
+    # A database created before a schema grew gets the missing slots
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(samples)')}
+    for slot in _slots(VALUE_SLOTS):
+        if slot not in existing:
+            conn.execute(f'ALTER TABLE samples ADD COLUMN {slot}')
+    return conn
+
+
+################################################################################
+# Writer
+################################################################################
+
+class SqliteWriter:
+    """Inserts collector samples, one transaction per batch or cycle
+
+    A second sample of a family within the same second replaces the first.
+    """
+
+    def __init__(self, path, schemas=SCHEMAS):
+        self.path = path
+        self.schemas = schemas
+        self._conn = None
+        self._lock = threading.Lock()
+        self._inserts = {
+            metric: (f"INSERT OR REPLACE INTO samples (metric, ts, "
+                     f"{', '.join(_slots(len(schema)))}) "
+                     f"VALUES (?, ?{', ?' * len(schema)})")
+            for metric, schema in schemas.items()
+        }
+
+    def append_batches(self, batches):
+        """Insert {metric: [(epoch, value, ...), ...]} in one transaction"""
+        with self._lock:
+            if self._conn is None:
+                self._conn = connect(self.path)
+            conn = self._conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for metric, rows in batches.items():
+                    conn.executemany(self._inserts[metric],
+                                     ((metric, *row) for row in rows))
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def append_rows(self, metric, rows):
+        self.append_batches({metric: rows})
+
+    def write(self, metric, sample):
+        self.write_all({metric: sample})
+
+    def write_all(self, samples):
+        self.append_batches({metric: [(int(sample.time), *sample_values(metric, sample))]
+                             for metric, sample in samples.items() if metric in self.schemas})
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def migrate_csv(data_dir, path=None, force=False, extra_writers=()):
+    """One-shot import of the existing ``*_metrics.csv`` files
+
+    Returns a {metric: rows imported} mapping. Refuses to add to a metric
+    that already has rows in the database unless ``force`` is set, in
+    which case those rows are replaced. The rows are also fed to
+    ``extra_writers`` (e.g. rollup tiers) through their ``append_rows``.
+    """
+    path = path or os.path.join(data_dir, DB_FILE)
+    writer = SqliteWriter(path)
+    conn = connect(path)
+    migrated = {}
+    try:
+        for metric in SCHEMAS:
+            csv_path = os.path.join(data_dir, f'{metric}_metrics.csv')
+            if not os.path.exists(csv_path):
+                continue
+            if conn.execute('SELECT 1 FROM samples WHERE metric = ? LIMIT 1', (metric,)).fetchone():
+                if not force:
+                    raise FileExistsError(f'{path} already has {metric} samples (use force)')
+                conn.execute('DELETE FROM samples WHERE metric = ?', (metric,))
+
+            rows = read_csv_rows(csv_path, metric)
+            writer.append_rows(metric, rows)
+            for extra in extra_writers:
+                extra.append_rows(metric, rows)
+            migrated[metric] = len(rows)
+    finally:
+        conn.close()
+        writer.close()
+    return migrated
+
+
+def prune_rows(path, oldest):
+    """Delete samples older than epoch ``oldest``; returns the families trimmed"""
+    if not os.path.exists(path):
+        return []
+    conn = connect(path)
+    pruned = []
+    try:
+        for metric in SCHEMAS:
+            cursor = conn.execute('DELETE FROM samples WHERE metric = ? AND ts < ?',
+                                  (metric, oldest))
+            if cursor.rowcount > 0:
+                pruned.append(metric)
+    finally:
+        conn.close()
+    return pruned
+
+
+################################################################################
+# Reader
+################################################################################
+
+class ConnectionPool:
+    """Read connections shared by a server's request threads
+
+    At most ``size`` connections exist; a thread borrows one for a query
+    and hands it back, so each keeps its compiled statements across
+    requests. Opened after the fork, as sqlite3 connections must not
+    cross one.
+    """
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; raises FileNotFoundError without a database"""
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = connect(self.path, readonly=True)
+            healthy = True
+            try:
+                yield conn
+            except sqlite3.Error:
+                # Do not hand out a connection in an unknown state again
+                healthy = False
+                conn.close()
+                raise
+            finally:
+                if healthy:
+                    self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SqliteReader:
+    """Range queries on the (metric, ts) key, shaped like ColumnarReader's"""
+
+    def __init__(self, path, schemas=SCHEMAS, pool_size=POOL_SIZE):
+        import numpy
+        self.np = numpy
+        self.path = path
+        self.schemas = schemas
+        self.pool = ConnectionPool(path, pool_size)
+        self._selects = {}
+        self._summaries = {}
+        self._buckets = {}
+        for metric, schema in schemas.items():
+            # Slots added after a row was written read back as NULL: 0 for integers
+            values = [slot if dtype == 'f8' else f'coalesce({slot}, 0)'
+                      for slot, (_, dtype) in zip(_slots(len(schema)), schema)]
+            self._selects[metric] = (f"SELECT ts, {', '.join(values)} FROM samples "
+                                     f"WHERE metric = ? AND ts BETWEEN ? AND ? ORDER BY ts")
+            stats = ', '.join(f'min({slot}), max({slot}), avg({slot})'
+                              for slot in _slots(len(schema)))
+            self._summaries[metric] = (f"SELECT count(*), min(ts), max(ts), {stats} FROM samples "
+                                       f"WHERE metric = ? AND ts BETWEEN ? AND ?")
+            for agg, function in BUCKET_FUNCTIONS.items():
+                folded = ', '.join(f'{function}({slot})' for slot in _slots(len(schema)))
+                self._buckets[metric, agg] = (
+                    f"SELECT ts / ? AS bucket, count(*), {folded} FROM samples "
+                    f"WHERE metric = ? AND ts BETWEEN ? AND ? GROUP BY bucket ORDER BY bucket")
+
+    def _execute(self, sql, params):
+        try:
+            with self.pool.connection() as conn:
+                return conn.execute(sql, params).fetchall()
+        except FileNotFoundError:
+            return []
+
+    def _check(self, metric):
+        if metric not in self.schemas:
+            raise ValueError(f'Unknown metric: {metric}')
+
+    def latest_ts(self, metric):
+        """Epoch seconds of the newest stored sample, or None"""
+        rows = self._execute('SELECT max(ts) FROM samples WHERE metric = ?', (metric,))
+        return rows[0][0] if rows else None
+
+    def query(self, metric, start=None, end=None):
+        """Return {column: array} of samples with start <= ts <= end"""
+        np = self.np
+        self._check(metric)
+        rows = self._execute(self._selects[metric], (
+            metric, 0 if start is None else start, MAX_EPOCH if end is None else end))
+        columns = list(zip(*rows)) or [()] * (len(self.schemas[metric]) + 1)
+        names = [('ts', 'i8')] + list(self.schemas[metric])
+        return {name: np.array(column, dtype='<' + dtype)
+                for (name, dtype), column in zip(names, columns)}
+
+    def bucket_aggregate(self, metric, start, end, step, agg='mean'):
+        """query.bucket_aggregate() over a time range, folded inside SQLite
+
+        Only the buckets leave the database, not the samples. Returns None
+        for an aggregate SQLite cannot compute (p95).
+        """
+        np = self.np
+        self._check(metric)
+        if agg not in BUCKET_FUNCTIONS:
+            return None
+        rows = self._execute(self._buckets[metric, agg], (step, metric, start, end))
+        buckets, counts, *columns = list(zip(*rows)) or [()] * (len(self.schemas[metric]) + 2)
+        return (np.array(buckets, dtype=np.int64) * step, np.array(counts, dtype=np.int64),
+                {name: np.array(column, dtype=np.float64)
+                 for (name, _), column in zip(self.schemas[metric], columns)})
+
+    def summary(self, metric, start=None, end=None):
+        """Per-column count/min/max/mean over a time range, computed by SQLite"""
+        self._check(metric)
+        rows = self._execute(self._summaries[metric], (
+            metric, 0 if start is None else start, MAX_EPOCH if end is None else end))
+        count, first, last, *stats = rows[0] if rows else (0, None, None)
+        result = {
+            'count': count,
+            'from': first,
+            'to': last,
+            'columns': {}
+        }
+        for i, (name, _) in enumerate(self.schemas[metric]):
+            values = stats[3 * i:3 * i + 3] or (None, None, None)
+            result['columns'][name] = {
+                stat: None if value is None else float(value)
+                for stat, value in zip(('min', 'max', 'mean'), values)
+            }
+        return result
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,249 @@
+"""
+Response encodings for the web API
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+Metric history can leave the server in four shapes: one JSON record per
+point (the original format), JSON columns ``{"ts": [...], "cols": {...}}``,
+raw little-endian arrays behind a short JSON header, or Arrow IPC when
+pyarrow is installed. Every encoder is a generator that works through the
+arrays ``CHUNK_ROWS`` at a time, so a long window is streamed instead of
+being built as one string. Bodies are gzip (or, with the brotli package,
+brotli) compressed as the client's Accept-Encoding allows; streamed
+bodies are flushed chunk by chunk so nothing waits for the end.
+"""
+
+import gzip
+import json
+import struct
+import zlib
+
+import numpy as np
+
+from sysmon.collector import format_timestamp
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+CHUNK_ROWS = 65536
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Content codings in order of preference
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+BINARY_MAGIC = b'SMC1'
+BINARY_MIMETYPE = 'application/vnd.sysmon.columns'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+# Accept media types of each format; the first one matching */* wins
+FORMAT_TYPES = [('application/json', 'records'),
+                ('application/vnd.sysmon.columns+json', 'columns'),
+                (BINARY_MIMETYPE, 'binary'),
+                ('application/octet-stream', 'binary')]
+if pyarrow:
+    FORMAT_TYPES.append((ARROW_MIMETYPE, 'arrow'))
+FORMATS = tuple(dict.fromkeys(name for _, name in FORMAT_TYPES))
+
+# Response Content-Type of each format
+MIMETYPES = {'records': 'application/json', 'columns': 'application/json',
+             'binary': BINARY_MIMETYPE, 'arrow': ARROW_MIMETYPE}
+
+
+def negotiate_format(name, accept):
+    """Format named by a format= argument, else the best match for Accept
+
+    Raises ValueError for an unknown (or uninstalled) format name.
+    """
+    if name:
+        if name not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        return name
+    best = accept.best_match([mimetype for mimetype, _ in FORMAT_TYPES])
+    return dict(FORMAT_TYPES).get(best, 'records')
+
+
+def negotiate_encoding(accept):
+    """Preferred content coding the client accepts, or None"""
+    return accept.best_match(ENCODINGS)
+
+
+def _dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+def _chunks(array, chunk_rows):
+    for start in range(0, len(array), chunk_rows):
+        yield start, array[start:start + chunk_rows]
+
+
+def _values(array):
+    """Python values of an array slice with NaN as None"""
+    values = array.tolist()
+    if array.dtype.kind == 'f' and np.isnan(array).any():
+        values = [None if value != value else value for value in values]
+    return values
+
+
+def _json_numbers(array):
+    """Comma-separated JSON numbers of an array slice, NaN as null"""
+    array = np.asarray(array)
+    if orjson is not None:
+        return orjson.dumps(array, option=orjson.OPT_SERIALIZE_NUMPY)[1:-1]
+    # json writes non-finite floats as NaN, which is not JSON
+    return json.dumps(array.tolist(), separators=(',', ':'))[1:-1].replace('NaN', 'null').encode()
+
+
+def _arrays(ts, columns, samples):
+    arrays = [('ts', ts)]
+    if samples is not None:
+        arrays.append(('samples', samples))
+    return arrays + list(columns.items())
+
+
+def _dtype(array):
+    return '<i8' if array.dtype.kind in 'iub' else '<f8'
+
+
+def encode_records(meta, ts, columns, samples=None, chunk_rows=CHUNK_ROWS):
+    """``meta`` plus ``"data": [{"timestamp": ..., <column>: ...}, ...]``"""
+    yield _dumps(meta)[:-1] + b',"data":['
+    names = list(columns)
+    for start, times in _chunks(ts, chunk_rows):
+        stop = start + len(times)
+        values = [_values(columns[name][start:stop]) for name in names]
+        counts = samples[start:stop].tolist() if samples is not None else None
+        records = []
+        for i, epoch in enumerate(times.tolist()):
+            record = {'timestamp': format_timestamp(epoch)}
+            if counts is not None:
+                record['samples'] = counts[i]
+            for name, column in zip(names, values):
+                record[name] = column[i]
+            records.append(record)
+        yield (b',' if start else b'') + _dumps(records)[1:-1]
+    yield b']}'
+
+
+def encode_columns(meta, ts, columns, samples=None, chunk_rows=CHUNK_ROWS):
+    """``meta`` plus ``"ts": [epoch, ...], "samples": [...], "cols": {name: [...]}``"""
+    yield _dumps(meta)[:-1]
+    for name, array in _arrays(ts, {}, samples):
+        yield b',"' + name.encode() + b'":['
+        for start, chunk in _chunks(array, chunk_rows):
+            yield (b',' if start else b'') + _json_numbers(chunk)
+        yield b']'
+    yield b',"cols":{'
+    for i, (name, array) in enumerate(columns.items()):
+        yield (b',' if i else b'') + _dumps(name) + b':['
+        for start, chunk in _chunks(array, chunk_rows):
+            yield (b',' if start else b'') + _json_numbers(chunk)
+        yield b']'
+    yield b'}}'
+
+
+def encode_binary(meta, ts, columns, samples=None, chunk_rows=CHUNK_ROWS):
+    """Column-major little-endian arrays after a length-prefixed JSON header
+
+    Layout: ``SMC1``, uint32 header length, the header (``meta`` plus
+    ``rows`` and ``columns``: [[name, dtype], ...]), then each column's
+    ``rows`` values in header order. NumPy reads a column back with
+    ``numpy.frombuffer(body, dtype, rows, offset)``.
+    """
+    arrays = _arrays(ts, columns, samples)
+    header = _dumps(dict(meta, rows=len(ts),
+                         columns=[[name, _dtype(array)] for name, array in arrays]))
+    yield BINARY_MAGIC + struct.pack('<I', len(header)) + header
+    for _, array in arrays:
+        dtype = _dtype(array)
+        for _, chunk in _chunks(array, chunk_rows):
+            yield np.asarray(chunk, dtype=dtype).tobytes()
+
+
+class _Sink:
+    """File object collecting what the Arrow stream writer produces"""
+
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def encode_arrow(meta, ts, columns, samples=None, chunk_rows=CHUNK_ROWS):
+    """Arrow IPC stream, one record batch per chunk; ``meta`` is schema metadata"""
+    arrays = _arrays(ts, columns, samples)
+    fields = [pyarrow.field('ts', pyarrow.timestamp('s', tz='UTC'))]
+    fields += [pyarrow.field(name, pyarrow.int64() if _dtype(array) == '<i8' else pyarrow.float64())
+               for name, array in arrays[1:]]
+    schema = pyarrow.schema(fields, metadata={'sysmon': json.dumps(meta)})
+
+    sink = _Sink()
+    writer = pyarrow.ipc.new_stream(sink, schema)
+    for start in range(0, max(len(ts), 1), chunk_rows):
+        stop = start + chunk_rows
+        batch = [np.asarray(array[start:stop]) for _, array in arrays]
+        writer.write_batch(pyarrow.record_batch(
+            [pyarrow.array(values, type=field.type, from_pandas=True)
+             for values, field in zip(batch, fields)], schema=schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+ENCODERS = {'records': encode_records, 'columns': encode_columns,
+            'binary': encode_binary, 'arrow': encode_arrow}
+
+
+def compress(data, encoding):
+    """Compress a whole body with 'gzip' or 'br'"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+def compress_chunks(chunks, encoding):
+    """Compress a streamed body, flushing after every chunk"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,50 @@
+"""
+Production serving configuration for the web interface
+Arab Academy for Science, Technology & Maritime Transport - OS Project 12
+
+    gunicorn -c web/gunicorn.conf.py
+
+Pre-fork WSGI: each worker process imports server.py after the fork
+(no preload), so the tail caches, ring buffers, memory maps and stream
+watcher are private to the worker and nothing is shared or locked across
+processes. Inside a worker, requests run on a fixed pool of threads, so
+the blocking CSV/log reads never exceed WEB_THREADS at a time.
+
+Every /api/stream dashboard holds one thread for as long as it is
+connected, so each worker gets WEB_STREAM_CLIENTS threads (default 128)
+on top of the WEB_THREADS that serve API requests. The kernel does not
+spread connections evenly over the workers, so each one is sized to hold
+all of them. Up to WEB_STREAM_CLIENTS dashboards are therefore always
+accepted. Beyond that a dashboard gets a 503 and falls back to polling.
+An idle stream thread only waits on its queue, so the extra threads cost
+memory for their stacks, not CPU.
+"""
+
+import os
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+wsgi_app = 'server:app'
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+
+# Two workers suit the container's 0.5 CPU limit; raise with the limit
+workers = int(os.getenv('WEB_WORKERS', 2))
+worker_class = 'gthread'
+api_threads = int(os.getenv('WEB_THREADS', 16))
+# Connected dashboards each worker holds on /api/stream
+stream_clients = int(os.getenv('WEB_STREAM_CLIENTS', 128))
+threads = api_threads + stream_clients
+preload_app = False
+
+# Past this many streams a worker refuses the dashboard (which falls back
+# to polling), so API requests always keep api_threads of their own
+os.environ.setdefault('STREAM_MAX_CLIENTS', str(stream_clients))
+
+# Workers heartbeat independently of long-lived stream responses
+timeout = 30
+graceful_timeout = 10
+keepalive = 5
+
+accesslog = None
+errorlog = '-'
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
@@ -4,13 +4,37 @@ Web Visualization Server for System Monitoring
 Arab Academy for Science, Technology & Maritime Transport - OS Project 12
 """
 
-from flask import Flask, render_template, jsonify, send_from_directory
+from flask import Flask, Response, render_template, jsonify, request, send_from_directory
 from flask_cors import CORS
 import os
+import sys
 import json
-import glob
-from datetime import datetime
-import pandas as pd
+import hmac
+import queue
+import socket
+import time
+import zlib
+from datetime import datetime, timezone
+from werkzeug.http import generate_etag
+
+# Shared readers live in the sysmon package next to web/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sysmon.alerts import ALERT_LEVELS, LOG_TIME_FORMAT, AlertIndex
+from sysmon.fleet import ALERT_LOG, HostStore, fleet_latest, fleet_summary, valid_host
+from sysmon.manifest import DirectoryVersions, Manifest
+from sysmon.processes import PROCESS_FIELDS, RANKINGS
+from sysmon.query import AGGREGATES, DEFAULT_POINTS, history, raw_history
+from sysmon.report import DEFAULT_WINDOW, generate_report
+from sysmon.rollup import RollupReader
+from sysmon.rules import ALERT_STATE_FILE, load_rules, load_state, open_incidents
+from sysmon.selfstats import CONTENT_TYPE, SELF_STATS_FILE, STATS, read_flushes, render
+from sysmon.storage import SCHEMAS, ColumnarReader, parse_duration, parse_timestamp
+from sysmon.stream import CLOSED, StreamHub, sse_message
+from sysmon.tail import (HistoryCache, LatestRowCache, LineCounterCache, iter_lines_backward,
+                         parse_row, read_lines_backward)
+from sysmon.tsdb import BACKEND, BACKENDS, DB_FILE, SqliteReader
+from sysmon.wire import (CHUNK_ROWS, ENCODERS, MIMETYPES, compress, compress_chunks,
+                         negotiate_encoding, negotiate_format)
 
 app = Flask(__name__)
 CORS(app)
@@ -20,6 +44,153 @@ LOG_DIR = os.getenv('LOG_DIR', '/app/logs')
 REPORT_DIR = os.getenv('REPORT_DIR', '/app/reports')
 DATA_DIR = os.getenv('DATA_DIR', '/app/data')
 PORT = int(os.getenv('PORT', 8080))
+COLUMNAR_DIR = os.getenv('COLUMNAR_DIR', os.path.join(DATA_DIR, 'columnar'))
+ROLLUP_DIR = os.getenv('ROLLUP_DIR', os.path.join(DATA_DIR, 'rollups'))
+# STORAGE_BACKEND=sqlite answers range queries from the collector's database
+METRICS_DB = os.getenv('METRICS_DB', os.path.join(DATA_DIR, DB_FILE))
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 4))
+HISTORY_BUFFER_ROWS = int(os.getenv('HISTORY_BUFFER_ROWS', 1000))
+STREAM_POLL_INTERVAL = float(os.getenv('STREAM_POLL_INTERVAL', 1.0))
+STREAM_KEEPALIVE = float(os.getenv('STREAM_KEEPALIVE', 15))
+STREAM_MAX_CLIENTS = int(os.getenv('STREAM_MAX_CLIENTS', 256))
+ALERT_BUFFER_SIZE = int(os.getenv('ALERT_BUFFER_SIZE', 1000))
+MAX_LOG_LINES = int(os.getenv('MAX_LOG_LINES', 10000))
+# Rows pushed by remote collectors, one directory per host
+HOSTS_DIR = os.getenv('HOSTS_DIR', os.path.join(DATA_DIR, 'hosts'))
+SELF_STATS_PATH = os.path.join(DATA_DIR, SELF_STATS_FILE)
+LOCAL_HOST = os.getenv('MONITOR_HOST') or socket.gethostname()
+INGEST_TOKEN = os.getenv('INGEST_TOKEN')
+MAX_INGEST_BYTES = int(os.getenv('MAX_INGEST_BYTES', 16 * 1024 * 1024))
+# Longest X-Batch-Id kept to recognise a retried push
+MAX_BATCH_ID = 128
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+
+METRIC_TYPES = ['cpu', 'memory', 'disk', 'gpu', 'network', 'system']
+
+# Any of these switches /api/metrics/history to a range query
+HISTORY_QUERY_ARGS = ('from', 'to', 'step', 'agg', 'points', 'format')
+
+# Last row of each metric file, re-read only when the file changes
+latest_rows = LatestRowCache()
+
+# Newest rows of each metric file, fed incrementally from the last offset
+history_buffers = HistoryCache(capacity=HISTORY_BUFFER_ROWS)
+
+# Typed samples written next to the CSVs by the collector: memory-mapped
+# columns, or a pool of prepared SQLite connections with STORAGE_BACKEND=sqlite
+if BACKEND not in BACKENDS:
+    raise ValueError(f"STORAGE_BACKEND must be one of {', '.join(BACKENDS)}")
+if BACKEND == 'sqlite':
+    sample_store = SqliteReader(METRICS_DB, pool_size=DB_POOL_SIZE)
+else:
+    sample_store = ColumnarReader(COLUMNAR_DIR)
+
+# 1m/5m/1h tiers maintained by the continuous collector
+rollups = RollupReader(ROLLUP_DIR)
+
+# Newline counts of the log files, advanced over appended bytes only
+log_line_counts = LineCounterCache()
+
+# inotify change counters; an unchanged directory needs no stat at all
+directory_versions = DirectoryVersions([REPORT_DIR, LOG_DIR, DATA_DIR, HOSTS_DIR])
+
+# Report and log listings, kept in each directory's .index/manifest.json
+report_manifest = Manifest(REPORT_DIR, '.md', versions=directory_versions)
+log_manifest = Manifest(LOG_DIR, '.log', active_seconds=86400, versions=directory_versions)
+
+# Parsed WARNING/ERROR lines of each log, indexed from the last offset; the
+# newest log comes from the manifest instead of a glob and stat per request
+alert_index = AlertIndex(LOG_DIR, capacity=ALERT_BUFFER_SIZE, manifest=log_manifest)
+
+# Encoded bodies of the polled listing endpoints:
+# {endpoint: (state, body, etag, modified, {content coding: compressed body})}
+encoded_responses = {}
+
+# Alert rules (rules.yaml), also applied to every batch pushed to /api/ingest
+alert_rules = load_rules()
+
+# Per-host CSV files and columnar stores fed by /api/ingest
+host_store = HostStore(HOSTS_DIR, rules=alert_rules)
+host_columnar = {}
+
+# One watcher thread pushing appended rows and alerts to /api/stream clients
+stream_hub = StreamHub(DATA_DIR, LOG_DIR, METRIC_TYPES, STREAM_POLL_INTERVAL,
+                       heartbeat=STREAM_KEEPALIVE)
+
+# Request counts and latencies (SELF_STATS=1), flushed to data/self_metrics.csv
+if STATS is not None:
+    STATS.start_writer(SELF_STATS_PATH, 'web')
+
+
+def parse_time_arg(name):
+    """Read a time query parameter given as epoch seconds or %Y%m%d_%H%M%S"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    return parse_timestamp(value)
+
+
+def start_request_timer():
+    request.environ['sysmon.started'] = time.perf_counter()
+
+
+def record_request(response):
+    """Count the request and its latency for /metrics"""
+    started = request.environ.get('sysmon.started')
+    endpoint = request.endpoint or 'unmatched'
+    STATS.inc('sysmon_http_requests_total', (('endpoint', endpoint), ('method', request.method),
+                                             ('status', str(response.status_code))))
+    if started is not None:
+        STATS.observe('sysmon_http_request_duration_seconds', (('endpoint', endpoint),),
+                      time.perf_counter() - started)
+    return response
+
+
+# Only hooked in when enabled, so a disabled monitor pays nothing per request.
+# Registered before compress_response so that it runs after it.
+if STATS is not None:
+    app.before_request(start_request_timer)
+    app.after_request(record_request)
+
+
+@app.after_request
+def compress_response(response):
+    """gzip/brotli-encode /api/* responses when Accept-Encoding allows
+
+    Streamed bodies are compressed as they are produced. The event stream
+    is left alone: a compressor would hold events back until it flushes.
+    """
+    if not request.path.startswith('/api/'):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.accept_encodings)
+    if (encoding is None or request.method == 'HEAD'
+            or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype == 'text/event-stream'):
+        return response
+    
+    if response.is_streamed:
+        chunks = response.response
+        if hasattr(chunks, 'close'):
+            response.call_on_close(chunks.close)
+        response.response = compress_chunks(chunks, encoding)
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+        response.headers.pop('Accept-Ranges', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return response
+        response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ, so a strong validator no longer holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
 
 
 @app.route('/')
@@ -28,6 +199,22 @@ def index():
     return render_template('index.html')
 
 
+@app.route('/metrics')
+def metrics():
+    """The monitor's own costs in the Prometheus text format"""
+    if STATS is None:
+        return jsonify({'error': 'Self-instrumentation is off, set SELF_STATS=1'}), 404
+    
+    try:
+        pid = str(os.getpid())
+        # This worker's live counters, then the newest flush of every other process
+        processes = [('web', pid, STATS.samples())]
+        processes += read_flushes(SELF_STATS_PATH, skip=('web', pid))
+        return Response(render(processes), content_type=CONTENT_TYPE)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
@@ -38,61 +225,311 @@ def health():
     })
 
 
-@app.route('/api/metrics/latest')
-def get_latest_metrics():
-    """Get latest metrics from all categories"""
-    try:
-        metrics = {}
-        
-        # Read latest data from CSV files
-        metric_files = {
-            'cpu': os.path.join(DATA_DIR, 'cpu_metrics.csv'),
-            'memory': os.path.join(DATA_DIR, 'memory_metrics.csv'),
-            'disk': os.path.join(DATA_DIR, 'disk_metrics.csv'),
-            'gpu': os.path.join(DATA_DIR, 'gpu_metrics.csv'),
-            'network': os.path.join(DATA_DIR, 'network_metrics.csv'),
-            'system': os.path.join(DATA_DIR, 'system_metrics.csv')
-        }
-        
-        for metric_name, file_path in metric_files.items():
-            if os.path.exists(file_path):
-                try:
-                    df = pd.read_csv(file_path, header=None)
-                    if not df.empty:
-                        latest = df.iloc[-1].tolist()
-                        metrics[metric_name] = {
-                            'timestamp': latest[0],
-                            'data': latest[1:]
-                        }
-                except Exception as e:
-                    metrics[metric_name] = {'error': str(e)}
+def conditional_json(endpoint, state, build):
+    """JSON response of a polled endpoint, encoded once per change of ``state``
+
+    ``build()`` returns (payload, last modified epoch seconds). A client
+    presenting the current ETag (or a Last-Modified date that still holds)
+    gets an empty 304, so an unchanged poll costs neither I/O nor encoding;
+    the compressed body is likewise kept per content coding.
+    """
+    cached = encoded_responses.get(endpoint)
+    if cached is None or cached[0] != state:
+        payload, modified = build()
+        body = app.json.dumps(payload).encode()
+        cached = encoded_responses[endpoint] = (
+            state, body, generate_etag(body), datetime.fromtimestamp(modified, timezone.utc), {})
+    _, body, etag, modified, compressed = cached
+    encoding = negotiate_encoding(request.accept_encodings)
+    if len(body) < COMPRESS_MIN_BYTES:
+        encoding = None
+    
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag, weak=encoding is not None)
+    response.last_modified = modified
+    # Revalidate on every poll rather than trusting heuristic browser caching
+    response.cache_control.no_cache = True
+    response = response.make_conditional(request)
+    if encoding and response.status_code == 200 and request.method != 'HEAD':
+        if encoding not in compressed:
+            compressed[encoding] = compress(body, encoding)
+        response.set_data(compressed[encoding])
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def directory_state(directory, paths=()):
+    """Validator for a directory and some of its files
+
+    The inotify counter when the directory is watched, otherwise the
+    directory's mtime and the (inode, size, mtime) of each path.
+    """
+    version = directory_versions.version(directory)
+    if version is not None:
+        return version
+    state = []
+    for path in (directory,) + tuple(paths):
+        try:
+            st = os.stat(path)
+            state.append((st.st_ino, st.st_size, st.st_mtime_ns))
+        except FileNotFoundError:
+            state.append(None)
+    return tuple(state)
+
+
+def host_data_dir(host):
+    """Data directory for a host= argument; the local collector's by default
+
+    Raises ValueError for malformed names and LookupError for hosts that
+    have never pushed anything.
+    """
+    if not host or host == LOCAL_HOST:
+        return DATA_DIR
+    directory = host_store.host_dir(host)
+    if not os.path.isdir(directory):
+        raise LookupError(f'Unknown host: {host}')
+    return directory
+
+
+def host_readers(host):
+    """(sample reader, RollupReader or None) for a host= argument
+
+    Pushed hosts are always stored in columnar segments.
+    """
+    directory = host_data_dir(host)
+    if directory == DATA_DIR:
+        return sample_store, rollups
+    reader = host_columnar.get(host)
+    if reader is None:
+        reader = host_columnar[host] = ColumnarReader(os.path.join(directory, 'columnar'))
+    return reader, None
+
+
+def all_hosts():
+    """The local host (when it collects) followed by every pushing host"""
+    hosts = []
+    if any(os.path.exists(os.path.join(DATA_DIR, f'{metric}_metrics.csv'))
+           for metric in METRIC_TYPES):
+        hosts.append(LOCAL_HOST)
+    return hosts + [host for host in host_store.hosts() if host != LOCAL_HOST]
+
+
+def latest_metrics(data_dir=DATA_DIR):
+    """Newest row of every metric file keyed by metric name"""
+    metrics = {}
+    
+    # Seek to the last complete line of each CSV instead of parsing it
+    for metric_name in METRIC_TYPES:
+        file_path = os.path.join(data_dir, f'{metric_name}_metrics.csv')
+        try:
+            latest = latest_rows.get(file_path)
+            if latest:
+                metrics[metric_name] = {
+                    'timestamp': latest[0],
+                    'data': latest[1:]
+                }
             else:
                 metrics[metric_name] = {'error': 'No data available'}
+        except FileNotFoundError:
+            metrics[metric_name] = {'error': 'No data available'}
+        except Exception as e:
+            metrics[metric_name] = {'error': str(e)}
+    
+    return metrics
+
+
+@app.route('/api/metrics/latest')
+def get_latest_metrics():
+    """Get latest metrics from all categories, for one host or the whole fleet"""
+    try:
+        host = request.args.get('host')
+        if host == 'all':
+            latest = {name: latest_metrics(host_data_dir(name)) for name in all_hosts()}
+            return jsonify({'hosts': latest, 'fleet': fleet_latest(latest)})
+        return jsonify(latest_metrics(host_data_dir(host)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def read_ingest_body():
+    """Request body, gunzipped when sent with Content-Encoding: gzip
+
+    Raises ValueError when it would exceed MAX_INGEST_BYTES.
+    """
+    data = request.get_data(cache=False)
+    if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        data = decompressor.decompress(data, MAX_INGEST_BYTES)
+        if decompressor.unconsumed_tail:
+            raise ValueError('Batch too large')
+    elif len(data) > MAX_INGEST_BYTES:
+        raise ValueError('Batch too large')
+    return data
+
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest():
+    """Store a batch of CSV rows pushed by a remote collector"""
+    if INGEST_TOKEN and not hmac.compare_digest(
+            request.headers.get('Authorization', ''), f'Bearer {INGEST_TOKEN}'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    host = request.args.get('host', '')
+    if not valid_host(host) or host in (LOCAL_HOST, 'all'):
+        return jsonify({'error': f'Invalid host name: {host!r}'}), 400
+    if (request.content_length or 0) > MAX_INGEST_BYTES:
+        return jsonify({'error': 'Batch too large'}), 413
+    
+    try:
+        try:
+            body = read_ingest_body()
+        except (ValueError, zlib.error) as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify(metrics)
+        accepted, rejected, skipped = host_store.ingest(
+            host, body.decode('utf-8', errors='replace').splitlines(),
+            batch_id=request.headers.get('X-Batch-Id', '')[:MAX_BATCH_ID] or None)
+        return jsonify({'host': host, 'accepted': accepted, 'rejected': rejected,
+                        'skipped': skipped})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/stream')
+def stream():
+    """Push new samples and alerts as Server-Sent Events"""
+    if stream_hub.client_count >= STREAM_MAX_CLIENTS:
+        return jsonify({'error': 'Too many stream clients, poll /api/metrics/latest'}), 503
+    
+    try:
+        subscriber = stream_hub.subscribe()
+        snapshot = sse_message('metrics', latest_metrics())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    def events():
+        try:
+            yield b'retry: 5000\n\n' + snapshot
+            while True:
+                try:
+                    message = subscriber.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield b': keepalive\n\n'  # Lets proxies and clients see a live connection
+                    continue
+                if message is CLOSED:
+                    return
+                yield message
+        finally:
+            stream_hub.unsubscribe(subscriber)
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+def query_metric_history(metric_type):
+    """Downsampled history over from/to with step-sized buckets
+
+    ``step=raw`` returns every stored sample instead. The body is encoded
+    in the negotiated format and streamed when it spans several chunks.
+    """
+    if metric_type not in SCHEMAS:
+        return jsonify({'error': 'Metric not found'}), 404
+    
+    try:
+        start, end = parse_time_arg('from'), parse_time_arg('to')
+        step = request.args.get('step')
+        raw = step == 'raw'
+        step = parse_duration(step) if step and not raw else None
+        points = request.args.get('points', DEFAULT_POINTS, type=int)
+    except ValueError:
+        return jsonify({'error': 'Invalid from/to/step/points parameter'}), 400
+    
+    agg = request.args.get('agg', 'mean')
+    if agg not in AGGREGATES:
+        return jsonify({'error': f"agg must be one of {', '.join(AGGREGATES)}"}), 400
+    fmt = negotiate_format(request.args.get('format'), request.accept_mimetypes)
+    
+    reader, rollup_reader = host_readers(request.args.get('host'))
+    if raw:
+        result = raw_history(reader, metric_type, start, end)
+    else:
+        result = history(reader, metric_type, start, end, step, agg, points, rollup_reader)
+    
+    meta = {key: result[key] for key in ('metric_type', 'from', 'to', 'step', 'agg', 'tier', 'count')}
+    body = ENCODERS[fmt](meta, result['ts'], result['columns'], result['samples'])
+    if len(result['ts']) <= CHUNK_ROWS:
+        body = b''.join(body)
+    response = Response(body, mimetype=MIMETYPES[fmt])
+    response.vary.add('Accept')
+    return response
+
+
 @app.route('/api/metrics/history/<metric_type>')
 def get_metric_history(metric_type):
     """Get historical data for a specific metric type"""
     try:
-        file_path = os.path.join(DATA_DIR, f'{metric_type}_metrics.csv')
+        # The columnar shapes need named columns, which only the typed stores have
+        if (any(arg in request.args for arg in HISTORY_QUERY_ARGS)
+                or negotiate_format(None, request.accept_mimetypes) != 'records'):
+            return query_metric_history(metric_type)
+        
+        data_dir = host_data_dir(request.args.get('host'))
+        file_path = os.path.join(data_dir, f'{metric_type}_metrics.csv')
         
         if not os.path.exists(file_path):
             return jsonify({'error': 'Metric not found'}), 404
         
-        df = pd.read_csv(file_path, header=None)
+        # Window defaults to the last 100 entries, capped by the ring buffer
+        limit = min(request.args.get('limit', 100, type=int), HISTORY_BUFFER_ROWS)
+        count, rows = history_buffers.get(file_path).snapshot(limit)
         
-        # Convert to list of dictionaries
-        data = df.to_dict('records')
-        
-        return jsonify({
+        response = jsonify({
             'metric_type': metric_type,
-            'count': len(data),
-            'data': data[-100:]  # Return last 100 entries
+            'count': count,
+            'data': [dict(enumerate(row)) for row in rows]
         })
+        response.vary.add('Accept')
+        return response
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/metrics/summary/<metric_type>')
+def get_metric_summary(metric_type):
+    """Get min/max/mean of every numeric column over a time range"""
+    try:
+        if metric_type not in SCHEMAS:
+            return jsonify({'error': 'Metric not found'}), 404
+        
+        try:
+            start, end = parse_time_arg('from'), parse_time_arg('to')
+        except ValueError:
+            return jsonify({'error': 'Invalid from/to timestamp'}), 400
+        
+        host = request.args.get('host')
+        if host == 'all':
+            summaries = {name: host_readers(name)[0].summary(metric_type, start, end)
+                         for name in all_hosts()}
+            summary = fleet_summary(summaries)
+            summary['hosts'] = summaries
+        else:
+            summary = host_readers(host)[0].summary(metric_type, start, end)
+        summary['metric_type'] = metric_type
+        return jsonify(summary)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -101,23 +538,40 @@ def get_metric_history(metric_type):
 def get_reports():
     """Get list of available reports"""
     try:
-        if not os.path.exists(REPORT_DIR):
-            return jsonify({'reports': []})
-        
-        reports = []
-        for report_file in glob.glob(os.path.join(REPORT_DIR, '*.md')):
-            stat = os.stat(report_file)
-            reports.append({
-                'filename': os.path.basename(report_file),
-                'size': stat.st_size,
-                'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
-            })
-        
-        # Sort by modified time, newest first
-        reports.sort(key=lambda x: x['modified'], reverse=True)
+        # Newest first, from the manifest instead of a stat per file
+        reports = report_manifest.files()
+        return conditional_json('reports', (reports,), lambda: (
+            {'reports': reports}, report_manifest.last_modified))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/reports', methods=['POST'])
+def create_report():
+    """Summarise a window of stored history into a new Markdown report
+
+    ``window`` (e.g. 24h) or ``from``/``to`` select the range; ``host``
+    reports on a pushing host instead of the local collector.
+    """
+    try:
+        try:
+            start, end = parse_time_arg('from'), parse_time_arg('to')
+        except ValueError:
+            return jsonify({'error': 'Invalid from/to timestamp'}), 400
+        window = request.args.get('window')
+        window = parse_duration(window) if window else DEFAULT_WINDOW
         
-        return jsonify({'reports': reports})
+        host = request.args.get('host')
+        data_dir = host_data_dir(host)
+        # Alerts come from this server's logs, which belong to the local collector
+        log_dir = LOG_DIR if data_dir == DATA_DIR else None
+        path, report = generate_report(data_dir, REPORT_DIR, log_dir, start=start, end=end,
+                                       window=window, host=host or LOCAL_HOST)
+        return jsonify({'filename': os.path.basename(path), 'report': report}), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -146,95 +600,207 @@ def get_report(filename):
 def get_logs():
     """Get list of available log files"""
     try:
-        if not os.path.exists(LOG_DIR):
-            return jsonify({'logs': []})
-        
-        logs = []
-        for log_file in glob.glob(os.path.join(LOG_DIR, '*.log')):
-            stat = os.stat(log_file)
-            logs.append({
-                'filename': os.path.basename(log_file),
-                'size': stat.st_size,
-                'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
-            })
-        
-        # Sort by modified time, newest first
-        logs.sort(key=lambda x: x['modified'], reverse=True)
-        
-        return jsonify({'logs': logs})
+        # Newest first, from the manifest instead of a stat per file
+        logs = log_manifest.files()
+        return conditional_json('logs', (logs,), lambda: (
+            {'logs': logs}, log_manifest.last_modified))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/logs/<filename>')
 def get_log(filename):
-    """Get content of a specific log file (last 1000 lines)"""
+    """Get a page of a log file (by default its last 1000 lines)"""
     try:
         file_path = os.path.join(LOG_DIR, filename)
         
         if not os.path.exists(file_path) or not filename.endswith('.log'):
             return jsonify({'error': 'Log not found'}), 404
         
-        # Read last 1000 lines
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
-            content = ''.join(lines[-1000:])
+        # ``offset`` counts lines back from the end of the file
+        lines = min(max(request.args.get('lines', 1000, type=int), 0), MAX_LOG_LINES)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        
+        # Page and count against the same size so they agree while the log grows
+        size, line_count = log_line_counts.get(file_path).refresh()
+        page = read_lines_backward(file_path, lines, offset, end=size) if offset < line_count else []
+        content = b''.join(line + b'\n' for line in page).decode('utf-8', errors='replace')
         
         return jsonify({
             'filename': filename,
             'content': content,
-            'line_count': len(lines)
+            'line_count': line_count,
+            'lines': len(page),
+            'offset': offset,
+            'has_more': offset + len(page) < line_count
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def parse_since_arg():
+    """Read ``since`` as epoch seconds, a log timestamp or %Y%m%d_%H%M%S"""
+    value = request.args.get('since')
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(value, LOG_TIME_FORMAT).timestamp()
+    except ValueError:
+        return parse_timestamp(value)
+
+
 @app.route('/api/alerts')
 def get_alerts():
-    """Get recent alerts and warnings from logs"""
+    """Get recent alerts and warnings from logs, and the open incidents
+
+    ``host`` selects a pushing host, whose incidents the server logs itself.
+    """
     try:
-        alerts = []
-        
-        # Find the most recent log file
-        log_files = glob.glob(os.path.join(LOG_DIR, '*.log'))
-        if not log_files:
-            return jsonify({'alerts': []})
+        host = request.args.get('host')
+        data_dir = host_data_dir(host)
+        if data_dir == DATA_DIR:
+            # The most recent log file, indexed incrementally
+            log = alert_index.latest()
+        else:
+            path = os.path.join(data_dir, ALERT_LOG)
+            log = alert_index.get(path) if os.path.exists(path) else None
+        incidents = open_incidents(load_state(os.path.join(data_dir, ALERT_STATE_FILE)))
+        for incident in incidents:
+            incident['timestamp'] = datetime.fromtimestamp(incident['since']).strftime(
+                LOG_TIME_FORMAT)
+        if log is None:
+            return jsonify({'alerts': [], 'incidents': incidents})
         
-        latest_log = max(log_files, key=os.path.getmtime)
+        limit = min(max(request.args.get('limit', 50, type=int), 0), ALERT_BUFFER_SIZE)
+        level = request.args.get('level')
+        if level is not None:
+            level = level.upper()
+            if level not in ALERT_LEVELS:
+                return jsonify({'error': f"level must be one of {', '.join(ALERT_LEVELS)}"}), 400
+        try:
+            since = parse_since_arg()
+        except ValueError:
+            return jsonify({'error': 'Invalid since timestamp'}), 400
         
-        with open(latest_log, 'r') as f:
-            for line in f:
-                if '[WARNING]' in line or '[ERROR]' in line:
-                    alerts.append(line.strip())
+        counts, alerts = log.recent(limit, since, level)
         
-        # Return last 50 alerts
         return jsonify({
-            'alerts': alerts[-50:],
-            'count': len(alerts)
+            'alerts': [alert.line for alert in alerts],
+            'entries': [{
+                'timestamp': alert.timestamp,
+                'level': alert.level,
+                'message': alert.message
+            } for alert in alerts],
+            'count': sum(counts.values()),
+            'counts': counts,
+            'incidents': incidents,
+            'log': os.path.basename(log.path)
         })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def read_newest_tick(file_path):
+    """Parsed rows of the newest tick in the process file, oldest first
+
+    The file is read backwards once and reading stops at the first row
+    with an older timestamp, however many processes a tick ranks.
+    """
+    rows = []
+    for line in iter_lines_backward(file_path):
+        if not line.strip():
+            continue
+        row = parse_row(line)
+        if rows and row[0] != rows[0][0]:
+            break
+        rows.append(row)
+    rows.reverse()
+    return rows
+
+
+@app.route('/api/processes/top')
+def get_top_processes():
+    """Get the top processes by CPU and by RSS from the newest collector tick"""
+    try:
+        by = request.args.get('by')
+        if by is not None and by not in RANKINGS:
+            return jsonify({'error': f"by must be one of {', '.join(RANKINGS)}"}), 400
+        limit = request.args.get('limit', type=int)
+        
+        file_path = os.path.join(DATA_DIR, 'process_metrics.csv')
+        if not os.path.exists(file_path):
+            return jsonify({'error': 'No process data available'}), 404
+        
+        # Only the tail holds the newest tick; never parse the whole file
+        rows = read_newest_tick(file_path)
+        if not rows:
+            return jsonify({'error': 'No process data available'}), 404
+        timestamp = rows[-1][0]
+        
+        processes = {ranking: [] for ranking in RANKINGS if by in (None, ranking)}
+        seen = set()
+        for row in reversed(rows):
+            if row[0] != timestamp or len(row) < 2 + len(PROCESS_FIELDS):
+                break
+            entry = dict(zip(PROCESS_FIELDS, row[2:]))
+            ranking = entry.pop('ranking')
+            if (ranking, entry['rank']) in seen:
+                break  # An earlier tick within the same second
+            seen.add((ranking, entry['rank']))
+            if ranking in processes:
+                entry['name'] = str(entry['name'])
+                processes[ranking].append(entry)
+        for entries in processes.values():
+            entries.reverse()
+        if limit is not None:
+            processes = {ranking: entries[:max(limit, 0)] for ranking, entries in processes.items()}
+        
+        return jsonify({'timestamp': timestamp, 'processes': processes})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def build_stats(reports, logs, data_paths):
+    """(stats payload, last modified) for /api/stats"""
+    stats = {
+        'total_reports': len(reports),
+        'total_logs': len(logs),
+        'hosts': all_hosts(),
+        'data_files': {}
+    }
+    modified = max(report_manifest.last_modified, log_manifest.last_modified)
+    
+    # Row counts are kept by the ring buffers, which only read appended bytes
+    for metric_type, file_path in data_paths.items():
+        try:
+            count = history_buffers.get(file_path).snapshot(0)[0]
+            modified = max(modified, os.path.getmtime(file_path))
+        except FileNotFoundError:
+            continue
+        stats['data_files'][metric_type] = count
+    
+    return stats, modified
+
+
 @app.route('/api/stats')
 def get_stats():
     """Get overall statistics"""
     try:
-        stats = {
-            'total_reports': len(glob.glob(os.path.join(REPORT_DIR, '*.md'))),
-            'total_logs': len(glob.glob(os.path.join(LOG_DIR, '*.log'))),
-            'data_files': {}
-        }
-        
-        # Count data points in each metric file
-        for metric_type in ['cpu', 'memory', 'disk', 'gpu', 'network', 'system']:
-            file_path = os.path.join(DATA_DIR, f'{metric_type}_metrics.csv')
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    stats['data_files'][metric_type] = len(f.readlines())
-        
-        return jsonify(stats)
+        reports, logs = report_manifest.files(), log_manifest.files()
+        data_paths = {metric_type: os.path.join(DATA_DIR, f'{metric_type}_metrics.csv')
+                      for metric_type in METRIC_TYPES}
+        state = (reports, logs, directory_state(DATA_DIR, tuple(data_paths.values())),
+                 directory_state(HOSTS_DIR))
+        return conditional_json('stats', state,
+                                lambda: build_stats(reports, logs, data_paths))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 